@@ -0,0 +1,359 @@
+"""
+Measure what concurrent guild playback costs per stream, without the network.
+
+Generates a local audio file with ffmpeg, then for each guild count N starts
+N VoiceStates, each with a fake voice client driven by discord.py's real
+AudioPlayer thread, and queues local tracks that play through the real track
+sources and `audio_player_task` loop. While they play, it samples this
+process's CPU, RSS and thread count, plus the number and CPU of ffmpeg child
+processes, and records the jitter between the frames each player sends.
+
+Run from the repository root (needs ffmpeg on the PATH and Linux's /proc; PCM
+results include Opus encoding when libopus can be loaded):
+
+    python -m benchmarks.bench_concurrent_playback [--guilds 1 10 100 500]
+        [--mode pcm|opus] [--seconds 20] [--tracks 2] [--json out.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import resource
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import discord
+from discord.player import AudioPlayer
+
+from benchmarks.bench_playback_cpu import generate_sample, load_encoder
+from src.cogs.music_bot.parse_youtube_input.extract_from_youtube import (
+    OpusYtdlSource,
+    YtdlSource,
+)
+from src.cogs.music_bot.parse_youtube_input.video_info import VideoInfo
+from src.cogs.music_bot.queued_track import QueuedTrack
+from src.cogs.music_bot.voice_state import VoiceState
+
+FRAME_SECONDS = AudioPlayer.DELAY
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+
+
+class FakeMessage:
+    async def edit(self, **kwargs):
+        return self
+
+
+class FakeChannel:
+    def __init__(self, channel_id: int):
+        self.id = channel_id
+
+    async def send(self, *args, **kwargs):
+        return FakeMessage()
+
+
+class FakeBot:
+    def get_partial_messageable(self, channel_id: int, *, guild_id: int = None):
+        return FakeChannel(channel_id)
+
+
+class FakeContext(FakeChannel):
+    def __init__(self, guild_id: int):
+        super().__init__(guild_id)
+        self.guild = type("Guild", (), {"id": guild_id})()
+
+
+class FakeVoiceWebSocket:
+    async def speak(self, state):
+        pass
+
+
+class FakeVoiceClient:
+    """
+    Just enough of discord.VoiceClient for AudioPlayer: packets are encoded
+    exactly as they would be for sending, then timestamped instead of sent.
+    """
+
+    timeout = 5.0
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, encode: bool):
+        self.client = type("Client", (), {"loop": loop})()
+        self.ws = FakeVoiceWebSocket()
+        self.encode = encode
+        self.encoder: Optional[discord.opus.Encoder] = None
+        self.tracks_played = 0
+        self.packets = 0
+        self.intervals: List[float] = []
+
+        self._player: Optional[AudioPlayer] = None
+        self._last_packet: Optional[float] = None
+
+    def is_connected(self) -> bool:
+        return True
+
+    def wait_until_connected(self, timeout: float) -> bool:
+        return True
+
+    def play(self, source: discord.AudioSource, *, after: Callable = None):
+        if not source.is_opus() and self.encode and self.encoder is None:
+            self.encoder = load_encoder()
+
+        def finished(error):
+            self.tracks_played += 1
+            # The gap between tracks isn't frame jitter.
+            self._last_packet = None
+            if after is not None:
+                after(error)
+
+        self._player = AudioPlayer(source, self, after=finished)
+        self._player.start()
+
+    def send_audio_packet(self, data: bytes, *, encode: bool = True):
+        if encode and self.encoder is not None:
+            self.encoder.encode(data, self.encoder.SAMPLES_PER_FRAME)
+
+        self.packets += 1
+        now = time.perf_counter()
+        if self._last_packet is not None:
+            self.intervals.append(now - self._last_packet)
+        self._last_packet = now
+
+    @property
+    def source(self) -> Optional[discord.AudioSource]:
+        return self._player.source if self._player else None
+
+    @source.setter
+    def source(self, value: discord.AudioSource):
+        self._player.set_source(value)
+
+    def is_playing(self) -> bool:
+        return self._player is not None and self._player.is_playing()
+
+    def is_paused(self) -> bool:
+        return self._player is not None and self._player.is_paused()
+
+    def stop(self):
+        if self._player is not None:
+            self._player.stop()
+            self._player = None
+
+    async def disconnect(self):
+        self.stop()
+
+
+class LocalTrack(QueuedTrack):
+    """A queued track whose stream is a local file."""
+
+    __slots__ = ("mode",)
+
+    SOURCE_CLASSES = {"pcm": YtdlSource, "opus": OpusYtdlSource}
+
+    def __init__(self, video_info: VideoInfo, *, mode: str, **kwargs):
+        super().__init__(video_info, **kwargs)
+        self.mode = mode
+
+    async def create_source(self, *, volume: float = 0.5, start: float = 0.0):
+        return self.SOURCE_CLASSES[self.mode].from_video_info(
+            self.video_info, volume=volume, start=start
+        )
+
+
+class Sampler:
+    """Periodically sample this process and its ffmpeg children from /proc."""
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self.rss: List[int] = []
+        self.threads: List[int] = []
+        self.ffmpeg_processes: List[int] = []
+        # Last seen CPU seconds per ffmpeg process, kept after it exits.
+        self.ffmpeg_cpu: Dict[int, float] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="sampler")
+
+    def __enter__(self) -> Sampler:
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.sample()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        status = read_status(os.getpid())
+        self.rss.append(int(status["VmRSS"].split()[0]) * 1024)
+        self.threads.append(int(status["Threads"]))
+
+        children = ffmpeg_children(os.getpid())
+        self.ffmpeg_processes.append(len(children))
+        self.ffmpeg_cpu.update(children)
+
+
+def read_status(pid: int) -> Dict[str, str]:
+    with open(f"/proc/{pid}/status") as file:
+        return dict(line.rstrip("\n").split(":\t", 1) for line in file if ":\t" in line)
+
+
+def ffmpeg_children(parent: int) -> Dict[int, float]:
+    """CPU seconds used so far by each ffmpeg process started by `parent`."""
+    children = {}
+    for entry in os.scandir("/proc"):
+        if not entry.name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry.name}/stat") as file:
+                stat = file.read()
+        except OSError:
+            continue
+        # The command name is in parentheses and may contain spaces.
+        name = stat[stat.index("(") + 1 : stat.rindex(")")]
+        fields = stat[stat.rindex(")") + 2 :].split()
+        if name == "ffmpeg" and int(fields[1]) == parent:
+            children[int(entry.name)] = (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+    return children
+
+
+def percentile(values: List[float], percent: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+async def run_level(
+    guilds: int, sample: Path, *, mode: str, seconds: int, tracks: int
+) -> Dict[str, float]:
+    loop = asyncio.get_running_loop()
+    video_info = VideoInfo.model_construct(
+        video_id=sample.stem,
+        title=sample.name,
+        thumbnail="https://i.ytimg.com/vi/benchmark/hq.jpg",
+        duration=seconds,
+        webpage_url="https://www.youtube.com/watch?v=benchmark",
+        stream_url=str(sample),
+        view_count="0",
+        upload_date="01 January 2024",
+    )
+
+    clients, states = [], []
+    cpu, children_cpu, wall = time.process_time(), reaped_cpu(), time.perf_counter()
+    with Sampler() as sampler:
+        for guild_id in range(guilds):
+            ctx = FakeContext(guild_id)
+            state = VoiceState(bot=FakeBot(), ctx=ctx)
+            state.voice = FakeVoiceClient(loop, encode=mode == "pcm")
+            for _ in range(tracks):
+                state.songs.put_nowait(
+                    LocalTrack(
+                        video_info,
+                        mode=mode,
+                        requester_id=guild_id,
+                        channel_id=guild_id,
+                        guild_id=guild_id,
+                    )
+                )
+            clients.append(state.voice)
+            states.append(state)
+
+        deadline = time.monotonic() + tracks * seconds * 3 + 30
+        while any(client.tracks_played < tracks for client in clients):
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Playback with {guilds} guilds didn't finish.")
+            await asyncio.sleep(0.25)
+
+        for state in states:
+            await state.stop()
+
+    wall = time.perf_counter() - wall
+    python_cpu = time.process_time() - cpu
+    ffmpeg_cpu = max(sum(sampler.ffmpeg_cpu.values()), reaped_cpu() - children_cpu)
+    intervals = [interval for client in clients for interval in client.intervals]
+    jitter_ms = [abs(interval - FRAME_SECONDS) * 1000 for interval in intervals]
+    stream_seconds = guilds * wall
+
+    return {
+        "guilds": guilds,
+        "mode": mode,
+        "opus_encoding": any(client.encoder is not None for client in clients),
+        "wall_seconds": wall,
+        "python_cpu_seconds": python_cpu,
+        "ffmpeg_cpu_seconds": ffmpeg_cpu,
+        "core_percent_per_stream": 100 * (python_cpu + ffmpeg_cpu) / stream_seconds,
+        "peak_rss_bytes": max(sampler.rss),
+        "rss_bytes_per_stream": (max(sampler.rss) - sampler.rss[0]) / guilds,
+        "peak_threads": max(sampler.threads),
+        "peak_ffmpeg_processes": max(sampler.ffmpeg_processes),
+        "frames": sum(client.packets for client in clients),
+        "jitter_ms_p50": statistics.median(jitter_ms) if jitter_ms else 0.0,
+        "jitter_ms_p99": percentile(jitter_ms, 99),
+        "jitter_ms_max": max(jitter_ms, default=0.0),
+        # Frames sent more than a whole frame late, i.e. audible stutter.
+        "late_frames": sum(1 for interval in intervals if interval > 2 * FRAME_SECONDS),
+    }
+
+
+def reaped_cpu() -> float:
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--guilds", type=int, nargs="+", default=[1, 10, 50, 100, 250, 500]
+    )
+    parser.add_argument("--mode", choices=("pcm", "opus"), default="pcm")
+    parser.add_argument("--seconds", type=int, default=20, help="Length of each track.")
+    parser.add_argument("--tracks", type=int, default=2, help="Tracks queued per guild.")
+    parser.add_argument("--json", help="Write the results to this file as JSON.")
+    args = parser.parse_args()
+
+    # Per-song log lines from hundreds of guilds would dominate the measurements.
+    logging.disable(logging.INFO)
+
+    report = []
+    with tempfile.TemporaryDirectory() as directory:
+        sample = Path(directory) / "sample.webm"
+        generate_sample(sample, args.seconds)
+
+        print(
+            f"{'guilds':>7}{'core%/stream':>14}{'RSS MiB':>10}{'threads':>9}"
+            f"{'ffmpeg':>8}{'p99 jitter ms':>15}{'late':>7}"
+        )
+        for guilds in args.guilds:
+            result = asyncio.run(
+                run_level(
+                    guilds,
+                    sample,
+                    mode=args.mode,
+                    seconds=args.seconds,
+                    tracks=args.tracks,
+                )
+            )
+            report.append(result)
+            print(
+                f"{guilds:>7}{result['core_percent_per_stream']:>14.2f}"
+                f"{result['peak_rss_bytes'] / 2**20:>10.1f}"
+                f"{result['peak_threads']:>9}{result['peak_ffmpeg_processes']:>8}"
+                f"{result['jitter_ms_p99']:>15.2f}{result['late_frames']:>7}"
+            )
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
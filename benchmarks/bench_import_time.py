@@ -0,0 +1,109 @@
+"""
+Break down how long importing the bot takes, like `python -X importtime`.
+
+Each run imports the module in a fresh interpreter; the fastest of the
+runs is reported for each module. Also reports what the deferred work
+(loading yt-dlp and building the metadata models) costs when it does run.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_import_time [--module src.cogs.music_cog] [--json out.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+IMPORT_TIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+# Third-party packages whose share of the import time is worth tracking.
+PACKAGES = ("discord", "aiohttp", "pydantic", "yt_dlp")
+WARM_UP = (
+    "import time, {module}\n"
+    "from src.cogs.music_bot.parse_youtube_input.extract_from_youtube import warm_up\n"
+    "started = time.perf_counter()\n"
+    "warm_up()\n"
+    "print(time.perf_counter() - started)\n"
+)
+
+
+def import_times(module: str) -> Dict[str, Tuple[float, float]]:
+    """Each imported module's (self, cumulative) import time in milliseconds."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        match = IMPORT_TIME.match(line)
+        if match:
+            own, cumulative, _, name = match.groups()
+            times[name] = (int(own) / 1000, int(cumulative) / 1000)
+    return times
+
+
+def fastest(runs: List[Dict[str, Tuple[float, float]]]) -> Dict[str, Tuple[float, float]]:
+    names = set.intersection(*(set(run) for run in runs))
+    return {
+        name: (min(run[name][0] for run in runs), min(run[name][1] for run in runs))
+        for name in names
+    }
+
+
+def warm_up_seconds(module: str) -> float:
+    result = subprocess.run(
+        [sys.executable, "-c", WARM_UP.format(module=module)],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--module", default="src.cogs.music_cog")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--json", help="Write the results to this file as JSON.")
+    args = parser.parse_args()
+
+    times = fastest([import_times(args.module) for _ in range(args.repeats)])
+    total = max(cumulative for _, cumulative in times.values())
+    packages = {name: times[name][1] for name in PACKAGES if name in times}
+    slowest = sorted(times.items(), key=lambda item: item[1][0], reverse=True)
+    warm_up = min(warm_up_seconds(args.module) for _ in range(args.repeats)) * 1000
+
+    print(f"\nimport {args.module}: {total:.1f}ms (fastest of {args.repeats})")
+    print(f"deferred to warm_up: {warm_up:.1f}ms")
+    print(f"\n{'package':<40}{'cumulative ms':>14}")
+    for name in PACKAGES:
+        shown = f"{packages[name]:.1f}" if name in packages else "not imported"
+        print(f"{name:<40}{shown:>14}")
+    print(f"\n{'module':<60}{'self ms':>10}{'cumulative ms':>14}")
+    for name, (own, cumulative) in slowest[: args.top]:
+        print(f"{name:<60}{own:>10.1f}{cumulative:>14.1f}")
+
+    if args.json:
+        report = {
+            "module": args.module,
+            "total_ms": total,
+            "warm_up_ms": warm_up,
+            "packages_ms": packages,
+            "modules_ms": {
+                name: {"self": own, "cumulative": cumulative}
+                for name, (own, cumulative) in times.items()
+            },
+        }
+        with open(args.json, "w") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Benchmark how long the logging done by one `!play` holds up the event loop.
+
+Each command makes the log calls the play path makes (voice state checks,
+extraction, cache lookups, queueing, playback), either the way they used to
+be written (f-strings, per-check INFO lines, the whole queue in a message) or
+the way they are now (%-style, debug-level checks). Only the time spent in
+the calling thread is measured, against a console that either keeps up or is
+slow (0.2ms per write, like a blocked pipe).
+
+Run from the repository root:
+
+    python -m benchmarks.bench_logging [--commands 500] [--queue 200] [--json out.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import logging
+import queue
+import time
+from logging.handlers import QueueListener
+from types import SimpleNamespace
+from typing import Callable, Dict, List
+
+from src.logger import (
+    LOG_FORMAT,
+    JsonFormatter,
+    NonBlockingQueueHandler,
+    RateLimitFilter,
+    TextFormatter,
+)
+
+logger = logging.getLogger("bench_logging")
+
+
+class SlowStream(io.TextIOBase):
+    """A console that takes `delay` seconds per write."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    def write(self, text: str) -> int:
+        time.sleep(self.delay)
+        return len(text)
+
+
+def make_queue(size: int) -> List[SimpleNamespace]:
+    return [
+        SimpleNamespace(title=f"Song {n}", video_id=f"video-{n}", duration=200)
+        for n in range(size)
+    ]
+
+
+def play_eager(songs: List[SimpleNamespace], voice) -> None:
+    """The play path's log calls before they were made lazy."""
+    for _ in range(3):
+        logger.info(f"Voice client is connected: {voice.is_connected()}")
+    logger.info(f"Extracting video info for: {songs[0].video_id}")
+    logger.info(f"Metadata cache miss ({songs[0].video_id})")
+    logger.info(f"Successfully extracted video info for: {songs[0].title}")
+    logger.info(f"Current queue: {[song.title for song in songs]}")
+    logger.info(f"Creating FFmpeg audio source for {songs[0].title}")
+    logger.info(f"Attempting to play: {songs[0]}")
+    logger.info(f"Playing the next song: {songs}")
+
+
+def play_lazy(songs: List[SimpleNamespace], voice) -> None:
+    """The same calls as they are made now."""
+    for _ in range(3):
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Voice client is connected: %s", voice.is_connected())
+    logger.info("Extracting video info for: %s", songs[0].video_id)
+    logger.info("Metadata cache miss (%s)", songs[0].video_id)
+    logger.info("Successfully extracted video info for: %s", songs[0].title)
+    logger.info("Queued %s (%d in the queue).", songs[0].title, len(songs))
+    logger.info("Creating FFmpeg audio source for %s", songs[0].title)
+    logger.info("Attempting to play: %s", songs[0])
+    logger.info("Song finished; %d left in the queue.", len(songs))
+
+
+CASES = {
+    # name: (log calls, handler, JSON output, rate limit)
+    "eager_sync": (play_eager, "sync", False, 0),
+    "lazy_sync": (play_lazy, "sync", False, 0),
+    "lazy_async": (play_lazy, "async", False, 0),
+    "lazy_async_json": (play_lazy, "async", True, 0),
+    "lazy_async_limited": (play_lazy, "async", False, 30),
+}
+
+
+def bench_case(
+    play: Callable, mode: str, json_output: bool, rate_limit: int, stream, args
+) -> float:
+    """Microseconds of caller time per command."""
+    console = logging.StreamHandler(stream)
+    console.setFormatter(JsonFormatter() if json_output else TextFormatter(LOG_FORMAT))
+
+    listener = None
+    handler: logging.Handler = console
+    if mode == "async":
+        handler = NonBlockingQueueHandler(queue.Queue(args.commands * 20))
+        listener = QueueListener(handler.queue, console)
+        listener.start()
+    if rate_limit:
+        handler.addFilter(RateLimitFilter(rate_limit))
+
+    logger.handlers = [handler]
+    songs = make_queue(args.queue)
+    voice = SimpleNamespace(is_connected=lambda: True)
+    try:
+        started = time.perf_counter()
+        for _ in range(args.commands):
+            play(songs, voice)
+        elapsed = time.perf_counter() - started
+    finally:
+        if listener is not None:
+            listener.stop()  # Waits for the console to catch up; not timed.
+        logger.handlers = []
+    return elapsed / args.commands * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--commands", type=int, default=500)
+    parser.add_argument("--queue", type=int, default=200, help="Songs in the queue.")
+    parser.add_argument("--slow-write", type=float, default=0.0002)
+    parser.add_argument("--json", help="Write the results to this file as JSON.")
+    args = parser.parse_args()
+
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+
+    sinks = {
+        "fast": lambda: io.StringIO(),
+        "slow": lambda: SlowStream(args.slow_write),
+    }
+    report: Dict[str, Dict[str, float]] = {}
+    for name, (play, mode, json_output, rate_limit) in CASES.items():
+        report[name] = {
+            sink: bench_case(play, mode, json_output, rate_limit, make_stream(), args)
+            for sink, make_stream in sinks.items()
+        }
+
+    print(f"\n{args.queue} queued songs (microseconds of logging per command)")
+    print(f"{'case':<22}{'fast console':>14}{'slow console':>14}")
+    for name, timings in report.items():
+        print(f"{name:<22}{timings['fast']:>14.1f}{timings['slow']:>14.1f}")
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
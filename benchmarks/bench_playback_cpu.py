@@ -0,0 +1,138 @@
+"""
+Compare the per-stream CPU cost of the PCM and Opus playback pipelines.
+
+Generates a local Opus file with ffmpeg, then drains it through each kind of
+track source as fast as possible, recording the CPU used by this process
+(reading, volume scaling and, for PCM, Opus encoding) and by ffmpeg itself.
+Costs are reported as a percentage of one core per real-time stream.
+
+Run from the repository root (needs ffmpeg on the PATH, and libopus for the
+PCM pipeline's encoding step):
+
+    python -m benchmarks.bench_playback_cpu [--seconds 120] [--json out.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import resource
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+import discord
+
+from src.cogs.music_bot.parse_youtube_input.extract_from_youtube import (
+    OpusYtdlSource,
+    YtdlSource,
+)
+from src.cogs.music_bot.parse_youtube_input.video_info import VideoInfo
+
+
+def generate_sample(path: Path, seconds: int) -> None:
+    subprocess.run(
+        [
+            "ffmpeg", "-y", "-loglevel", "error",
+            "-f", "lavfi", "-i", f"sine=frequency=440:duration={seconds}",
+            "-ac", "2", "-c:a", "libopus", "-b:a", "128k", str(path),
+        ],
+        check=True,
+    )  # fmt: skip
+
+
+def load_encoder() -> Optional[discord.opus.Encoder]:
+    """The encoder the voice client would use for PCM sources, if libopus loads."""
+    try:
+        discord.opus._load_default()
+        return discord.opus.Encoder() if discord.opus.is_loaded() else None
+    except Exception:
+        return None
+
+
+def drain(source, encode: Optional[Callable[[bytes], bytes]]) -> int:
+    frames = 0
+    while frame := source.read():
+        if encode is not None:
+            encode(frame)
+        frames += 1
+    return frames
+
+
+def children_cpu() -> float:
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def measure(create_source: Callable[[], object], encoder) -> Dict[str, float]:
+    encode = None
+    if encoder is not None:
+        encode = lambda frame: encoder.encode(frame, encoder.SAMPLES_PER_FRAME)
+
+    wall, cpu, ffmpeg_cpu = time.perf_counter(), time.process_time(), children_cpu()
+    source = create_source()
+    frames = drain(source, None if source.is_opus() else encode)
+    # Cleaning up reaps ffmpeg, so its CPU time shows up in RUSAGE_CHILDREN.
+    source.cleanup()
+
+    audio_seconds = frames * discord.opus.Encoder.FRAME_LENGTH / 1000
+    python_cpu = time.process_time() - cpu
+    ffmpeg_cpu = children_cpu() - ffmpeg_cpu
+    return {
+        "audio_seconds": audio_seconds,
+        "wall_seconds": time.perf_counter() - wall,
+        "python_core_percent": 100 * python_cpu / audio_seconds,
+        "ffmpeg_core_percent": 100 * ffmpeg_cpu / audio_seconds,
+        "total_core_percent": 100 * (python_cpu + ffmpeg_cpu) / audio_seconds,
+    }
+
+
+def bench(path: Path) -> Dict[str, Dict[str, float]]:
+    video_info = VideoInfo.model_construct(
+        title=path.name, stream_url=str(path), webpage_url=str(path)
+    )
+    pipelines = {
+        "pcm": lambda: YtdlSource.from_video_info(video_info, volume=0.5),
+        "opus_transcode": lambda: OpusYtdlSource.from_video_info(
+            video_info, volume=0.5, codec="opus"
+        ),
+        "opus_passthrough": lambda: OpusYtdlSource.from_video_info(
+            video_info, volume=1.0, codec="opus"
+        ),
+    }
+
+    encoder = load_encoder()
+    if encoder is None:
+        print("libopus couldn't be loaded: PCM results exclude Opus encoding.")
+    return {name: measure(create, encoder) for name, create in pipelines.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seconds", type=int, default=120)
+    parser.add_argument("--json", help="Write the results to this file as JSON.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        sample = Path(directory) / "sample.webm"
+        generate_sample(sample, args.seconds)
+        report = bench(sample)
+
+    print(f"\n{args.seconds}s of audio (% of one core per real-time stream)")
+    print(f"{'pipeline':<18}{'python':>10}{'ffmpeg':>10}{'total':>10}")
+    for name, result in report.items():
+        print(
+            f"{name:<18}{result['python_core_percent']:>10.2f}"
+            f"{result['ffmpeg_core_percent']:>10.2f}"
+            f"{result['total_core_percent']:>10.2f}"
+        )
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
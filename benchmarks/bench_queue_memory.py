@@ -0,0 +1,162 @@
+"""
+Measure the memory each queued track costs, before and after interning.
+
+Queues the same set of songs in every guild, as happens when a few hit songs
+are popular across a bot's servers, and reports the bytes allocated per
+queue entry. "before" is the previous entry: its own VideoInfo per queue
+and references to the requester and channel objects; "after" is the slotted
+QueuedTrack sharing one interned VideoInfo per song.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_queue_memory [--guilds 200] [--songs 20]
+        [--json out.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+from types import SimpleNamespace
+from typing import Callable, Dict, List
+
+from src.cogs.music_bot.parse_youtube_input.video_info import VideoInfo
+from src.cogs.music_bot.queued_track import QueuedTrack
+
+
+class LegacyQueuedTrack:
+    """The previous queue entry's attributes, without __slots__ or interning."""
+
+    def __init__(self, video_info: VideoInfo, *, requester, channel, guild_id: int):
+        self.video_info = video_info
+        self.requester = requester
+        self.channel = channel
+        self.guild_id = guild_id
+        self.resolved_at = time.time()
+        self._video_id = None
+        self._title = None
+        self._duration = None
+
+
+def make_info(song: int) -> Dict[str, object]:
+    video_id = f"video{song:06d}"
+    return {
+        "id": video_id,
+        "title": f"Artist {song} - A Popular Song (Official Music Video)",
+        "thumbnail": f"https://i.ytimg.com/vi/{video_id}/maxresdefault.jpg",
+        "duration": 212,
+        "webpage_url": f"https://www.youtube.com/watch?v={video_id}",
+        "url": (
+            "https://rr3---sn-aigl6nzr.googlevideo.com/videoplayback?expire=1735000000"
+            f"&id=o-{video_id}&itag=251&source=youtube&mime=audio%2Fwebm&sig=" + "A" * 120
+        ),
+        "view_count": 1_600_000_000,
+        "upload_date": "20091025",
+        "acodec": "opus",
+        "filesize": 3_451_234,
+        "format_id": "251",
+        "quality": 3.0,
+    }
+
+
+def object_bytes(entry: object) -> int:
+    """The size of an entry object itself, including its __dict__ if it has one."""
+    size = sys.getsizeof(entry)
+    if hasattr(entry, "__dict__"):
+        size += sys.getsizeof(entry.__dict__)
+    return size
+
+
+def bytes_per_entry(build: Callable[[], List[object]], entries: int) -> float:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        queues = build()
+        gc.collect()
+        allocated = tracemalloc.get_traced_memory()[0] - baseline
+    finally:
+        tracemalloc.stop()
+    del queues
+    return allocated / entries
+
+
+def bench(guilds: int, songs: int) -> Dict[str, float]:
+    infos = [make_info(song) for song in range(songs)]
+    # Members and channels are cached by discord.py whether or not a track
+    # refers to them, so they aren't counted against either entry type.
+    members = [SimpleNamespace(id=guild) for guild in range(guilds)]
+    channels = [SimpleNamespace(id=guild) for guild in range(guilds)]
+
+    def before() -> List[object]:
+        # Each !play extracted (or read from the cache) its own VideoInfo.
+        return [
+            [
+                LegacyQueuedTrack(
+                    VideoInfo.parse_video_information(info, download_info=True),
+                    requester=members[guild],
+                    channel=channels[guild],
+                    guild_id=guild,
+                )
+                for info in infos
+            ]
+            for guild in range(guilds)
+        ]
+
+    def after() -> List[object]:
+        return [
+            [
+                QueuedTrack(
+                    VideoInfo.parse_video_information(info, download_info=True),
+                    requester_id=members[guild].id,
+                    channel_id=channels[guild].id,
+                    guild_id=guild,
+                )
+                for info in infos
+            ]
+            for guild in range(guilds)
+        ]
+
+    entries = guilds * songs
+    sample = make_info(0)
+    return {
+        "guilds": guilds,
+        "songs": songs,
+        "before_bytes_per_entry": bytes_per_entry(before, entries),
+        "after_bytes_per_entry": bytes_per_entry(after, entries),
+        "before_entry_object_bytes": object_bytes(
+            LegacyQueuedTrack(None, requester=None, channel=None, guild_id=0)
+        ),
+        "after_entry_object_bytes": object_bytes(
+            QueuedTrack(None, requester_id=0, channel_id=0, video_id=sample["id"])
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--guilds", type=int, default=200)
+    parser.add_argument("--songs", type=int, default=20, help="Songs queued per guild.")
+    parser.add_argument("--json", help="Write the results to this file as JSON.")
+    args = parser.parse_args()
+
+    result = bench(args.guilds, args.songs)
+    print(f"{args.guilds} guilds x {args.songs} songs")
+    print(f"{'':<8}{'bytes/entry':>14}{'entry object':>14}")
+    for name in ("before", "after"):
+        print(
+            f"{name:<8}{result[f'{name}_bytes_per_entry']:>14.0f}"
+            f"{result[f'{name}_entry_object_bytes']:>14}"
+        )
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(result, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark SongQueue operations against the previous snapshot-and-rebuild design.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_song_queue [--sizes 10000 100000] [--json out.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import timeit
+from collections import deque
+from types import SimpleNamespace
+from typing import Callable, Dict, List
+
+from src.cogs.music_bot.song_queue import SongQueue
+
+
+class SnapshotSongQueue(asyncio.Queue):
+    """The original SongQueue internals: copy the deque, then rebuild it."""
+
+    def __getitem__(self, index):
+        return list(self._queue)[index]
+
+    def remove(self, index: int):
+        items = list(self._queue)
+        del items[index]
+        self._queue = deque(items)
+
+    def move_to_front(self, index: int):
+        items = list(self._queue)
+        items.insert(0, items.pop(index))
+        self._queue = deque(items)
+
+    def contains_video(self, video_id: str) -> bool:
+        return any(song.video_id == video_id for song in self._queue)
+
+
+def make_songs(size: int) -> List[SimpleNamespace]:
+    return [SimpleNamespace(video_id=f"video-{n}", duration=200) for n in range(size)]
+
+
+def build(queue_cls, songs) -> asyncio.Queue:
+    queue = queue_cls()
+    for song in songs:
+        queue.put_nowait(song)
+    return queue
+
+
+def operations(queue, size: int, rng: random.Random) -> Dict[str, Callable[[], None]]:
+    def refill():
+        queue.put_nowait(SimpleNamespace(video_id="refill", duration=200))
+
+    return {
+        "index": lambda: queue[rng.randrange(size)],
+        "queue_page": lambda: queue[size // 2 : size // 2 + 10],
+        "remove": lambda: (queue.remove(rng.randrange(size - 1)), refill()),
+        "move_to_front": lambda: queue.move_to_front(rng.randrange(size)),
+        "contains_video": lambda: queue.contains_video(f"video-{rng.randrange(size)}"),
+    }
+
+
+def bench(size: int, repeats: int) -> Dict[str, Dict[str, float]]:
+    songs = make_songs(size)
+    results: Dict[str, Dict[str, float]] = {}
+    for name, queue_cls in (("indexed", SongQueue), ("snapshot", SnapshotSongQueue)):
+        queue = build(queue_cls, songs)
+        rng = random.Random(size)
+        for operation, fn in operations(queue, size, rng).items():
+            seconds = min(timeit.repeat(fn, number=repeats, repeat=3)) / repeats
+            results.setdefault(operation, {})[name] = seconds * 1e6
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeats", type=int, default=200)
+    parser.add_argument("--json", help="Write the results to this file as JSON.")
+    args = parser.parse_args()
+
+    report = {}
+    for size in args.sizes:
+        results = bench(size, args.repeats)
+        report[size] = results
+        print(f"\n{size:,} queued songs (microseconds per operation)")
+        print(f"{'operation':<16}{'indexed':>12}{'snapshot':>12}{'speedup':>10}")
+        for operation, timings in results.items():
+            speedup = timings["snapshot"] / timings["indexed"]
+            print(
+                f"{operation:<16}{timings['indexed']:>12.2f}"
+                f"{timings['snapshot']:>12.2f}{speedup:>9.1f}x"
+            )
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
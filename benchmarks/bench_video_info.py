@@ -0,0 +1,244 @@
+"""
+Benchmark building VideoInfo from realistic yt-dlp info dicts.
+
+Compares parsing the full info dict (the previous path), trimming it first,
+and the trusted path used for metadata cache entries, along with the cost of
+an eagerly formatted debug log line. Memory is reported as the peak while
+parsing, the bytes pickled back from an extraction worker process, and the
+bytes retained per parsed VideoInfo.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_video_info [--formats 30] [--repeats 2000]
+        [--json out.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import pickle
+import timeit
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from src.cogs.music_bot.parse_youtube_input.metadata_cache import trim_info
+from src.cogs.music_bot.parse_youtube_input.video_info import VideoInfo
+
+logger = logging.getLogger(__name__)
+
+LANGUAGES = 150
+CAPTION_FORMATS = ("json3", "srv1", "srv2", "srv3", "ttml", "vtt", "srt")
+
+
+def stream_url(video_id: str, format_id: str) -> str:
+    return (
+        f"https://rr3---sn-aigl6nzr.googlevideo.com/videoplayback?expire=1735000000"
+        f"&ei=abcdefgh&ip=203.0.113.7&id=o-{video_id}&itag={format_id}"
+        "&source=youtube&requiressl=yes&mime=audio%2Fwebm&gir=yes&clen=3451234"
+        "&dur=212.061&lmt=1714000000000000&keepalive=yes&c=IOS&sig=" + "A" * 120
+    )
+
+
+def make_format(video_id: str, n: int) -> Dict[str, Any]:
+    format_id = str(100 + n)
+    return {
+        "format_id": format_id,
+        "format_note": "medium",
+        "ext": "webm",
+        "protocol": "https",
+        "acodec": "opus",
+        "vcodec": "none" if n < 5 else "vp9",
+        "url": stream_url(video_id, format_id),
+        "width": None if n < 5 else 256 * n,
+        "height": None if n < 5 else 144 * n,
+        "fps": None if n < 5 else 30,
+        "audio_channels": 2,
+        "asr": 48000,
+        "filesize": 3_451_234 + n,
+        "tbr": 130.2 + n,
+        "abr": 130.2,
+        "quality": float(n),
+        "has_drm": False,
+        "source_preference": -1,
+        "language": "en",
+        "language_preference": -1,
+        "preference": None,
+        "dynamic_range": None if n < 5 else "SDR",
+        "container": "webm_dash",
+        "downloader_options": {"http_chunk_size": 10485760},
+        "http_headers": {
+            "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36",
+            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9",
+            "Accept-Language": "en-us,en;q=0.5",
+            "Sec-Fetch-Mode": "navigate",
+        },
+        "format": f"{format_id} - audio only (medium)",
+        "resolution": "audio only" if n < 5 else f"{256 * n}x{144 * n}",
+        "aspect_ratio": None if n < 5 else 1.78,
+        "filesize_approx": None,
+        "vbr": 0 if n < 5 else 500.0,
+    }
+
+
+def make_info(video_id: str = "dQw4w9WgXcQ", formats: int = 30) -> Dict[str, Any]:
+    """An info dict shaped like yt-dlp's output for a typical music video."""
+    all_formats = [make_format(video_id, n) for n in range(formats)]
+    captions = {
+        f"l{n}": [
+            {
+                "ext": ext,
+                "url": f"https://www.youtube.com/api/timedtext?v={video_id}&lang=l{n}"
+                f"&fmt={ext}&xorb=2&xobt=3&xovt=3&caps=asr&opi=112496729",
+                "name": f"Language {n}",
+            }
+            for ext in CAPTION_FORMATS
+        ]
+        for n in range(LANGUAGES)
+    }
+    return {
+        "id": video_id,
+        "title": "Rick Astley - Never Gonna Give You Up (Official Music Video)",
+        "formats": all_formats,
+        "thumbnails": [
+            {
+                "url": f"https://i.ytimg.com/vi/{video_id}/{n}.jpg",
+                "preference": -n,
+                "id": str(n),
+                "height": 90 + n,
+                "width": 120 + n,
+                "resolution": f"{120 + n}x{90 + n}",
+            }
+            for n in range(40)
+        ],
+        "thumbnail": f"https://i.ytimg.com/vi/{video_id}/maxresdefault.jpg",
+        "description": "The official video for “Never Gonna Give You Up”. " * 40,
+        "channel_id": "UCuAXFkgsw1L7xaCfnd5JJOw",
+        "channel_url": "https://www.youtube.com/channel/UCuAXFkgsw1L7xaCfnd5JJOw",
+        "duration": 212,
+        "view_count": 1_600_000_000,
+        "average_rating": None,
+        "age_limit": 0,
+        "webpage_url": f"https://www.youtube.com/watch?v={video_id}",
+        "categories": ["Music"],
+        "tags": [f"tag {n}" for n in range(30)],
+        "playable_in_embed": True,
+        "live_status": "not_live",
+        "automatic_captions": captions,
+        "subtitles": {"en": captions["l0"]},
+        "comment_count": 2_300_000,
+        "chapters": None,
+        "heatmap": [
+            {"start_time": n * 2.12, "end_time": (n + 1) * 2.12, "value": n / 100}
+            for n in range(100)
+        ],
+        "like_count": 18_000_000,
+        "channel": "Rick Astley",
+        "upload_date": "20091025",
+        "requested_formats": None,
+        "format_id": all_formats[2]["format_id"],
+        "url": all_formats[2]["url"],
+        "ext": "webm",
+        "acodec": "opus",
+        "filesize": all_formats[2]["filesize"],
+        "quality": 2.0,
+        "http_headers": all_formats[2]["http_headers"],
+    }
+
+
+def peak_bytes(fn: Callable[[], Any]) -> int:
+    """Peak memory allocated while running `fn`, beyond what it started with."""
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        fn()
+        return tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+
+
+def retained_bytes(build: Callable[[], Any], count: int = 200) -> float:
+    """Bytes still held per object after building `count` of them."""
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        objects = [build() for _ in range(count)]
+        retained = tracemalloc.get_traced_memory()[0] - baseline
+    finally:
+        tracemalloc.stop()
+    del objects
+    return retained / count
+
+
+def bench(formats: int, repeats: int) -> Dict[str, Dict[str, float]]:
+    full = make_info(formats=formats)
+    trimmed = trim_info(full)
+    cases: Dict[str, Callable[[], Any]] = {
+        "validate_full": lambda: VideoInfo.parse_video_information(
+            full, download_info=True
+        ),
+        "trim_then_validate": lambda: VideoInfo.parse_video_information(
+            trim_info(full), download_info=True
+        ),
+        "trusted_cache_entry": lambda: VideoInfo.from_trusted_info(
+            trimmed, download_info=True
+        ),
+        # Debug logging is off in every case, as it is in production.
+        "debug_log_fstring": lambda: logger.debug(f"Video information: {full}"),
+        "debug_log_lazy": lambda: logger.debug("Video information: %s", full),
+    }
+
+    results: Dict[str, Dict[str, float]] = {}
+    for name, fn in cases.items():
+        seconds = min(timeit.repeat(fn, number=repeats, repeat=3)) / repeats
+        results[name] = {"microseconds": seconds * 1e6, "peak_bytes": peak_bytes(fn)}
+
+    results["validate_full"]["pickled_bytes"] = len(pickle.dumps(full))
+    results["trim_then_validate"]["pickled_bytes"] = len(pickle.dumps(trimmed))
+    results["validate_full"]["retained_bytes"] = retained_bytes(
+        lambda: VideoInfo.parse_video_information(trimmed, download_info=True)
+    )
+    results["trusted_cache_entry"]["retained_bytes"] = retained_bytes(
+        lambda: VideoInfo.from_trusted_info(trimmed, download_info=True)
+    )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--formats", type=int, default=30, help="Formats in each info dict."
+    )
+    parser.add_argument("--repeats", type=int, default=2000)
+    parser.add_argument("--json", help="Write the results to this file as JSON.")
+    args = parser.parse_args()
+
+    results = bench(args.formats, args.repeats)
+
+    print(
+        f"{'case':<22}{'µs/call':>10}{'peak KiB':>10}{'pickled KiB':>13}"
+        f"{'retained B':>12}"
+    )
+    for name, result in results.items():
+        pickled = result.get("pickled_bytes")
+        retained = result.get("retained_bytes")
+        print(
+            f"{name:<22}{result['microseconds']:>10.1f}"
+            f"{result['peak_bytes'] / 1024:>10.1f}"
+            f"{pickled / 1024 if pickled else float('nan'):>13.1f}"
+            f"{retained if retained else float('nan'):>12.0f}"
+        )
+
+    if args.json:
+        report: List[Dict[str, Any]] = [
+            {"case": name, "formats": args.formats, **result}
+            for name, result in results.items()
+        ]
+        with open(args.json, "w") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
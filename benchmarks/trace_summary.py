@@ -0,0 +1,41 @@
+"""
+Summarise the spans exported by the tracer: the count and p50/p90/p99
+duration of each stage of the play pipeline, slowest first.
+
+Run from the repository root:
+
+    python -m benchmarks.trace_summary [.cache/traces.jsonl] [--json out.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from dataclasses import asdict
+
+from src.tracing import TRACER, load_durations, summarize
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("path", nargs="?", default=TRACER.path or ".cache/traces.jsonl")
+    parser.add_argument("--json", help="Write the summary to this file as JSON.")
+    args = parser.parse_args()
+
+    summary = summarize(load_durations(args.path))
+    stages = sorted(summary.items(), key=lambda item: -item[1].p50)
+
+    print(f"{'stage':<24}{'count':>8}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}")
+    for name, stage in stages:
+        print(
+            f"{name:<24}{stage.count:>8}{stage.p50 * 1000:>10.1f}"
+            f"{stage.p90 * 1000:>10.1f}{stage.p99 * 1000:>10.1f}"
+        )
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump({name: asdict(stage) for name, stage in stages}, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
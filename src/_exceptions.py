@@ -1,6 +1,20 @@
+from src.metrics import REGISTRY
+
+ERRORS = REGISTRY.counter(
+    "gimlibot_errors_total",
+    "Errors handled by the bot, by exception type.",
+    labelnames=("type",),
+)
+
+
 class VoiceError(Exception):
     pass
 
 
 class YTDLError(Exception):
     pass
+
+
+def record_error(error: BaseException) -> None:
+    """Count a handled error towards the error metrics."""
+    ERRORS.inc(type=type(error).__name__)
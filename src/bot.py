@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import logging
+from typing import List, Optional, Sequence
+
+import discord
+from discord.ext import commands
+
+from src.cogs.metrics_cog import MetricsCog
+from src.cogs.music_cog import MusicCog
+from src.cogs.test_cog import GifCog
+
+logger = logging.getLogger(__name__)
+
+COGS = [GifCog, MusicCog]
+METRICS_CONFIG = "config/metrics.json"
+
+
+async def load_cogs(bot, cogs: List[commands.Cog]):
+    for cog in cogs:
+        await bot.add_cog(cog(bot))
+        logger.info(f"{cog.__name__} loaded successfully.")
+
+
+async def start_metrics(bot: commands.Bot, *, port_offset: int = 0) -> MetricsCog:
+    """
+    Start the event loop lag monitor, and the metrics endpoint if it's enabled,
+    until the bot closes.
+    """
+    cog = MetricsCog(METRICS_CONFIG, port_offset=port_offset)
+    await bot.add_cog(cog)
+    return cog
+
+
+def create_bot(
+    *,
+    shard_ids: Optional[Sequence[int]] = None,
+    shard_count: Optional[int] = None,
+) -> commands.Bot:
+    """
+    Create the bot. Given shard IDs, it only runs those gateway shards (out of
+    `shard_count`), so a cluster of processes can each take a subset.
+    """
+    intents = discord.Intents.default()
+    intents.message_content = True
+    intents.guilds = True
+    intents.voice_states = True
+
+    if shard_ids is not None:
+        bot = commands.AutoShardedBot(
+            command_prefix="!",
+            intents=intents,
+            shard_ids=list(shard_ids),
+            shard_count=shard_count,
+        )
+    else:
+        bot = commands.Bot(command_prefix="!", intents=intents)
+
+    @bot.event
+    async def on_ready():
+        logger.info(f"Bot is online! Logged in as {bot.user.name}")
+
+    @bot.event
+    async def on_command_error(ctx, error):
+        """Logs command errors with full traceback."""
+        if isinstance(error, commands.CommandNotFound):
+            logger.warning(f"Command not found: {ctx.message.content}")
+        else:
+            logger.error("An error occurred during command execution:", exc_info=error)
+            await ctx.send("An unexpected error occurred. Check the logs for details.")
+
+    return bot
@@ -0,0 +1,379 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import queue
+import resource
+import signal
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, List, Optional
+
+from discord.ext import commands
+from discord.http import HTTPClient
+
+from src.bot import COGS, create_bot, load_cogs, start_metrics
+from src.event_loop import run
+from src.initialisation import check_and_initialise_opus
+from src.parse_json import parse_json
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ClusterConfig:
+    workers: int = 1
+    # None asks Discord for its recommended shard count (at least one per worker).
+    shard_count: Optional[int] = None
+    heartbeat_interval: float = 10
+    heartbeat_timeout: float = 60
+    # Discord allows one shard to identify every 5 seconds (for most bots).
+    identify_interval: float = 5
+    restart_backoff: float = 5
+    max_restart_backoff: float = 300
+
+    @classmethod
+    def from_config(cls, config_path: str) -> ClusterConfig:
+        return cls(**parse_json(config_path))
+
+
+@dataclass
+class HealthReport:
+    """A worker's periodic heartbeat, sent to the supervisor."""
+
+    worker_id: int
+    pid: int
+    shard_ids: List[int]
+    ready: bool
+    guilds: Dict[int, int]
+    voice_states: Dict[int, int]
+    latencies: Dict[int, float]
+    max_rss_bytes: int
+    threads: int
+    sent_at: float = field(default_factory=time.time)
+
+    def __str__(self) -> str:
+        latency = max(self.latencies.values(), default=float("nan"))
+        return (
+            f"worker={self.worker_id} pid={self.pid} shards={self.shard_ids} "
+            f"ready={self.ready} guilds={sum(self.guilds.values())} "
+            f"voice_states={sum(self.voice_states.values())} "
+            f"max_latency={latency * 1000:.0f}ms "
+            f"max_rss={self.max_rss_bytes / 2**20:.0f}MiB threads={self.threads}"
+        )
+
+
+def assign_shards(shard_count: int, workers: int) -> List[List[int]]:
+    """Split shard IDs into contiguous, near-equal runs, one per worker."""
+    if shard_count < workers:
+        raise ValueError(f"Can't split {shard_count} shards across {workers} workers.")
+
+    per_worker, extra = divmod(shard_count, workers)
+    assignments, start = [], 0
+    for worker_id in range(workers):
+        size = per_worker + (1 if worker_id < extra else 0)
+        assignments.append(list(range(start, start + size)))
+        start += size
+    return assignments
+
+
+class HealthReporter:
+    """Periodically report a worker's bot's health to the supervisor."""
+
+    def __init__(
+        self,
+        bot: commands.AutoShardedBot,
+        *,
+        worker_id: int,
+        reports: multiprocessing.Queue,
+        interval: float,
+    ):
+        self.bot = bot
+        self.worker_id = worker_id
+        self.reports = reports
+        self.interval = interval
+
+    def report(self) -> HealthReport:
+        music_cog = self.bot.get_cog("MusicCog")
+        return HealthReport(
+            worker_id=self.worker_id,
+            pid=os.getpid(),
+            shard_ids=list(self.bot.shard_ids or []),
+            ready=self.bot.is_ready(),
+            guilds=dict(Counter(guild.shard_id for guild in self.bot.guilds)),
+            voice_states=music_cog.voice_state_counts() if music_cog else {},
+            latencies=dict(self.bot.latencies),
+            # ru_maxrss is in KiB on Linux.
+            max_rss_bytes=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+            threads=threading.active_count(),
+        )
+
+    async def run(self):
+        while True:
+            self.reports.put(self.report())
+            await asyncio.sleep(self.interval)
+
+
+def _run_worker(
+    worker_id: int,
+    shard_ids: List[int],
+    shard_count: int,
+    reports: multiprocessing.Queue,
+    heartbeat_interval: float,
+):
+    """The entry point of a worker process."""
+    try:
+        run(
+            _worker_main(worker_id, shard_ids, shard_count, reports, heartbeat_interval)
+        )
+    except KeyboardInterrupt:
+        pass
+
+
+async def _worker_main(
+    worker_id: int,
+    shard_ids: List[int],
+    shard_count: int,
+    reports: multiprocessing.Queue,
+    heartbeat_interval: float,
+):
+    check_and_initialise_opus()
+    bot = create_bot(shard_ids=shard_ids, shard_count=shard_count)
+    await load_cogs(bot, COGS)
+    # Each worker serves its own metrics, on the configured port + its ID.
+    await start_metrics(bot, port_offset=worker_id)
+    logger.info(f"Worker {worker_id} starting shards {shard_ids} of {shard_count}.")
+
+    # The supervisor stops workers with SIGTERM; leave voice channels cleanly.
+    loop = asyncio.get_running_loop()
+    try:
+        loop.add_signal_handler(signal.SIGTERM, lambda: loop.create_task(bot.close()))
+    except NotImplementedError:
+        pass
+
+    reporter = HealthReporter(
+        bot, worker_id=worker_id, reports=reports, interval=heartbeat_interval
+    )
+    heartbeat = asyncio.create_task(reporter.run())
+    try:
+        async with bot:
+            await bot.start(os.environ["TOKEN"])
+    finally:
+        heartbeat.cancel()
+
+
+async def fetch_recommended_shard_count(token: str) -> int:
+    """Ask Discord how many shards the bot should run."""
+    http = HTTPClient(asyncio.get_running_loop())
+    try:
+        await http.static_login(token)
+        shard_count, _ = await http.get_bot_gateway()
+    finally:
+        await http.close()
+    return shard_count
+
+
+@dataclass(eq=False)
+class WorkerHandle:
+    worker_id: int
+    shard_ids: List[int]
+    process: Optional[multiprocessing.Process] = None
+    started_at: float = 0.0
+    last_report: Optional[HealthReport] = None
+    last_seen: float = 0.0
+    restarts: int = 0
+    backoff: float = 0.0
+    not_before: float = 0.0
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+
+class Supervisor:
+    """
+    Run the bot as a cluster of worker processes, each running a contiguous
+    subset of the gateway shards (and so the voice states of those shards'
+    guilds), so playback capacity grows with the number of cores.
+
+    Workers send a HealthReport every `heartbeat_interval`. A worker that
+    exits, or stops reporting for `heartbeat_timeout`, is restarted with
+    exponential backoff. Starts are staggered to respect Discord's identify
+    rate limit.
+    """
+
+    SUMMARY_INTERVAL = 60  # How often to log every worker's latest report
+    POLL_INTERVAL = 1
+
+    def __init__(
+        self,
+        config: ClusterConfig,
+        *,
+        token: Optional[str],
+        start_process: Optional[Callable[[WorkerHandle], multiprocessing.Process]] = None,
+    ):
+        if config.workers < 1:
+            raise ValueError("A cluster needs at least one worker.")
+
+        self.config = config
+        self.token = token
+        self.workers: List[WorkerHandle] = []
+        self.shard_count: Optional[int] = config.shard_count
+
+        self._context = multiprocessing.get_context("spawn")
+        self._reports = self._context.Queue()
+        self._start_process = start_process or self._spawn
+        self._pending: Deque[WorkerHandle] = deque()
+        self._next_start_at = 0.0
+        self._stopping = threading.Event()
+
+    def run(self):
+        """Start the cluster and supervise it until interrupted or terminated."""
+        if not self.token:
+            logger.error("No bot token found. Set the TOKEN environment variable.")
+            return
+
+        if self.shard_count is None:
+            recommended = asyncio.run(fetch_recommended_shard_count(self.token))
+            self.shard_count = max(recommended, self.config.workers)
+            logger.info(f"Using {self.shard_count} shards ({recommended} recommended).")
+
+        signal.signal(signal.SIGTERM, lambda *_: self._stopping.set())
+        self.plan(self.shard_count)
+        last_summary = time.monotonic()
+        try:
+            while not self._stopping.is_set():
+                now = time.monotonic()
+                self.drain_reports(now)
+                self.check_workers(now)
+                self.start_pending(now)
+
+                if now - last_summary >= self.SUMMARY_INTERVAL:
+                    self.log_summary()
+                    last_summary = now
+                self._stopping.wait(self.POLL_INTERVAL)
+        finally:
+            self.stop()
+
+    def plan(self, shard_count: int):
+        """Assign shards to workers and queue them all to start."""
+        self.workers = [
+            WorkerHandle(worker_id=worker_id, shard_ids=shard_ids)
+            for worker_id, shard_ids in enumerate(
+                assign_shards(shard_count, self.config.workers)
+            )
+        ]
+        self._pending.extend(self.workers)
+        logger.info(
+            f"Running {shard_count} shards across {len(self.workers)} workers: "
+            f"{[worker.shard_ids for worker in self.workers]}"
+        )
+
+    def start_pending(self, now: float):
+        """Start the next queued worker, once the identify rate limit allows."""
+        if not self._pending or now < self._next_start_at:
+            return
+        worker = self._pending[0]
+        if now < worker.not_before:
+            return
+
+        self._pending.popleft()
+        worker.process = self._start_process(worker)
+        worker.started_at = worker.last_seen = now
+        # The worker's shards identify one at a time, so hold the next worker back.
+        self._next_start_at = now + self.config.identify_interval * len(worker.shard_ids)
+        logger.info(
+            f"Started worker {worker.worker_id} (pid {worker.process.pid}) "
+            f"for shards {worker.shard_ids}."
+        )
+
+    def drain_reports(self, now: float):
+        while True:
+            try:
+                report: HealthReport = self._reports.get_nowait()
+            except queue.Empty:
+                return
+            worker = self.workers[report.worker_id]
+            # Ignore stragglers from a process that has since been replaced.
+            if worker.process is not None and worker.process.pid == report.pid:
+                worker.last_report = report
+                worker.last_seen = now
+                logger.debug(f"Health report: {report}")
+
+    def check_workers(self, now: float):
+        """Restart workers that have exited or stopped sending heartbeats."""
+        for worker in self.workers:
+            if worker.process is None or worker in self._pending:
+                continue
+
+            if not worker.alive:
+                reason = f"exited with code {worker.process.exitcode}"
+            elif now - worker.last_seen > self.config.heartbeat_timeout:
+                reason = f"sent no heartbeat for {now - worker.last_seen:.0f}s"
+            else:
+                continue
+
+            logger.error(f"Worker {worker.worker_id} {reason}; restarting it.")
+            self._terminate(worker)
+            self._schedule_restart(worker, now)
+
+    def health(self) -> Dict[int, Optional[HealthReport]]:
+        """The latest health report from each worker."""
+        return {worker.worker_id: worker.last_report for worker in self.workers}
+
+    def log_summary(self):
+        for worker in self.workers:
+            report = worker.last_report or "no reports yet"
+            logger.info(
+                f"Worker {worker.worker_id} (restarts={worker.restarts}): {report}"
+            )
+
+    def stop(self):
+        self._stopping.set()
+        for worker in self.workers:
+            self._terminate(worker)
+        logger.info("Cluster stopped.")
+
+    def _schedule_restart(self, worker: WorkerHandle, now: float):
+        uptime = now - worker.started_at
+        if uptime >= self.config.max_restart_backoff or not worker.backoff:
+            # A worker that ran for a good while starts over from a short backoff.
+            worker.backoff = self.config.restart_backoff
+        else:
+            worker.backoff = min(worker.backoff * 2, self.config.max_restart_backoff)
+
+        worker.restarts += 1
+        worker.last_report = None
+        worker.not_before = now + worker.backoff
+        self._pending.append(worker)
+
+    def _terminate(self, worker: WorkerHandle, timeout: float = 10):
+        process = worker.process
+        if process is None or not process.is_alive():
+            return
+        process.terminate()
+        process.join(timeout)
+        if process.is_alive():
+            logger.warning(f"Worker {worker.worker_id} didn't stop; killing it.")
+            process.kill()
+            process.join()
+
+    def _spawn(self, worker: WorkerHandle) -> multiprocessing.Process:
+        process = self._context.Process(
+            target=_run_worker,
+            args=(
+                worker.worker_id,
+                worker.shard_ids,
+                self.shard_count,
+                self._reports,
+                self.config.heartbeat_interval,
+            ),
+            name=f"gimlibot-worker-{worker.worker_id}",
+            daemon=False,
+        )
+        process.start()
+        return process
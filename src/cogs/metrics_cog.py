@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import logging
+from typing import Optional
+
+from discord.ext import commands
+
+from src.loop_monitor import LoopLagMonitor
+from src.metrics_server import MetricsServer
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsCog(commands.Cog):
+    """
+    Runs the event loop lag monitor, and the metrics endpoint if it's enabled,
+    for as long as the bot does. The monitor runs either way, as it also logs
+    whatever is blocking the loop. Both are stopped when the bot closes (which
+    unloads its cogs).
+    """
+
+    def __init__(self, config_path: str, *, port_offset: int = 0):
+        self.monitor = LoopLagMonitor.from_config(config_path)
+        self.server: Optional[MetricsServer] = MetricsServer.from_config(
+            config_path, port_offset=port_offset
+        )
+
+    async def cog_load(self):
+        self.monitor.start()
+        if self.server is not None:
+            await self.server.start()
+
+    async def cog_unload(self):
+        self.monitor.stop()
+        if self.server is not None:
+            await self.server.stop()
+            logger.info("Metrics endpoint stopped.")
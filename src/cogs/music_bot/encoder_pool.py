@@ -0,0 +1,297 @@
+from __future__ import annotations
+
+import audioop
+import itertools
+import logging
+import multiprocessing
+import queue
+import struct
+import subprocess
+import threading
+from multiprocessing.connection import Connection
+from typing import Callable, Dict, List, Optional
+
+import discord
+
+from src.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+POOLED_STREAMS = REGISTRY.gauge(
+    "gimlibot_pooled_streams",
+    "Audio streams being read and encoded by the encoder pool's worker processes.",
+)
+ENCODER_WORKER_RESTARTS = REGISTRY.counter(
+    "gimlibot_encoder_worker_restarts_total",
+    "Encoder pool worker processes replaced after exiting unexpectedly.",
+)
+
+# Packets are framed as a stream ID followed by the Opus payload; an empty
+# payload marks the end of a stream.
+_HEADER = struct.Struct("<I")
+
+# Frames a worker may encode ahead of playback, and how many the player reads
+# before returning that credit to the worker.
+WINDOW = 50
+CREDIT_BATCH = 10
+
+
+class _EncodeStream(threading.Thread):
+    """
+    Worker side: read PCM from ffmpeg, scale it and encode it to Opus, sending
+    each packet to the bot process. Each stream runs on its own thread, so one
+    slow stream (or paused player) never holds up the others.
+    """
+
+    def __init__(
+        self,
+        stream_id: int,
+        args: List[str],
+        *,
+        volume: float,
+        encode: Callable[[bytes], bytes],
+        send: Callable[[int, bytes], None],
+    ):
+        super().__init__(daemon=True, name=f"encode-stream-{stream_id}")
+        self.stream_id = stream_id
+        self.args = args
+        self.volume = volume
+        self.encode = encode
+        self.send = send
+        self.credit = threading.Semaphore(WINDOW)
+        self.closed = threading.Event()
+        self._process: Optional[subprocess.Popen] = None
+
+    def run(self):
+        try:
+            self._process = subprocess.Popen(
+                self.args, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE
+            )
+            frame_size = discord.opus.Encoder.FRAME_SIZE
+            while not self.closed.is_set():
+                pcm = self._process.stdout.read(frame_size)
+                if len(pcm) != frame_size:
+                    break
+                if self.volume != 1.0:
+                    pcm = audioop.mul(pcm, 2, min(self.volume, 2.0))
+                packet = self.encode(pcm)
+
+                self.credit.acquire()
+                if self.closed.is_set():
+                    return
+                self.send(self.stream_id, packet)
+        except Exception:
+            logger.exception(f"Encoding stream {self.stream_id} failed.")
+        finally:
+            self._kill()
+
+        if not self.closed.is_set():
+            self.send(self.stream_id, b"")
+
+    def close(self):
+        self.closed.set()
+        # Wake the thread if it's waiting for credit.
+        self.credit.release()
+        self._kill()
+
+    def _kill(self):
+        if self._process is not None and self._process.poll() is None:
+            self._process.kill()
+            self._process.wait()
+
+
+def _worker_main(commands: Connection, packets: Connection, bitrate: int):
+    """The entry point of an encoder pool worker process."""
+    from src.initialisation import check_and_initialise_opus
+
+    check_and_initialise_opus()
+    send_lock = threading.Lock()
+
+    def send(stream_id: int, packet: bytes):
+        with send_lock:
+            packets.send_bytes(_HEADER.pack(stream_id) + packet)
+
+    def make_encode() -> Callable[[bytes], bytes]:
+        # Encoders keep state between frames, so each stream needs its own.
+        encoder = discord.opus.Encoder(bitrate=bitrate)
+        return lambda pcm: encoder.encode(pcm, encoder.SAMPLES_PER_FRAME)
+
+    streams: Dict[int, _EncodeStream] = {}
+    while True:
+        try:
+            command, stream_id, *args = commands.recv()
+        except EOFError:
+            break
+
+        if command == "open":
+            ffmpeg_args, volume = args
+            stream = _EncodeStream(
+                stream_id, ffmpeg_args, volume=volume, encode=make_encode(), send=send
+            )
+            streams[stream_id] = stream
+            stream.start()
+            continue
+
+        stream = streams.get(stream_id)
+        if stream is None:
+            continue
+        if command == "credit":
+            for _ in range(args[0]):
+                stream.credit.release()
+        elif command == "volume":
+            stream.volume = args[0]
+        elif command == "close":
+            streams.pop(stream_id).close()
+
+    for stream in streams.values():
+        stream.close()
+
+
+class PooledStream:
+    """
+    Bot side of a stream encoded by a pool worker. `read` hands out Opus
+    packets in order and returns credit to the worker as they are played.
+    """
+
+    def __init__(self, stream_id: int, worker: _Worker):
+        self.stream_id = stream_id
+        self.worker = worker
+        self._packets: queue.SimpleQueue[bytes] = queue.SimpleQueue()
+        self._consumed = 0
+        self._ended = False
+
+    def read(self) -> bytes:
+        """The next Opus packet, blocking until it's ready; b"" at the end."""
+        if self._ended:
+            return b""
+
+        packet = self._packets.get()
+        if not packet:
+            self._ended = True
+            return b""
+
+        self._consumed += 1
+        if self._consumed >= CREDIT_BATCH:
+            self.worker.send("credit", self.stream_id, self._consumed)
+            self._consumed = 0
+        return packet
+
+    def set_volume(self, volume: float):
+        self.worker.send("volume", self.stream_id, volume)
+
+    def close(self):
+        if self.worker.streams.pop(self.stream_id, None) is not None:
+            self.worker.send("close", self.stream_id)
+            POOLED_STREAMS.dec()
+        # Unblock a reader that is still waiting.
+        self._packets.put(b"")
+
+    def _deliver(self, packet: bytes):
+        self._packets.put(packet)
+
+
+class _Worker:
+    def __init__(self, context, bitrate: int, worker_id: int):
+        self.commands, worker_commands = context.Pipe()
+        packets, worker_packets = context.Pipe(duplex=False)
+        self.packets = packets
+        self.streams: Dict[int, PooledStream] = {}
+        self._send_lock = threading.Lock()
+
+        self.process = context.Process(
+            target=_worker_main,
+            args=(worker_commands, worker_packets, bitrate),
+            name=f"encoder-worker-{worker_id}",
+            daemon=True,
+        )
+        self.process.start()
+        # Only the worker writes packets and reads commands from these ends.
+        worker_commands.close()
+        worker_packets.close()
+
+        self._reader = threading.Thread(
+            target=self._read_packets, daemon=True, name=f"encoder-reader-{worker_id}"
+        )
+        self._reader.start()
+
+    @property
+    def alive(self) -> bool:
+        return self.process.is_alive()
+
+    def send(self, *command):
+        with self._send_lock:
+            try:
+                self.commands.send(command)
+            except (BrokenPipeError, OSError):
+                logger.warning(f"Encoder worker {self.process.name} is gone.")
+
+    def _read_packets(self):
+        # Packets are copied once out of the pipe, then routed to their stream.
+        while True:
+            try:
+                message = self.packets.recv_bytes()
+            except (EOFError, OSError):
+                break
+            (stream_id,) = _HEADER.unpack_from(message)
+            stream = self.streams.get(stream_id)
+            if stream is not None:
+                stream._deliver(message[_HEADER.size :])
+
+        # The worker died: end its streams rather than leave players hanging.
+        for stream in list(self.streams.values()):
+            stream._deliver(b"")
+
+    def shutdown(self):
+        self.commands.close()
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+
+
+class EncoderPool:
+    """
+    A pool of worker processes that read ffmpeg's PCM output, apply volume
+    and encode Opus, so none of that per-frame work competes for the bot
+    process's GIL. Each stream is assigned to the least busy worker, and the
+    encoded packets come back over that worker's pipe.
+    """
+
+    def __init__(self, *, workers: int = 2, bitrate: int = 128):
+        if workers < 1:
+            raise ValueError("An encoder pool needs at least one worker.")
+
+        self.workers = workers
+        self.bitrate = bitrate
+        self._context = multiprocessing.get_context("spawn")
+        self._workers: List[Optional[_Worker]] = [None] * workers
+        self._stream_ids = itertools.count()
+        self._lock = threading.Lock()
+
+    def open(self, args: List[str], *, volume: float) -> PooledStream:
+        """Start encoding the output of the ffmpeg command line `args`."""
+        with self._lock:
+            worker = self._least_busy_worker()
+            stream = PooledStream(next(self._stream_ids), worker)
+            worker.streams[stream.stream_id] = stream
+        worker.send("open", stream.stream_id, args, volume)
+        POOLED_STREAMS.inc()
+        return stream
+
+    def shutdown(self):
+        with self._lock:
+            for worker in self._workers:
+                if worker is not None:
+                    worker.shutdown()
+            self._workers = [None] * self.workers
+
+    def _least_busy_worker(self) -> _Worker:
+        # Workers are started on first use, and replaced if they have died.
+        for index, worker in enumerate(self._workers):
+            if worker is not None and not worker.alive:
+                logger.error(f"Encoder worker {index} exited; replacing it.")
+                ENCODER_WORKER_RESTARTS.inc()
+                worker = None
+            if worker is None:
+                self._workers[index] = _Worker(self._context, self.bitrate, index)
+
+        return min(self._workers, key=lambda worker: len(worker.streams))
@@ -0,0 +1,335 @@
+from __future__ import annotations
+
+import random
+from collections import Counter
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
+
+def _item_video_id(item: Any) -> Optional[Hashable]:
+    return getattr(item, "video_id", None)
+
+
+def _no_weight(item: Any) -> float:
+    return 0
+
+
+class _Node:
+    __slots__ = ("item", "priority", "size", "weight", "total", "left", "right")
+
+    def __init__(self, item: Any, weight: float):
+        self.item = item
+        self.priority = random.random()
+        self.size = 1
+        # Each node also carries its subtree's total weight (e.g. song duration),
+        # which gives O(log n) prefix sums over the sequence.
+        self.weight = weight
+        self.total = weight
+        self.left: Optional[_Node] = None
+        self.right: Optional[_Node] = None
+
+
+def _size(node: Optional[_Node]) -> int:
+    return node.size if node else 0
+
+
+def _total(node: Optional[_Node]) -> float:
+    return node.total if node else 0
+
+
+def _update(node: _Node) -> None:
+    node.size = 1 + _size(node.left) + _size(node.right)
+    node.total = node.weight + _total(node.left) + _total(node.right)
+
+
+def _split(node: Optional[_Node], count: int) -> Tuple[Optional[_Node], Optional[_Node]]:
+    """Split a tree into its first `count` items and the rest."""
+    if node is None:
+        return None, None
+
+    if _size(node.left) >= count:
+        left, node.left = _split(node.left, count)
+        _update(node)
+        return left, node
+
+    node.right, right = _split(node.right, count - _size(node.left) - 1)
+    _update(node)
+    return node, right
+
+
+def _merge(left: Optional[_Node], right: Optional[_Node]) -> Optional[_Node]:
+    """Concatenate two trees, all of `left` coming before all of `right`."""
+    if left is None:
+        return right
+    if right is None:
+        return left
+
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        _update(left)
+        return left
+
+    right.left = _merge(left, right.left)
+    _update(right)
+    return right
+
+
+def _build(nodes: Iterable[_Node]) -> Optional[_Node]:
+    """Build a tree from nodes in O(n), using the Cartesian tree stack method."""
+    stack: List[_Node] = []
+    for node in nodes:
+        last = None
+        while stack and stack[-1].priority < node.priority:
+            last = stack.pop()
+        node.left = last
+        if stack:
+            stack[-1].right = node
+        stack.append(node)
+
+    if not stack:
+        return None
+
+    root = stack[0]
+    # Fix up subtree sizes and totals bottom-up with an iterative post-order walk.
+    pending: List[Tuple[_Node, bool]] = [(root, False)]
+    while pending:
+        node, children_done = pending.pop()
+        if children_done:
+            _update(node)
+            continue
+        pending.append((node, True))
+        for child in (node.left, node.right):
+            if child is not None:
+                pending.append((child, False))
+    return root
+
+
+def _iter_nodes(node: Optional[_Node]) -> Iterator[_Node]:
+    stack: List[_Node] = []
+    while stack or node is not None:
+        while node is not None:
+            stack.append(node)
+            node = node.left
+        node = stack.pop()
+        yield node
+        node = node.right
+
+
+class IndexedList:
+    """
+    A list-like sequence backed by an implicit treap.
+
+    Indexed access, insertion, removal and moves are O(log n) (expected),
+    appending and popping from the front are O(log n), and membership by
+    video ID is O(1). Iteration is lazy and never copies the sequence.
+
+    Items can optionally be weighted (e.g. by duration), in which case the
+    total weight before any index is also O(log n), and the total weight per
+    `group` (e.g. per requester) is O(1).
+    """
+
+    def __init__(
+        self,
+        items: Iterable[Any] = (),
+        *,
+        key: Callable[[Any], Optional[Hashable]] = _item_video_id,
+        weight: Callable[[Any], float] = _no_weight,
+        group: Optional[Callable[[Any], Hashable]] = None,
+    ):
+        self._key = key
+        self._weight = weight
+        self._group = group
+        self._root: Optional[_Node] = None
+        self._keys: Counter = Counter()
+        self._group_weights: Dict[Hashable, float] = {}
+        self.extend(items)
+
+    def __len__(self) -> int:
+        return _size(self._root)
+
+    def __iter__(self) -> Iterator[Any]:
+        return (node.item for node in _iter_nodes(self._root))
+
+    def __repr__(self) -> str:
+        return f"IndexedList({list(self)!r})"
+
+    def __getitem__(self, index: int | slice):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return list(self)[index]
+            return self._range(start, stop)
+
+        return self._node_at(self._normalise_index(index)).item
+
+    def contains_key(self, key: Hashable) -> bool:
+        """O(1) membership check by key (by default, the item's video ID)."""
+        return self._keys[key] > 0
+
+    @property
+    def total_weight(self) -> float:
+        return _total(self._root)
+
+    def weight_before(self, index: int) -> float:
+        """The total weight of the items before `index`, in O(log n)."""
+        index = self._clamp(index)
+        node, weight = self._root, 0
+        while node is not None:
+            left_size = _size(node.left)
+            if index <= left_size:
+                node = node.left
+            else:
+                weight += _total(node.left) + node.weight
+                index -= left_size + 1
+                node = node.right
+        return weight
+
+    def group_weight(self, group: Hashable) -> float:
+        """The total weight of the items in a group, in O(1)."""
+        return self._group_weights.get(group, 0)
+
+    def refresh_weight(self, index: int) -> None:
+        """Re-read the weight of the item at `index` (e.g. once its duration is known)."""
+        node = self._node_at(self._normalise_index(index))
+        delta = self._weight(node.item) - node.weight
+        if not delta:
+            return
+
+        self._untrack(node)
+        node.weight += delta
+        self._track(node)
+        # Walk back down to the node, fixing the subtree totals on its path.
+        index, current = self._normalise_index(index), self._root
+        while current is not None:
+            current.total += delta
+            left_size = _size(current.left)
+            if index == left_size:
+                break
+            if index < left_size:
+                current = current.left
+            else:
+                index -= left_size + 1
+                current = current.right
+
+    def append(self, item: Any) -> None:
+        self._root = _merge(self._root, self._new_node(item))
+
+    def extend(self, items: Iterable[Any]) -> None:
+        self._root = _merge(self._root, _build(self._new_node(item) for item in items))
+
+    def insert(self, index: int, item: Any) -> None:
+        # Like list.insert, negative indices count from the end.
+        if index < 0:
+            index += len(self)
+        index = self._clamp(index)
+        left, right = _split(self._root, index)
+        self._root = _merge(_merge(left, self._new_node(item)), right)
+
+    def popleft(self) -> Any:
+        if self._root is None:
+            raise IndexError("pop from an empty IndexedList")
+        return self.pop(0)
+
+    def pop(self, index: int = -1) -> Any:
+        index = self._normalise_index(index)
+        left, rest = _split(self._root, index)
+        middle, right = _split(rest, 1)
+        self._root = _merge(left, right)
+        self._untrack(middle)
+        return middle.item
+
+    def remove_range(self, start: int, stop: int) -> List[Any]:
+        """Remove and return the items in [start, stop)."""
+        start, stop, _ = slice(start, stop).indices(len(self))
+        if start >= stop:
+            return []
+
+        left, rest = _split(self._root, start)
+        middle, right = _split(rest, stop - start)
+        self._root = _merge(left, right)
+        removed = []
+        for node in _iter_nodes(middle):
+            self._untrack(node)
+            removed.append(node.item)
+        return removed
+
+    def move(self, source: int, destination: int) -> None:
+        """Move the item at `source` so that it ends up at `destination`."""
+        item = self.pop(source)
+        self.insert(self._clamp(destination), item)
+
+    def move_to_front(self, index: int) -> None:
+        self.move(index, 0)
+
+    def clear(self) -> None:
+        self._root = None
+        self._keys.clear()
+        self._group_weights.clear()
+
+    def _range(self, start: int, stop: int) -> List[Any]:
+        if start >= stop:
+            return []
+
+        left, rest = _split(self._root, start)
+        middle, right = _split(rest, stop - start)
+        items = [node.item for node in _iter_nodes(middle)]
+        self._root = _merge(left, _merge(middle, right))
+        return items
+
+    def _node_at(self, index: int) -> _Node:
+        node = self._root
+        while node is not None:
+            left_size = _size(node.left)
+            if index < left_size:
+                node = node.left
+            elif index == left_size:
+                return node
+            else:
+                index -= left_size + 1
+                node = node.right
+        raise IndexError("IndexedList index out of range")
+
+    def _normalise_index(self, index: int) -> int:
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError("IndexedList index out of range")
+        return index
+
+    def _clamp(self, index: int) -> int:
+        return max(0, min(index, len(self)))
+
+    def _new_node(self, item: Any) -> _Node:
+        node = _Node(item, self._weight(item))
+        self._track(node)
+        return node
+
+    def _track(self, node: _Node) -> None:
+        key = self._key(node.item)
+        if key is not None:
+            self._keys[key] += 1
+        group = self._group(node.item) if self._group is not None else None
+        if group is not None:
+            self._group_weights[group] = self._group_weights.get(group, 0) + node.weight
+
+    def _untrack(self, node: _Node) -> None:
+        key = self._key(node.item)
+        if key is not None:
+            self._keys[key] -= 1
+            if self._keys[key] <= 0:
+                del self._keys[key]
+        group = self._group(node.item) if self._group is not None else None
+        if group is not None:
+            self._group_weights[group] = self._group_weights.get(group, 0) - node.weight
+            if not self._group_weights[group]:
+                del self._group_weights[group]
@@ -0,0 +1,190 @@
+"""
+Evict voice states that are no longer in use, and account for what each
+guild's voice state is holding on to.
+
+`MusicCog.voice_states` gains an entry for every guild that runs a command,
+and only `!leave` removed them. `VoiceStateJanitor` periodically removes
+states whose player has stopped (it times out after `VoiceState.TIMEOUT`
+with nothing queued) or that have been idle for too long, and cleans up any
+ffmpeg process that no voice state owns any more.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import sys
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from src.cogs.music_bot.parse_youtube_input.extract_from_youtube import running_sources
+from src.metrics import REGISTRY
+from src.parse_json import parse_json
+
+if TYPE_CHECKING:
+    from src.cogs.music_bot.voice_state import VoiceState
+
+logger = logging.getLogger(__name__)
+
+VOICE_STATES_EVICTED = REGISTRY.counter(
+    "gimlibot_voice_states_evicted_total",
+    "Voice states removed by the janitor, by why they were removed.",
+    labelnames=("reason",),
+)
+ORPHANED_FFMPEG = REGISTRY.counter(
+    "gimlibot_orphaned_ffmpeg_cleaned_total",
+    "ffmpeg processes cleaned up because no voice state owned them any more.",
+)
+
+
+@dataclass
+class ResourceUsage:
+    guild_id: int
+    tasks: int
+    ffmpeg_processes: int
+    queued_tracks: int
+    queued_bytes: int  # Approximate; shared metadata is counted once per guild
+    idle_for: float
+
+    @property
+    def sort_key(self):
+        return (self.ffmpeg_processes, self.queued_bytes, self.tasks)
+
+
+def queued_bytes(state: VoiceState) -> int:
+    """Roughly how much memory a voice state's queue takes up."""
+    total = 0
+    seen_info = set()
+    for track in state.songs:
+        total += sys.getsizeof(track)
+        info = track.video_info
+        if info is not None and id(info) not in seen_info:
+            seen_info.add(id(info))
+            total += sys.getsizeof(info) + sum(
+                sys.getsizeof(value) for value in info.__dict__.values()
+            )
+        elif info is None:
+            total += sys.getsizeof(track.title) + sys.getsizeof(track.video_id)
+    return total
+
+
+def resource_usage(guild_id: int, state: VoiceState) -> ResourceUsage:
+    return ResourceUsage(
+        guild_id=guild_id,
+        tasks=len(state.tasks()) + state.notifier.active_tasks(),
+        ffmpeg_processes=len(
+            {id(source) for source in state.sources() if source.ffmpeg_running}
+        ),
+        queued_tracks=len(state.songs),
+        queued_bytes=queued_bytes(state),
+        idle_for=state.idle_for,
+    )
+
+
+def top_consumers(
+    voice_states: Dict[int, VoiceState], count: int = 10
+) -> List[ResourceUsage]:
+    """The guilds using the most (by ffmpeg processes, then queue memory, then tasks)."""
+    usage = [resource_usage(guild_id, state) for guild_id, state in voice_states.items()]
+    usage.sort(key=lambda entry: entry.sort_key, reverse=True)
+    return usage[:count]
+
+
+class VoiceStateJanitor:
+    """
+    Every `interval` seconds, evict voice states that have finished or been
+    idle for `idle_timeout` seconds from `voice_states`, and clean up ffmpeg
+    processes that have gone unowned for at least `orphan_grace` seconds (a
+    source being opened isn't owned by its voice state until it's ready).
+    """
+
+    def __init__(
+        self,
+        voice_states: Dict[int, VoiceState],
+        *,
+        idle_timeout: float = 900,
+        interval: float = 60,
+        orphan_grace: float = 120,
+    ):
+        self.voice_states = voice_states
+        self.idle_timeout = idle_timeout
+        self.interval = interval
+        self.orphan_grace = orphan_grace
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_config(
+        cls, voice_states: Dict[int, VoiceState], config_path: str
+    ) -> Optional[VoiceStateJanitor]:
+        """Build the janitor described by a config file, or None if it's disabled."""
+        config = parse_json(config_path)
+        if not config.get("enabled", True):
+            return None
+        return cls(
+            voice_states,
+            idle_timeout=config.get("idle_timeout", 900),
+            interval=config.get("sweep_interval", 60),
+            orphan_grace=config.get("orphan_grace", 120),
+        )
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.sweep()
+            except Exception:
+                logger.exception("Voice state sweep failed.")
+
+    async def sweep(self) -> int:
+        """Evict unused voice states and clean up orphans; returns the evictions."""
+        evicted = []
+        for guild_id, state in list(self.voice_states.items()):
+            if state.finished:
+                reason = "finished"
+            elif state.idle_for >= self.idle_timeout:
+                reason = "idle"
+            else:
+                continue
+            # Removed first, so a new command gets a fresh state.
+            del self.voice_states[guild_id]
+            VOICE_STATES_EVICTED.inc(reason=reason)
+            evicted.append(state)
+            logger.info("Evicting %s voice state of guild %s.", reason, guild_id)
+
+        results = await asyncio.gather(
+            *(state.stop() for state in evicted), return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                logger.warning("Failed to stop an evicted voice state: %r", result)
+
+        self.clean_orphans()
+        return len(evicted)
+
+    def clean_orphans(self) -> int:
+        """Clean up running sources that no voice state owns; returns how many."""
+        owned = {
+            id(source)
+            for state in self.voice_states.values()
+            for source in state.sources()
+        }
+        now = time.monotonic()
+        cleaned = 0
+        for source in running_sources():
+            if id(source) in owned or now - source.created_at < self.orphan_grace:
+                continue
+            logger.warning("Cleaning up orphaned ffmpeg process for: %s", source)
+            source.cleanup()
+            ORPHANED_FFMPEG.inc()
+            cleaned += 1
+        return cleaned
@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional
+
+import discord
+
+from src.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+NOTIFICATIONS = REGISTRY.counter(
+    "gimlibot_notifications_total",
+    "Queue notifications, by whether they were sent, merged into another "
+    "message, or edited into the existing now-playing message.",
+    labelnames=("outcome",),
+)
+NOTIFICATION_BUDGET_WAITS = REGISTRY.histogram(
+    "gimlibot_notification_budget_wait_seconds",
+    "Time notifications were held back to stay within a channel's rate limit.",
+)
+
+MAX_MESSAGE_LENGTH = 2000
+
+
+@dataclass
+class _Outbox:
+    channel: discord.abc.Messageable
+    queued: List[str] = field(default_factory=list)
+    notices: List[str] = field(default_factory=list)
+    now_playing: Optional[discord.Embed] = None
+    now_playing_message: Optional[discord.Message] = None
+    last_message: Optional[discord.Message] = None
+    sent_at: Deque[float] = field(default_factory=deque)
+    task: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> bool:
+        return bool(self.queued or self.notices or self.now_playing)
+
+
+class Notifier:
+    """
+    Coalesces a guild's outbound notifications, one outbox per channel.
+
+    Notifications are gathered for `WINDOW` seconds and then sent together,
+    so queueing seven songs in quick succession posts one "Queued 7 tracks"
+    message. A new now-playing embed replaces the previous now-playing
+    message in place while that is still the latest message in the channel.
+    Messages and edits are paced to stay within Discord's per-channel rate
+    limit, rather than queueing up behind 429 retries; anything that arrives
+    in the meantime is merged into the next message.
+    """
+
+    WINDOW = 1.5
+    # Discord allows 5 messages (or edits) per channel every 5 seconds.
+    RATE_LIMIT = 5
+    RATE_PERIOD = 5.0
+    MAX_LISTED_TRACKS = 5
+
+    def __init__(self):
+        self._outboxes: Dict[int, _Outbox] = {}
+
+    def queued(self, channel: discord.abc.Messageable, title: str):
+        """Announce that a track has been queued."""
+        self._outbox(channel).queued.append(title)
+        self._schedule(channel)
+
+    def notice(self, channel: discord.abc.Messageable, text: str):
+        """Post a line of text, merged with any others sent close together."""
+        self._outbox(channel).notices.append(text)
+        self._schedule(channel)
+
+    def now_playing(self, channel: discord.abc.Messageable, embed: discord.Embed):
+        """Show the now-playing embed, replacing any that hasn't been sent yet."""
+        outbox = self._outbox(channel)
+        if outbox.now_playing is not None:
+            NOTIFICATIONS.inc(outcome="coalesced")
+        outbox.now_playing = embed
+        self._schedule(channel)
+
+    def rate_budget(self) -> Dict[int, float]:
+        """The fraction of each channel's rate limit used in the current period."""
+        now = time.monotonic()
+        budget = {}
+        for channel_id, outbox in self._outboxes.items():
+            self._expire(outbox, now)
+            if outbox.sent_at:
+                budget[channel_id] = len(outbox.sent_at) / self.RATE_LIMIT
+        return budget
+
+    def active_tasks(self) -> int:
+        """The number of channels with a notification task running."""
+        return sum(
+            1
+            for outbox in self._outboxes.values()
+            if outbox.task is not None and not outbox.task.done()
+        )
+
+    async def flush(self):
+        """Wait for every pending notification to be sent."""
+        tasks = [
+            outbox.task
+            for outbox in self._outboxes.values()
+            if outbox.task is not None and not outbox.task.done()
+        ]
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def close(self):
+        """Drop pending notifications."""
+        for outbox in self._outboxes.values():
+            if outbox.task is not None:
+                outbox.task.cancel()
+        self._outboxes.clear()
+
+    def _outbox(self, channel: discord.abc.Messageable) -> _Outbox:
+        outbox = self._outboxes.get(channel.id)
+        if outbox is None:
+            outbox = self._outboxes[channel.id] = _Outbox(channel)
+        # Keep the most complete channel object we've been given.
+        elif not isinstance(channel, discord.PartialMessageable):
+            outbox.channel = channel
+        return outbox
+
+    def _schedule(self, channel: discord.abc.Messageable):
+        outbox = self._outboxes[channel.id]
+        if outbox.task is None or outbox.task.done():
+            outbox.task = asyncio.create_task(self._drain(outbox))
+
+    async def _drain(self, outbox: _Outbox):
+        await asyncio.sleep(self.WINDOW)
+        while outbox.pending:
+            await self._wait_for_budget(outbox)
+            try:
+                # Queue messages go first, so the now-playing embed stays the
+                # latest message and can be edited in place next time.
+                if outbox.queued or outbox.notices:
+                    await self._send_text(outbox)
+                else:
+                    await self._send_now_playing(outbox)
+            except discord.HTTPException as e:
+                logger.warning(f"Failed to notify channel {outbox.channel.id}: {e}")
+
+    async def _wait_for_budget(self, outbox: _Outbox):
+        now = time.monotonic()
+        self._expire(outbox, now)
+        if len(outbox.sent_at) >= self.RATE_LIMIT:
+            delay = outbox.sent_at[0] + self.RATE_PERIOD - now
+            logger.debug(
+                "Channel %s is at its rate limit; holding notifications for %.2fs.",
+                outbox.channel.id,
+                delay,
+            )
+            NOTIFICATION_BUDGET_WAITS.observe(delay)
+            await asyncio.sleep(delay)
+            self._expire(outbox, time.monotonic())
+        outbox.sent_at.append(time.monotonic())
+
+    def _expire(self, outbox: _Outbox, now: float):
+        while outbox.sent_at and outbox.sent_at[0] <= now - self.RATE_PERIOD:
+            outbox.sent_at.popleft()
+
+    async def _send_text(self, outbox: _Outbox):
+        queued, notices = outbox.queued, outbox.notices
+        outbox.queued, outbox.notices = [], []
+
+        lines = list(notices)
+        if len(queued) == 1:
+            lines.append(f"🔊 Queued: {queued[0]}")
+        elif queued:
+            listed = ", ".join(queued[: self.MAX_LISTED_TRACKS])
+            more = len(queued) - self.MAX_LISTED_TRACKS
+            if more > 0:
+                listed += f" and {more} more"
+            lines.append(f"🔊 Queued {len(queued)} tracks: {listed}")
+
+        content = "\n".join(lines)
+        if len(content) > MAX_MESSAGE_LENGTH:
+            content = content[: MAX_MESSAGE_LENGTH - 1] + "…"
+        outbox.last_message = await outbox.channel.send(content)
+        NOTIFICATIONS.inc(outcome="sent")
+        NOTIFICATIONS.inc(len(queued) + len(notices) - 1, outcome="coalesced")
+
+    async def _send_now_playing(self, outbox: _Outbox):
+        embed, outbox.now_playing = outbox.now_playing, None
+        message = outbox.now_playing_message
+        if message is not None and self._is_latest(outbox, message):
+            try:
+                message = await message.edit(embed=embed)
+                outbox.now_playing_message = outbox.last_message = message
+                NOTIFICATIONS.inc(outcome="edited")
+                return
+            except discord.NotFound:
+                pass
+
+        message = await outbox.channel.send(embed=embed)
+        outbox.now_playing_message = outbox.last_message = message
+        NOTIFICATIONS.inc(outcome="sent")
+
+    @staticmethod
+    def _is_latest(outbox: _Outbox, message: discord.Message) -> bool:
+        if outbox.last_message is not message:
+            return False
+        # Only cached channels know about messages sent since by anyone else.
+        last_message_id = getattr(outbox.channel, "last_message_id", None)
+        return last_message_id is None or last_message_id == message.id
@@ -0,0 +1,257 @@
+from __future__ import annotations
+
+import logging
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from src.metrics import REGISTRY
+from src.parse_json import parse_json
+
+if TYPE_CHECKING:
+    import yt_dlp
+
+logger = logging.getLogger(__name__)
+
+AUDIO_CACHE_LOOKUPS = REGISTRY.counter(
+    "gimlibot_audio_cache_lookups_total",
+    "Audio cache lookups when a track starts playing, by outcome (hit/miss).",
+    labelnames=("outcome",),
+)
+AUDIO_CACHE_BYTES = REGISTRY.gauge(
+    "gimlibot_audio_cache_bytes",
+    "Bytes of audio currently held in the local audio cache.",
+)
+AUDIO_CACHE_EVICTIONS = REGISTRY.counter(
+    "gimlibot_audio_cache_evictions_total",
+    "Audio files evicted from the local audio cache to stay within its budget.",
+)
+
+# Prefer YouTube's Opus formats, so cached files can be played without transcoding.
+DOWNLOAD_FORMAT = "bestaudio[acodec=opus]/bestaudio/best"
+PARTIAL_DIRECTORY = ".partial"
+
+
+class AudioCache:
+    """
+    A size-bounded directory of downloaded audio files, keyed by video ID.
+
+    A track is only downloaded once it has been played `min_plays` times, so
+    one-off requests don't churn the cache, and files are evicted least
+    recently played first to keep the total under `max_bytes`. Downloads are
+    written under a partial directory and moved into place once complete, so
+    a half-written file is never played.
+    """
+
+    # Play counts are only kept for this many tracks (least recently played dropped).
+    MAX_TRACKED_PLAYS = 10_000
+
+    def __init__(
+        self,
+        directory: str,
+        *,
+        max_bytes: int = 2 * 1024**3,
+        min_plays: int = 3,
+        ydl_config: Optional[Dict[str, Any]] = None,
+    ):
+        if max_bytes < 1 or min_plays < 1:
+            raise ValueError("max_bytes and min_plays must be at least 1.")
+
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.min_plays = min_plays
+        self.ydl_config = ydl_config or {}
+
+        self._lock = threading.Lock()
+        self._downloader: Optional[yt_dlp.YoutubeDL] = None
+        self._files: Optional[OrderedDict[str, str]] = None
+        self._sizes: Dict[str, int] = {}
+        self._total_bytes = 0
+        self._plays: OrderedDict[str, int] = OrderedDict()
+        self._filling: set[str] = set()
+
+    @classmethod
+    def from_config(
+        cls, config_path: str, ydl_config: Dict[str, Any]
+    ) -> Optional[AudioCache]:
+        """Build the cache described by a config file, or None if it's disabled."""
+        config = parse_json(config_path)
+        if not config.get("enabled", False):
+            return None
+        return cls(
+            config["directory"],
+            max_bytes=config.get("max_bytes", 2 * 1024**3),
+            min_plays=config.get("min_plays", 3),
+            ydl_config=ydl_config,
+        )
+
+    @property
+    def partial_directory(self) -> str:
+        return os.path.join(self.directory, PARTIAL_DIRECTORY)
+
+    @property
+    def downloader(self) -> yt_dlp.YoutubeDL:
+        """A YoutubeDL instance that downloads audio into the partial directory."""
+        if self._downloader is None:
+            import yt_dlp
+
+            self._downloader = yt_dlp.YoutubeDL(
+                {
+                    **self.ydl_config,
+                    "format": DOWNLOAD_FORMAT,
+                    "outtmpl": os.path.join(self.partial_directory, "%(id)s.%(ext)s"),
+                    "noprogress": True,
+                }
+            )
+        return self._downloader
+
+    @property
+    def files(self) -> OrderedDict[str, str]:
+        # Scan the directory lazily, so importing the module never touches the disk.
+        if self._files is None:
+            os.makedirs(self.directory, exist_ok=True)
+            shutil.rmtree(self.partial_directory, ignore_errors=True)
+
+            entries = [
+                entry
+                for entry in os.scandir(self.directory)
+                if entry.is_file() and not entry.name.startswith(".")
+            ]
+            entries.sort(key=lambda entry: entry.stat().st_mtime)
+
+            self._files = OrderedDict()
+            for entry in entries:
+                video_id = os.path.splitext(entry.name)[0]
+                self._files[video_id] = entry.path
+                self._sizes[video_id] = entry.stat().st_size
+                self._total_bytes += self._sizes[video_id]
+            AUDIO_CACHE_BYTES.set(self.total_bytes)
+            logger.info(
+                f"Audio cache opened at: {self.directory} "
+                f"({len(self._files)} files, {self.total_bytes} bytes)"
+            )
+        return self._files
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    def __contains__(self, video_id: str) -> bool:
+        return video_id in self.files
+
+    def lookup(self, video_id: Optional[str]) -> Optional[str]:
+        """
+        The path of a cached track's audio, or None on a miss.
+        Hits refresh the file's position in the LRU order.
+        """
+        with self._lock:
+            path = self.files.get(video_id) if video_id else None
+            if path is not None and not os.path.exists(path):
+                self._forget(video_id)
+                path = None
+
+            if path is None:
+                AUDIO_CACHE_LOOKUPS.inc(outcome="miss")
+                return None
+
+            self.files.move_to_end(video_id)
+            # The file's mtime carries the LRU order across restarts.
+            os.utime(path)
+            AUDIO_CACHE_LOOKUPS.inc(outcome="hit")
+        return path
+
+    def record_play(self, video_id: Optional[str], filesize: Optional[int]) -> bool:
+        """
+        Count a play of a track, returning True if it should now be downloaded
+        into the cache (the caller then starts the download and calls `store`).
+        """
+        if not video_id:
+            return False
+
+        with self._lock:
+            plays = self._plays.pop(video_id, 0) + 1
+            self._plays[video_id] = plays
+            while len(self._plays) > self.MAX_TRACKED_PLAYS:
+                self._plays.popitem(last=False)
+
+            if (
+                plays < self.min_plays
+                or video_id in self.files
+                or video_id in self._filling
+            ):
+                return False
+            if filesize is not None and filesize > self.max_bytes:
+                logger.info(
+                    f"Not caching {video_id}: {filesize} bytes exceeds the budget."
+                )
+                return False
+
+            self._filling.add(video_id)
+            return True
+
+    def store(self, video_id: str) -> Optional[str]:
+        """Move a completed download into the cache, evicting to stay in budget."""
+        with self._lock:
+            self._filling.discard(video_id)
+            download = self._partial_file(video_id)
+            if download is None:
+                logger.warning(f"No downloaded audio found to cache for: {video_id}")
+                return None
+
+            size = os.path.getsize(download)
+            if size > self.max_bytes:
+                os.remove(download)
+                return None
+
+            path = os.path.join(self.directory, os.path.basename(download))
+            os.replace(download, path)
+            self._forget(video_id)
+            self.files[video_id] = path
+            self._sizes[video_id] = size
+            self._total_bytes += size
+            self._evict()
+            AUDIO_CACHE_BYTES.set(self.total_bytes)
+
+        logger.info(f"Cached audio for {video_id} ({size} bytes) at: {path}")
+        return path
+
+    def discard(self, video_id: str) -> None:
+        """Abandon a failed download, removing anything it left behind."""
+        with self._lock:
+            self._filling.discard(video_id)
+            if not os.path.isdir(self.partial_directory):
+                return
+            for name in os.listdir(self.partial_directory):
+                if name.startswith(f"{video_id}."):
+                    os.remove(os.path.join(self.partial_directory, name))
+
+    def _partial_file(self, video_id: str) -> Optional[str]:
+        if not os.path.isdir(self.partial_directory):
+            return None
+        for name in os.listdir(self.partial_directory):
+            # Skip yt-dlp's in-progress (.part) and fragment files.
+            if name.startswith(f"{video_id}.") and not name.endswith((".part", ".ytdl")):
+                return os.path.join(self.partial_directory, name)
+        return None
+
+    def _forget(self, video_id: str) -> None:
+        # Must be called while holding self._lock.
+        self.files.pop(video_id, None)
+        self._total_bytes -= self._sizes.pop(video_id, 0)
+
+    def _evict(self) -> None:
+        # Must be called while holding self._lock.
+        while self.total_bytes > self.max_bytes and self.files:
+            video_id, path = self.files.popitem(last=False)
+            self._total_bytes -= self._sizes.pop(video_id, 0)
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            AUDIO_CACHE_EVICTIONS.inc()
+            logger.info(f"Evicted {video_id} from the audio cache.")
@@ -1,19 +1,62 @@
 # TODO(ThomasHepworth): Add searching functionality.
 from __future__ import annotations
 
+import abc
 import asyncio
+import audioop
 import logging
+import shlex
+import threading
+import time
+import weakref
+from collections import deque
+from itertools import islice
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Callable,
+    Deque,
+    Dict,
+    List,
+    Optional,
+)
 from urllib.parse import parse_qs, urlparse
 
 import discord
-import yt_dlp
 
 from src._exceptions import YTDLError
-from src.cogs.music_bot.parse_youtube_input.video_info import VideoInfo
+from src.cogs.music_bot.encoder_pool import EncoderPool, PooledStream
+from src.cogs.music_bot.parse_youtube_input.audio_cache import AudioCache
+from src.cogs.music_bot.parse_youtube_input.extraction_engine import ExtractionEngine
+from src.cogs.music_bot.parse_youtube_input.metadata_cache import (
+    CachedVideo,
+    MetadataCache,
+    trim_info,
+)
+from src.cogs.music_bot.parse_youtube_input.player_cache import (
+    PlayerCache,
+    with_player_cache,
+)
+from src.cogs.music_bot.parse_youtube_input.search_cache import SearchCache
+from src.cogs.music_bot.parse_youtube_input.single_flight import SingleFlight
+from src.cogs.music_bot.parse_youtube_input.video_info import (
+    VideoDownloadInfo,
+    VideoInfo,
+)
+from src.metrics import REGISTRY
 from src.parse_json import parse_json
+from src.tracing import span
+
+if TYPE_CHECKING:
+    import yt_dlp
 
 logger = logging.getLogger(__name__)
 
+# Identical extractions requested concurrently (from any guild) share one yt-dlp call.
+_VIDEO_EXTRACTIONS = SingleFlight("video_extraction")
+_STREAM_REFRESHES = SingleFlight("stream_refresh")
+
 
 def is_valid_youtube_watch_url(url: str) -> bool:
     """
@@ -41,76 +84,744 @@ def is_valid_youtube_watch_url(url: str) -> bool:
     return True
 
 
+def is_youtube_playlist_url(url: str) -> bool:
+    """Check if a URL points at a YouTube playlist page (not a video within one)."""
+    parsed = urlparse(url)
+    valid_domains = {
+        "youtube.com",
+        "m.youtube.com",
+        "www.youtube.com",
+        "music.youtube.com",
+    }
+
+    if parsed.netloc not in valid_domains or parsed.path.rstrip("/") != "/playlist":
+        return False
+
+    return "list" in parse_qs(parsed.query)
+
+
+def extract_video_id(url: str) -> Optional[str]:
+    """
+    Return the canonical video ID of a YouTube watch URL, or None if the
+    input isn't one (i.e. it should be treated as a search query).
+    """
+    if not is_valid_youtube_watch_url(url):
+        return None
+
+    parsed = urlparse(url)
+    if parsed.netloc == "youtu.be":
+        return parsed.path.strip("/")
+    return parse_qs(parsed.query)["v"][0]
+
+
+def normalise_search_query(query: str) -> str:
+    """Normalise a search query so trivially different inputs share a cache key."""
+    return " ".join(query.casefold().split())
+
+
+def youtube_watch_url(video_id: str) -> str:
+    return f"https://www.youtube.com/watch?v={video_id}"
+
+
+async def _extract_info(
+    ytdl: yt_dlp.YoutubeDL,
+    url: str,
+    download: bool,
+    engine: Optional[ExtractionEngine] = None,
+    guild_id: Optional[int] = None,
+) -> dict:
+    if engine is not None:
+        video_info = await engine.extract_info(
+            ytdl, url, download=download, guild_id=guild_id
+        )
+    else:
+        loop = asyncio.get_running_loop()
+        video_info = await loop.run_in_executor(
+            None, lambda: ytdl.extract_info(url, download=download)
+        )
+    if video_info is None:
+        raise YTDLError(f"Couldn't find anything that matches: `{url}`")
+
+    # Searches return a playlist-like result; we only ever play the first hit.
+    if "entries" in video_info:
+        entries = list(video_info["entries"])
+        if not entries:
+            raise YTDLError(f"Couldn't find anything that matches: `{url}`")
+        video_info = entries[0]
+
+    # Drop formats, thumbnails, captions and the like as soon as possible.
+    return trim_info(video_info)
+
+
+async def _extract_from_cache(
+    ytdl: yt_dlp.YoutubeDL,
+    cache: MetadataCache,
+    cached: CachedVideo,
+    engine: Optional[ExtractionEngine] = None,
+    guild_id: Optional[int] = None,
+) -> VideoInfo:
+    if cached.stream_expired:
+        # Stable metadata comes from disk; only the stream URL needs the network.
+        logger.info("Refreshing expired stream URL for: %s", cached.video_id)
+        with span("extract_info", refresh=True):
+            refreshed = await _extract_info(
+                ytdl,
+                youtube_watch_url(cached.video_id),
+                download=False,
+                engine=engine,
+                guild_id=guild_id,
+            )
+        if not refreshed.get("url"):
+            raise ValueError("No stream URL in the refreshed video information.")
+        cached.stream_url = refreshed["url"]
+        cache.update_stream_url(cached.video_id, cached.stream_url)
+
+    # Entries are only cached once they've been validated, so trust them.
+    return VideoInfo.from_trusted_info(cached.to_info_dict(), download_info=True)
+
+
 async def extract_video(
-    ytdl: yt_dlp.YoutubeDL, url: str, download: bool = False
+    ytdl: yt_dlp.YoutubeDL,
+    url: str,
+    download: bool = False,
+    cache: Optional[MetadataCache] = None,
+    *,
+    search_cache: Optional[SearchCache] = None,
+    engine: Optional[ExtractionEngine] = None,
+    guild_id: Optional[int] = None,
 ) -> VideoInfo:
     """
     Extract a YouTube video's information using yt_dlp.
     If the URL is not a valid YouTube URL, search for the query instead.
+
+    If a search cache is supplied, a normalised query that has been searched
+    for before skips the search and is looked up by its video ID instead.
+    If a metadata cache is supplied, it is consulted first (keyed by the
+    video ID) and populated on a miss.
+    If an extraction engine is supplied, yt-dlp runs on its pool (fairly
+    scheduled by `guild_id`) rather than the loop's default executor.
+
+    Concurrent calls for the same video or normalised query are coalesced
+    into a single extraction, whose result (or error) every caller shares.
+    """
+    video_id = extract_video_id(url)
+    key = ("video", video_id) if video_id else ("query", normalise_search_query(url))
+    return await _VIDEO_EXTRACTIONS.do(
+        (*key, download),
+        lambda: _extract_video(
+            ytdl,
+            url,
+            download,
+            cache,
+            video_id=video_id,
+            search_cache=search_cache,
+            engine=engine,
+            guild_id=guild_id,
+        ),
+    )
+
+
+async def _extract_video(
+    ytdl: yt_dlp.YoutubeDL,
+    url: str,
+    download: bool,
+    cache: Optional[MetadataCache],
+    *,
+    video_id: Optional[str],
+    search_cache: Optional[SearchCache],
+    engine: Optional[ExtractionEngine],
+    guild_id: Optional[int],
+) -> VideoInfo:
+    query = None if video_id else normalise_search_query(url)
+    use_cache = cache is not None and not download
+    searched_before = False
+
+    try:
+        if query is not None and search_cache is not None:
+            with span("search_cache"):
+                video_id = search_cache.get(query)
+            if video_id is not None:
+                searched_before = True
+                url = youtube_watch_url(video_id)
+
+        if use_cache and video_id is not None:
+            cached = cache.get(video_id)
+            if cached is not None:
+                return await _extract_from_cache(
+                    ytdl, cache, cached, engine=engine, guild_id=guild_id
+                )
+
+        if video_id is None:
+            url = f"ytsearch:{url}"
+
+        logger.info("Extracting video information for: %s", url)
+        with span("extract_info", search=video_id is None):
+            video_info = await _extract_info(
+                ytdl, url, download=download, engine=engine, guild_id=guild_id
+            )
+        logger.info("Successfully extracted video information for: %s", url)
+        logger.debug("Video information: %s", video_info)
+
+        with span("parse"):
+            parsed = VideoInfo.parse_video_information(video_info, download_info=True)
+        if use_cache:
+            cache.put(video_info)
+        if search_cache is not None and query and parsed.video_id and not searched_before:
+            search_cache.put(query, parsed.video_id)
+        return parsed
+    except Exception as e:
+        if searched_before:
+            # The video may have been taken down; search afresh next time.
+            search_cache.discard(query)
+        raise YTDLError(f"Error extracting video information: {str(e)}")
+
+
+async def iter_playlist(
+    ytdl: yt_dlp.YoutubeDL,
+    url: str,
+    *,
+    batch_size: int = 25,
+    limit: int = 500,
+    engine: Optional[ExtractionEngine] = None,
+    guild_id: Optional[int] = None,
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Enumerate a playlist cheaply, yielding batches of flat entries.
+
+    The playlist is extracted without processing its entries, so each entry
+    is just an ID, title and (usually) duration. yt-dlp pages through the
+    playlist lazily, so the first batch is available long before a large
+    playlist has been fully enumerated.
     """
     loop = asyncio.get_running_loop()
-    if not is_valid_youtube_watch_url(url):
-        url = f"ytsearch:{url}"
+
+    async def run(fn: Callable[[], Any]) -> Any:
+        if engine is not None:
+            return await engine.run_local(fn, guild_id=guild_id)
+        return await loop.run_in_executor(None, fn)
 
     try:
-        logger.info(f"Extracting video information for: {url}")
-        video_info = await loop.run_in_executor(
-            None, lambda: ytdl.extract_info(url, download=download)
+        logger.info(f"Enumerating playlist: {url}")
+        playlist = await run(
+            lambda: ytdl.extract_info(url, download=False, process=False)
         )
-        if video_info is None:
-            raise YTDLError(f"Couldn't find anything that matches: `{url}`")
-        logger.info(f"Successfully extracted video information for: {url}")
-        logger.debug(f"Video information: {video_info}")
-        return VideoInfo.parse_video_information(video_info)
     except Exception as e:
-        raise YTDLError(f"Error extracting video information: {str(e)}")
+        raise YTDLError(f"Error extracting playlist information: {str(e)}")
+
+    if not playlist or "entries" not in playlist:
+        raise YTDLError(f"Couldn't find a playlist at: `{url}`")
+
+    entries = iter(playlist["entries"])
+    remaining = limit
+    while remaining > 0:
+        size = min(batch_size, remaining)
+        try:
+            batch = await run(lambda: list(islice(entries, size)))
+        except Exception as e:
+            raise YTDLError(f"Error extracting playlist information: {str(e)}")
+        if not batch:
+            return
+
+        remaining -= len(batch)
+        # Deleted and private videos come through as entries without an ID.
+        yield [entry for entry in batch if entry and entry.get("id")]
+
+
+async def refresh_stream_url(
+    ytdl: yt_dlp.YoutubeDL,
+    video_info: VideoInfo,
+    cache: Optional[MetadataCache] = None,
+    *,
+    engine: Optional[ExtractionEngine] = None,
+    guild_id: Optional[int] = None,
+) -> VideoInfo:
+    """
+    Re-resolve the stream URL of an already extracted video, keeping the rest
+    of its metadata. The cache, if supplied, is updated with the new URL.
+    """
+    url = (
+        youtube_watch_url(video_info.video_id)
+        if video_info.video_id
+        else str(video_info.webpage_url)
+    )
+    try:
+        logger.info("Refreshing stream URL for: %s", url)
+        refreshed = await _STREAM_REFRESHES.do(
+            url,
+            lambda: _extract_info(
+                ytdl, url, download=False, engine=engine, guild_id=guild_id
+            ),
+        )
+    except Exception as e:
+        raise YTDLError(f"Error refreshing stream URL: {str(e)}")
+
+    stream_url = refreshed.get("url")
+    if not stream_url:
+        raise YTDLError(f"Couldn't find a stream URL for: `{url}`")
+    if cache is not None and video_info.video_id:
+        cache.update_stream_url(video_info.video_id, stream_url)
+    return video_info.model_copy(update={"stream_url": stream_url})
+
+
+class LazyYoutubeDL:
+    """
+    A class attribute holding a YoutubeDL that is only built (and yt-dlp only
+    imported) the first time it's used, as loading yt-dlp and its extractors
+    is much of the bot's import time. `load` builds it ahead of time.
+    """
+
+    def __init__(self, ydl_config: Dict[str, Any]):
+        self.ydl_config = ydl_config
+        self._ytdl: Optional[yt_dlp.YoutubeDL] = None
+        self._lock = threading.Lock()
+
+    def __get__(self, instance, owner=None) -> yt_dlp.YoutubeDL:
+        return self.load()
+
+    def load(self) -> yt_dlp.YoutubeDL:
+        if self._ytdl is None:
+            with self._lock:
+                if self._ytdl is None:
+                    import yt_dlp
+
+                    self._ytdl = yt_dlp.YoutubeDL(self.ydl_config)
+        return self._ytdl
+
+
+FFMPEG_PROCESSES = REGISTRY.gauge(
+    "gimlibot_ffmpeg_processes",
+    "ffmpeg processes spawned for playback that haven't been cleaned up yet.",
+)
+
+# Every source whose ffmpeg process may still be running, so ones that were
+# never cleaned up can be found (see `running_sources`).
+_LIVE_SOURCES: weakref.WeakSet[_TrackAudio] = weakref.WeakSet()
+
+FRAME_SECONDS = discord.opus.Encoder.FRAME_LENGTH / 1000
+PLAYBACK_MODES = ("opus", "pcm", "pooled")
+
+
+class _TrackAudio(abc.ABC):
+    """
+    Playback bookkeeping shared by the PCM and Opus sources of a track: the
+    track details, read-ahead priming, the first-frame hook and the position.
+    """
+
+    # Whether `volume` can be changed mid-stream, rather than by reopening it.
+    LIVE_VOLUME = True
+
+    def _init_track_audio(self, *, video_info: VideoInfo, start: float):
+        self.video_info = video_info
+        self.start = start
+
+        # Frames read ahead of playback by `prime`, and an optional hook that
+        # fires (on the audio thread) when the first frame is handed to Discord.
+        self._primed_frames: Deque[bytes] = deque()
+        self.on_first_frame: Optional[Callable[[], None]] = None
+        self.frames_read = 0
+
+        # Every source runs one ffmpeg process, until it is cleaned up.
+        self._ffmpeg_running = True
+        self.created_at = time.monotonic()
+        _LIVE_SOURCES.add(self)
+        FFMPEG_PROCESSES.inc()
+
+    @property
+    def ffmpeg_running(self) -> bool:
+        return getattr(self, "_ffmpeg_running", False)
+
+    @abc.abstractmethod
+    def _read_frame(self) -> bytes:
+        """Read the next frame from ffmpeg."""
+
+    def _output_frame(self, frame: bytes) -> bytes:
+        """Apply any in-process processing to a frame before it's played."""
+        return frame
+
+    def prime(self, frames: int) -> int:
+        """
+        Read up to `frames` 20ms frames ahead of playback, so ffmpeg startup,
+        the HTTP connect and the first buffer fill happen before the track is
+        played. This blocks, so should be run in an executor.
+        """
+        while len(self._primed_frames) < frames:
+            frame = self._read_frame()
+            if not frame:
+                break
+            self._primed_frames.append(frame)
+        return len(self._primed_frames)
+
+    def skip_to(self, position: float):
+        """
+        Drop unplayed frames until the source reaches `position`, e.g. to catch
+        up with a stream it is replacing. This blocks, so should be run in an
+        executor.
+        """
+        while self.position + FRAME_SECONDS <= position:
+            frame = self._primed_frames.popleft() if self._primed_frames else None
+            if frame is None:
+                frame = self._read_frame()
+            if not frame:
+                break
+            self.start += FRAME_SECONDS
+
+    @property
+    def position(self) -> float:
+        """Seconds into the track (pauses don't count)."""
+        return self.start + self.frames_read * FRAME_SECONDS
+
+    def read(self) -> bytes:
+        if self.on_first_frame is not None:
+            on_first_frame, self.on_first_frame = self.on_first_frame, None
+            on_first_frame()
+
+        self.frames_read += 1
+        if self._primed_frames:
+            return self._output_frame(self._primed_frames.popleft())
+        return self._output_frame(self._read_frame())
 
+    def cleanup(self):
+        # Cleanup runs more than once (by the player, by us, and on collection).
+        if getattr(self, "_ffmpeg_running", False):
+            self._ffmpeg_running = False
+            _LIVE_SOURCES.discard(self)
+            FFMPEG_PROCESSES.dec()
+        super().cleanup()
+
+    def __repr__(self):
+        return self.video_info.title
 
-class YtdlSource(discord.PCMVolumeTransformer):
+
+class YtdlSource(_TrackAudio, discord.PCMVolumeTransformer):
     """
     A class to handle YouTube audio sources.
+
+    ffmpeg decodes the stream to PCM, which is scaled by `volume` and encoded
+    to Opus in this process. Use `create_audio_source` to let the configured
+    playback mode pick between this and `OpusYtdlSource`.
     """
 
-    YDL_CONFIG = parse_json("config/youtube-dl.json")
+    # Every YoutubeDL (here and in extraction workers) shares one player cache.
+    PLAYER_CACHE = PlayerCache.from_config("config/player-cache.json")
+    YDL_CONFIG = with_player_cache(parse_json("config/youtube-dl.json"), PLAYER_CACHE)
     FFMPEG_CONFIG = parse_json("config/ffmpeg.json")
-    YTDL = yt_dlp.YoutubeDL(YDL_CONFIG)
+    PLAYBACK_CONFIG = parse_json("config/playback.json")
+    YTDL = LazyYoutubeDL(YDL_CONFIG)
+    METADATA_CACHE = MetadataCache.from_config("config/metadata-cache.json")
+    SEARCH_CACHE = SearchCache.from_config("config/search-cache.json")
+    EXTRACTION_ENGINE = ExtractionEngine.from_config(
+        "config/extraction.json", ydl_config=YDL_CONFIG, player_cache=PLAYER_CACHE
+    )
+    AUDIO_CACHE = AudioCache.from_config("config/audio-cache.json", ydl_config=YDL_CONFIG)
 
     def __init__(
         self,
-        ctx: discord.commands.Context,
         source: discord.FFmpegPCMAudio,
         *,
         video_info: VideoInfo,
         volume: float = 0.5,
+        start: float = 0.0,
     ):
         super().__init__(source, volume)
         self.source = source
-        
-        self.requester = ctx.author
-        self.channel = ctx.channel
-
-        self.video_info = video_info
+        self._init_track_audio(video_info=video_info, start=start)
 
     @classmethod
-    async def get_from_source(
-        cls, 
-        ctx: discord.commands.Context, 
-        search: str, 
-        *, 
-        volume: float = 0.5
-    ):
+    def from_video_info(
+        cls,
+        video_info: VideoInfo,
+        *,
+        volume: float = 0.5,
+        start: float = 0.0,
+    ) -> YtdlSource:
         """
-        Extract video information and create a Discord-compatible audio source.
+        Spawn ffmpeg for an already extracted video and wrap it in a
+        Discord-compatible audio source.
         """
-        video_info: VideoInfo = await extract_video(cls.YTDL, search)
         logger.info(
-            f"Found video\n\t- Title: {video_info.title}"
-            f"\n\t- Stream URL: {video_info.stream_url}"
-            f"\n\t- Webpage URL: {video_info.webpage_url}"
+            "Creating audio source\n\t- Title: %s\n\t- Stream URL: %s"
+            "\n\t- Webpage URL: %s",
+            video_info.title,
+            video_info.stream_url,
+            video_info.webpage_url,
         )
 
-        source = discord.FFmpegPCMAudio(video_info.stream_url, **cls.FFMPEG_CONFIG)
-        return cls(ctx, source, video_info=video_info, volume=volume)
+        source = discord.FFmpegPCMAudio(
+            video_info.stream_url,
+            **ffmpeg_options(cls.FFMPEG_CONFIG, video_info.stream_url, start=start),
+        )
+        return cls(
+            source,
+            video_info=video_info,
+            volume=volume,
+            start=start,
+        )
 
-    def __repr__(self):
-        return self.video_info.title
+    def _read_frame(self) -> bytes:
+        return self.original.read()
+
+    def _output_frame(self, frame: bytes) -> bytes:
+        return audioop.mul(frame, 2, min(self.volume, 2.0))
+
+
+class OpusYtdlSource(_TrackAudio, discord.FFmpegOpusAudio):
+    """
+    A YouTube audio source that ffmpeg delivers as Opus packets, which are
+    sent to Discord as they are, with no decoding or encoding in this process.
+
+    When the stream is already Opus (as YouTube's audio formats usually are)
+    and the volume is 100%, ffmpeg only remuxes it (`-c:a copy`). Otherwise
+    ffmpeg applies the volume and encodes. Either way the volume is fixed for
+    the lifetime of the source, so changing it means reopening the stream at
+    the current position.
+    """
+
+    LIVE_VOLUME = False
+    FFMPEG_CONFIG = YtdlSource.FFMPEG_CONFIG
+
+    def __init__(
+        self,
+        stream_url: str,
+        *,
+        video_info: VideoInfo,
+        volume: float = 1.0,
+        start: float = 0.0,
+        codec: Optional[str] = None,
+        bitrate: Optional[int] = None,
+    ):
+        passthrough = codec == "opus" and volume == 1.0
+        super().__init__(
+            stream_url,
+            codec="copy" if passthrough else None,
+            bitrate=bitrate,
+            **ffmpeg_options(
+                self.FFMPEG_CONFIG,
+                stream_url,
+                start=start,
+                volume=None if passthrough else volume,
+            ),
+        )
+        self.volume = volume
+        self.passthrough = passthrough
+        self._init_track_audio(video_info=video_info, start=start)
+
+    @classmethod
+    def from_video_info(
+        cls,
+        video_info: VideoInfo,
+        *,
+        volume: float = 1.0,
+        start: float = 0.0,
+        codec: Optional[str] = None,
+    ) -> OpusYtdlSource:
+        source = cls(
+            video_info.stream_url,
+            video_info=video_info,
+            volume=volume,
+            start=start,
+            codec=codec,
+            bitrate=YtdlSource.PLAYBACK_CONFIG.get("bitrate"),
+        )
+        logger.info(
+            "Creating %s Opus audio source\n\t- Title: %s\n\t- Stream URL: %s"
+            "\n\t- Webpage URL: %s",
+            "passthrough" if source.passthrough else "transcoded",
+            video_info.title,
+            video_info.stream_url,
+            video_info.webpage_url,
+        )
+        return source
+
+    def _read_frame(self) -> bytes:
+        return discord.FFmpegOpusAudio.read(self)
+
+
+class PooledYtdlSource(_TrackAudio, discord.AudioSource):
+    """
+    A YouTube audio source whose PCM is read from ffmpeg, scaled and encoded
+    to Opus by the encoder pool's worker processes, leaving only the sending
+    of finished packets to this process. Unlike `OpusYtdlSource`, the volume
+    can still be changed mid-stream: the new value is passed to the worker.
+    """
+
+    FFMPEG_CONFIG = YtdlSource.FFMPEG_CONFIG
+    ENCODER_POOL = EncoderPool(
+        workers=YtdlSource.PLAYBACK_CONFIG.get("encoder_workers", 2),
+        bitrate=YtdlSource.PLAYBACK_CONFIG.get("bitrate", 128),
+    )
+
+    def __init__(
+        self,
+        stream: PooledStream,
+        *,
+        video_info: VideoInfo,
+        volume: float = 0.5,
+        start: float = 0.0,
+    ):
+        self.stream = stream
+        self._volume = volume
+        self._init_track_audio(video_info=video_info, start=start)
+
+    @classmethod
+    def from_video_info(
+        cls,
+        video_info: VideoInfo,
+        *,
+        volume: float = 0.5,
+        start: float = 0.0,
+    ) -> PooledYtdlSource:
+        logger.info(
+            "Creating pooled audio source\n\t- Title: %s\n\t- Stream URL: %s"
+            "\n\t- Webpage URL: %s",
+            video_info.title,
+            video_info.stream_url,
+            video_info.webpage_url,
+        )
+        options = ffmpeg_options(cls.FFMPEG_CONFIG, video_info.stream_url, start=start)
+        # The same command line discord.FFmpegPCMAudio would run.
+        args = [
+            "ffmpeg",
+            *shlex.split(options["before_options"]),
+            "-i",
+            video_info.stream_url,
+            *("-f", "s16le", "-ar", "48000", "-ac", "2", "-loglevel", "warning"),
+            *shlex.split(options["options"]),
+            "pipe:1",
+        ]
+        return cls(
+            cls.ENCODER_POOL.open(args, volume=volume),
+            video_info=video_info,
+            volume=volume,
+            start=start,
+        )
+
+    @property
+    def volume(self) -> float:
+        return self._volume
+
+    @volume.setter
+    def volume(self, value: float):
+        self._volume = max(value, 0.0)
+        self.stream.set_volume(self._volume)
+
+    def is_opus(self) -> bool:
+        return True
+
+    def _read_frame(self) -> bytes:
+        return self.stream.read()
+
+    def cleanup(self):
+        self.stream.close()
+        super().cleanup()
+
+
+def warm_up():
+    """
+    Fill yt-dlp's player cache from its seed, then import yt-dlp and build
+    the downloader and the metadata models' validators, all of which are
+    otherwise left until the first request needs them. This blocks, so
+    should be run in a thread once the bot is up.
+    """
+    if YtdlSource.PLAYER_CACHE is not None:
+        YtdlSource.PLAYER_CACHE.warm()
+    YtdlSource.YTDL  # Built on first access
+    VideoInfo.model_rebuild()
+    VideoDownloadInfo.model_rebuild()
+
+
+def running_sources() -> List[_TrackAudio]:
+    """Every audio source whose ffmpeg process hasn't been cleaned up yet."""
+    return [source for source in list(_LIVE_SOURCES) if source.ffmpeg_running]
+
+
+def ffmpeg_options(
+    config: Dict[str, str],
+    source: str,
+    *,
+    start: float = 0.0,
+    volume: Optional[float] = None,
+) -> Dict[str, str]:
+    """
+    Build ffmpeg's options from the configured ones, optionally seeking to
+    `start` seconds and applying a volume filter. The configured input
+    options (HTTP reconnects) are left out when `source` is a local file.
+    """
+    is_local = urlparse(source).scheme not in ("http", "https")
+    before_options = "" if is_local else config.get("before_options", "")
+    options = config.get("options", "")
+    if start > 0:
+        before_options = f"-ss {start:.3f} {before_options}".strip()
+    if volume is not None:
+        options = f"{options} -filter:a volume={volume:.3f}".strip()
+    return {"before_options": before_options, "options": options}
+
+
+async def probe_audio_codec(video_info: VideoInfo) -> Optional[str]:
+    """
+    The stream's audio codec. yt-dlp normally reports it already, so ffprobe
+    is only run for entries that don't know (e.g. ones cached before it was
+    recorded).
+    """
+    if video_info.acodec:
+        return video_info.acodec
+
+    codec, _ = await discord.FFmpegOpusAudio.probe(video_info.stream_url)
+    return codec
+
+
+def default_volume() -> float:
+    """
+    The volume a new player starts at. In "opus" mode that's 100%, so Opus
+    streams are passed through without being decoded; the other modes scale
+    every frame anyway, and start at 50%. `"default_volume"` overrides both.
+    """
+    config = YtdlSource.PLAYBACK_CONFIG
+    passthrough = config.get("mode", "opus") == "opus"
+    return config.get("default_volume", 1.0 if passthrough else 0.5)
+
+
+async def create_audio_source(
+    video_info: VideoInfo,
+    *,
+    volume: float = 0.5,
+    start: float = 0.0,
+) -> YtdlSource | OpusYtdlSource | PooledYtdlSource:
+    """
+    Spawn ffmpeg for a track using the configured playback mode: "opus" (the
+    default) has ffmpeg produce Opus, passing an Opus stream straight through
+    where possible, "pcm" scales and encodes every frame in Python, and
+    "pooled" does the same in the encoder pool's worker processes.
+    """
+    mode = YtdlSource.PLAYBACK_CONFIG.get("mode", "opus")
+    if mode not in PLAYBACK_MODES:
+        raise ValueError(f"Unknown playback mode: {mode}. Use one of {PLAYBACK_MODES}.")
+
+    if mode in ("pcm", "pooled"):
+        source_cls = PooledYtdlSource if mode == "pooled" else YtdlSource
+        return source_cls.from_video_info(video_info, volume=volume, start=start)
+
+    # The codec only matters when the stream could be passed through untouched.
+    codec = await probe_audio_codec(video_info) if volume == 1.0 else None
+    return OpusYtdlSource.from_video_info(
+        video_info, volume=volume, start=start, codec=codec
+    )
+
+
+async def cache_audio(cache: AudioCache, video_info: VideoInfo) -> Optional[str]:
+    """
+    Download a track's audio into the audio cache, returning its local path.
+
+    The download runs in the loop's default executor rather than on the
+    extraction engine: it can take a while, and process workers would use
+    their own YoutubeDL instance instead of the cache's downloader.
+    """
+    video_id = video_info.video_id
+    try:
+        await extract_video(
+            cache.downloader, youtube_watch_url(video_id), download=True
+        )
+    except YTDLError as e:
+        logger.warning(f"Failed to cache audio for {video_id}: {e}")
+        cache.discard(video_id)
+        return None
+    return cache.store(video_id)
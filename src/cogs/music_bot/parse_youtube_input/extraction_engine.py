@@ -0,0 +1,287 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, Deque, Dict, Hashable, Optional
+
+from src.cogs.music_bot.parse_youtube_input.metadata_cache import trim_info
+from src.cogs.music_bot.parse_youtube_input.player_cache import PlayerCache
+from src.metrics import REGISTRY
+from src.parse_json import parse_json
+from src.tracing import Trace, current_span_id, current_trace
+
+if TYPE_CHECKING:
+    import yt_dlp
+
+logger = logging.getLogger(__name__)
+
+EXTRACTION_QUEUE_WAIT = REGISTRY.histogram(
+    "gimlibot_extraction_queue_wait_seconds",
+    "Time an extraction spent waiting for a free worker.",
+    labelnames=("backend",),
+)
+EXTRACTION_RUN_TIME = REGISTRY.histogram(
+    "gimlibot_extraction_run_seconds",
+    "Time spent inside yt-dlp for a single extraction.",
+    labelnames=("backend",),
+)
+EXTRACTIONS_QUEUED = REGISTRY.gauge(
+    "gimlibot_extractions_queued",
+    "Extractions waiting for a free worker.",
+    labelnames=("backend",),
+)
+
+BACKENDS = ("thread", "process")
+
+# Each worker process builds its own YoutubeDL instance in `_init_worker`, so
+# the class-level YtdlSource.YTDL is never pickled or shared across processes.
+_WORKER_YTDL: Optional[yt_dlp.YoutubeDL] = None
+
+
+def _init_worker(ydl_config: Dict[str, Any]) -> None:
+    import yt_dlp
+
+    global _WORKER_YTDL
+    _WORKER_YTDL = yt_dlp.YoutubeDL(ydl_config)
+
+
+def _extract_in_worker(url: str, download: bool) -> Optional[Dict[str, Any]]:
+    video_info = _WORKER_YTDL.extract_info(url, download=download)
+    if video_info is None:
+        return None
+    # Only the keys VideoInfo needs are pickled back, and sanitized first to
+    # strip anything that can't cross the process boundary (e.g. generators).
+    return _WORKER_YTDL.sanitize_info(trim_info(video_info))
+
+
+@dataclass
+class _Job:
+    run: Callable[[], Any]
+    guild: Hashable
+    future: asyncio.Future
+    queued_at: float = field(default_factory=time.monotonic)
+    # The request (if it's being traced) that the extraction is for.
+    trace: Optional[Trace] = field(default_factory=current_trace)
+    span_id: Optional[int] = field(default_factory=current_span_id)
+    # For extractions, whether the player cache was cold is worked out from
+    # its generation when the job started.
+    is_extraction: bool = False
+    player_cache_generation: Optional[int] = None
+
+
+class ExtractionEngine:
+    """
+    A bounded pool dedicated to yt-dlp extractions.
+
+    Jobs are queued per guild and dispatched round-robin, so one guild
+    queueing dozens of links can't starve the others, and each guild is
+    capped at `per_guild_limit` concurrent extractions. The "process"
+    backend moves yt-dlp's regex and JSON work off the bot's GIL entirely.
+    """
+
+    def __init__(
+        self,
+        *,
+        backend: str = "thread",
+        max_workers: int = 4,
+        per_guild_limit: int = 2,
+        ydl_config: Optional[Dict[str, Any]] = None,
+        player_cache: Optional[PlayerCache] = None,
+    ):
+        if backend not in BACKENDS:
+            raise ValueError(
+                f"Unknown extraction backend: {backend}. Use one of {BACKENDS}."
+            )
+        if max_workers < 1 or per_guild_limit < 1:
+            raise ValueError("max_workers and per_guild_limit must be at least 1.")
+        if backend == "process" and ydl_config is None:
+            raise ValueError("The process backend needs a ydl_config for its workers.")
+
+        self.backend = backend
+        self.max_workers = max_workers
+        self.per_guild_limit = per_guild_limit
+        self.ydl_config = ydl_config
+        self.player_cache = player_cache
+
+        self._executor: Optional[Executor] = None
+        self._local_executor: Optional[ThreadPoolExecutor] = None
+        self._pending: OrderedDict[Hashable, Deque[_Job]] = OrderedDict()
+        self._in_flight: Dict[Hashable, int] = {}
+        self._running = 0
+
+    @classmethod
+    def from_config(
+        cls,
+        config_path: str,
+        ydl_config: Dict[str, Any],
+        player_cache: Optional[PlayerCache] = None,
+    ) -> ExtractionEngine:
+        config = parse_json(config_path)
+        return cls(
+            backend=config.get("backend", "thread"),
+            max_workers=config.get("max_workers", 4),
+            per_guild_limit=config.get("per_guild_limit", 2),
+            ydl_config=ydl_config,
+            player_cache=player_cache,
+        )
+
+    @property
+    def executor(self) -> Executor:
+        # Workers are only started once the first extraction is requested.
+        if self._executor is None:
+            if self.backend == "process":
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.ydl_config,),
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="ytdl-extract"
+                )
+            logger.info(
+                f"Started {self.backend} extraction pool with {self.max_workers} workers."
+            )
+        return self._executor
+
+    @property
+    def local_executor(self) -> Executor:
+        """A thread pool for work that can't leave this process."""
+        if self.backend == "thread":
+            return self.executor
+        if self._local_executor is None:
+            self._local_executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="ytdl-local"
+            )
+        return self._local_executor
+
+    @property
+    def queued(self) -> int:
+        return sum(len(jobs) for jobs in self._pending.values())
+
+    async def extract_info(
+        self,
+        ytdl: yt_dlp.YoutubeDL,
+        url: str,
+        *,
+        download: bool = False,
+        guild_id: Optional[int] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Run `ytdl.extract_info` on the pool. With the process backend, `ytdl`
+        is ignored in favour of each worker's own YoutubeDL instance.
+        """
+        if self.backend == "process":
+            run = lambda: self.executor.submit(_extract_in_worker, url, download)
+        else:
+            run = lambda: self.executor.submit(ytdl.extract_info, url, download=download)
+
+        return await self._submit(run, guild_id, is_extraction=True)
+
+    async def run_local(self, fn: Callable[[], Any], *, guild_id: Optional[int] = None):
+        """
+        Fairly schedule a blocking callable that has to run in this process,
+        such as pulling the next page from a lazily evaluated playlist.
+        """
+        return await self._submit(lambda: self.local_executor.submit(fn), guild_id)
+
+    async def _submit(
+        self, run: Callable[[], Any], guild_id: Optional[int], *, is_extraction=False
+    ):
+        loop = asyncio.get_running_loop()
+        job = _Job(
+            run=run,
+            guild=guild_id,
+            future=loop.create_future(),
+            is_extraction=is_extraction,
+        )
+        self._pending.setdefault(guild_id, deque()).append(job)
+        EXTRACTIONS_QUEUED.inc(backend=self.backend)
+        self._dispatch()
+
+        return await job.future
+
+    def shutdown(self) -> None:
+        for jobs in self._pending.values():
+            for job in jobs:
+                job.future.cancel()
+        self._pending.clear()
+        EXTRACTIONS_QUEUED.set(0, backend=self.backend)
+
+        for executor in (self._executor, self._local_executor):
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+        self._local_executor = None
+
+    def _next_job(self) -> Optional[_Job]:
+        """Pop the next job round-robin, skipping guilds at their concurrency cap."""
+        for guild in list(self._pending):
+            if self._in_flight.get(guild, 0) >= self.per_guild_limit:
+                continue
+
+            jobs = self._pending[guild]
+            job = jobs.popleft()
+            EXTRACTIONS_QUEUED.dec(backend=self.backend)
+            # Rotate the guild to the back of the line (or drop it if drained).
+            del self._pending[guild]
+            if jobs:
+                self._pending[guild] = jobs
+            return job
+
+        return None
+
+    def _dispatch(self) -> None:
+        while self._running < self.max_workers:
+            job = self._next_job()
+            if job is None:
+                return
+            if job.future.cancelled():
+                continue
+
+            self._running += 1
+            self._in_flight[job.guild] = self._in_flight.get(job.guild, 0) + 1
+            started_at = time.monotonic()
+            EXTRACTION_QUEUE_WAIT.observe(
+                started_at - job.queued_at, backend=self.backend
+            )
+            if job.trace is not None:
+                job.trace.record(
+                    "extraction_queue_wait", job.queued_at, parent_id=job.span_id
+                )
+            if job.is_extraction and self.player_cache is not None:
+                job.player_cache_generation = self.player_cache.generation()
+            future = asyncio.wrap_future(job.run())
+            future.add_done_callback(
+                lambda f, job=job, started_at=started_at: self._finish(job, f, started_at)
+            )
+
+    def _finish(self, job: _Job, future: asyncio.Future, started_at: float) -> None:
+        run_time = time.monotonic() - started_at
+        EXTRACTION_RUN_TIME.observe(run_time, backend=self.backend)
+        if job.player_cache_generation is not None:
+            self.player_cache.observe(run_time, job.player_cache_generation)
+        if job.trace is not None:
+            job.trace.record(
+                "ytdlp_run", started_at, parent_id=job.span_id, backend=self.backend
+            )
+        self._running -= 1
+        self._in_flight[job.guild] -= 1
+        if not self._in_flight[job.guild]:
+            del self._in_flight[job.guild]
+
+        if not job.future.done():
+            if future.cancelled():
+                job.future.cancel()
+            elif future.exception() is not None:
+                job.future.set_exception(future.exception())
+            else:
+                job.future.set_result(future.result())
+
+        self._dispatch()
@@ -0,0 +1,292 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+from src.cogs.music_bot.parse_youtube_input.parsers import stream_url_expiry
+from src.metrics import REGISTRY
+from src.parse_json import parse_json
+
+logger = logging.getLogger(__name__)
+
+METADATA_CACHE_LOOKUPS = REGISTRY.counter(
+    "gimlibot_metadata_cache_lookups_total",
+    "Metadata cache lookups, by outcome (hit/miss).",
+    labelnames=("outcome",),
+)
+METADATA_CACHE_STREAM_REFRESHES = REGISTRY.counter(
+    "gimlibot_metadata_cache_stream_refreshes_total",
+    "Expired stream URLs of cached videos that were refreshed.",
+)
+METADATA_CACHE_EVICTIONS = REGISTRY.counter(
+    "gimlibot_metadata_cache_evictions_total",
+    "Entries evicted from the metadata cache to stay within max_entries.",
+)
+
+# The subset of a yt-dlp info dict that VideoInfo needs. Everything else
+# (formats, thumbnails, captions, ...) is dropped before it hits the disk.
+CACHED_INFO_KEYS = (
+    "id",
+    "title",
+    "thumbnail",
+    "duration",
+    "webpage_url",
+    "view_count",
+    "upload_date",
+    "acodec",
+    "filesize",
+    "filesize_approx",
+    "format_id",
+    "quality",
+)
+
+
+def trim_info(info: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Keep only the cached keys and the stream URL of a yt-dlp info dict (or of
+    each entry of a search result), so the heavy keys such as formats,
+    thumbnails and captions can be freed straight after extraction.
+    """
+    if "entries" in info:
+        return {"entries": [trim_info(entry) for entry in info["entries"] if entry]}
+    return {key: info[key] for key in (*CACHED_INFO_KEYS, "url") if key in info}
+
+
+# How many `put`s go by between recounting the entries on disk.
+RECOUNT_INTERVAL = 100
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS videos (
+    video_id TEXT PRIMARY KEY,
+    metadata TEXT NOT NULL,
+    stream_url TEXT,
+    stream_expires_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS videos_last_access ON videos (last_access);
+"""
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    stream_refreshes: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"hits={self.hits}, misses={self.misses}, "
+            f"hit_rate={self.hit_rate:.1%}, stream_refreshes={self.stream_refreshes}, "
+            f"evictions={self.evictions}"
+        )
+
+
+@dataclass
+class CachedVideo:
+    video_id: str
+    metadata: Dict[str, Any]
+    stream_url: Optional[str]
+    stream_expires_at: float = field(default=0.0)
+
+    @property
+    def stream_expired(self) -> bool:
+        return not self.stream_url or time.time() >= self.stream_expires_at
+
+    def to_info_dict(self) -> Dict[str, Any]:
+        """Rebuild a (trimmed) yt-dlp style info dict from the cached fields."""
+        return {**self.metadata, "url": self.stream_url}
+
+
+class MetadataCache:
+    """
+    An on-disk, LRU-bounded cache of video metadata, backed by SQLite.
+
+    Entries are keyed by canonical YouTube video ID (search queries are
+    resolved to video IDs by the separate SearchCache). Stable metadata is
+    kept separately from the short-lived stream URL, which carries its own
+    expiry so that a cache hit only needs a network call to refresh it.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        max_entries: int = 5000,
+        stream_url_ttl: float = 5 * 60 * 60,
+        expiry_margin: float = 10 * 60,
+    ):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1.")
+
+        self.path = path
+        self.max_entries = max_entries
+        self.stream_url_ttl = stream_url_ttl
+        self.expiry_margin = expiry_margin
+        self.stats = CacheStats()
+
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        # A running count of the entries, so `put` needn't count them each time.
+        self._count = 0
+        self._puts = 0
+
+    @classmethod
+    def from_config(cls, config_path: str) -> MetadataCache:
+        config = parse_json(config_path)
+        return cls(
+            config["path"],
+            max_entries=config.get("max_entries", 5000),
+            stream_url_ttl=config.get("stream_url_ttl", 5 * 60 * 60),
+            expiry_margin=config.get("expiry_margin", 10 * 60),
+        )
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        # Connect lazily, so importing the module never touches the disk.
+        if self._connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            connection = sqlite3.connect(
+                self.path, check_same_thread=False, isolation_level=None
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(_SCHEMA)
+            (self._count,) = connection.execute("SELECT COUNT(*) FROM videos").fetchone()
+            self._connection = connection
+            logger.info(f"Metadata cache opened at: {self.path}")
+
+        return self._connection
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self.connection.execute("SELECT COUNT(*) FROM videos").fetchone()
+        return count
+
+    def get(self, video_id: str) -> Optional[CachedVideo]:
+        """
+        Look up a video by its ID.
+        Hits refresh the entry's position in the LRU order.
+        """
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT metadata, stream_url, stream_expires_at "
+                "FROM videos WHERE video_id = ?",
+                (video_id,),
+            ).fetchone()
+
+            if row is None:
+                self.stats.misses += 1
+                METADATA_CACHE_LOOKUPS.inc(outcome="miss")
+                logger.debug("Metadata cache miss (%s)", self.stats)
+                return None
+
+            self.connection.execute(
+                "UPDATE videos SET last_access = ? WHERE video_id = ?",
+                (time.time(), video_id),
+            )
+            self.stats.hits += 1
+            METADATA_CACHE_LOOKUPS.inc(outcome="hit")
+
+        logger.debug("Metadata cache hit for %s (%s)", video_id, self.stats)
+        metadata, stream_url, stream_expires_at = row
+        return CachedVideo(
+            video_id=video_id,
+            metadata=json.loads(metadata),
+            stream_url=stream_url,
+            stream_expires_at=stream_expires_at,
+        )
+
+    def put(self, info: Dict[str, Any]) -> None:
+        """Store the metadata of a single (non-playlist) yt-dlp info dict."""
+        video_id = info.get("id")
+        if not video_id:
+            logger.warning("Not caching video information without an ID.")
+            return
+
+        metadata = {key: info.get(key) for key in CACHED_INFO_KEYS}
+        stream_url = info.get("url")
+        now = time.time()
+
+        with self._lock:
+            exists = self.connection.execute(
+                "SELECT 1 FROM videos WHERE video_id = ?", (video_id,)
+            ).fetchone()
+            self.connection.execute(
+                "INSERT OR REPLACE INTO videos "
+                "(video_id, metadata, stream_url, stream_expires_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (
+                    video_id,
+                    json.dumps(metadata, separators=(",", ":")),
+                    stream_url,
+                    self._stream_expires_at(stream_url),
+                    now,
+                ),
+            )
+            if exists is None:
+                self._count += 1
+            self._evict()
+
+    def update_stream_url(self, video_id: str, stream_url: str) -> None:
+        """Replace the stream URL of a cached video, resetting its expiry."""
+        with self._lock:
+            self.connection.execute(
+                "UPDATE videos SET stream_url = ?, stream_expires_at = ?, "
+                "last_access = ? WHERE video_id = ?",
+                (stream_url, self._stream_expires_at(stream_url), time.time(), video_id),
+            )
+            self.stats.stream_refreshes += 1
+            METADATA_CACHE_STREAM_REFRESHES.inc()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def _stream_expires_at(self, stream_url: Optional[str]) -> float:
+        if not stream_url:
+            return 0.0
+
+        expires_at = stream_url_expiry(stream_url)
+        if expires_at is None:
+            expires_at = time.time() + self.stream_url_ttl
+        # Refresh a little early, so a URL doesn't expire mid-track.
+        return expires_at - self.expiry_margin
+
+    def _evict(self) -> None:
+        # Must be called while holding self._lock.
+        self._puts += 1
+        if self._puts % RECOUNT_INTERVAL == 0:
+            # Other processes (e.g. cluster workers) may share the file, so the
+            # running count is corrected every so often.
+            (self._count,) = self.connection.execute(
+                "SELECT COUNT(*) FROM videos"
+            ).fetchone()
+        overflow = self._count - self.max_entries
+        if overflow <= 0:
+            return
+
+        self.connection.execute(
+            "DELETE FROM videos WHERE video_id IN "
+            "(SELECT video_id FROM videos ORDER BY last_access ASC LIMIT ?)",
+            (overflow,),
+        )
+        self._count -= overflow
+        self.stats.evictions += overflow
+        METADATA_CACHE_EVICTIONS.inc(overflow)
+        logger.debug(f"Evicted {overflow} entries from the metadata cache.")
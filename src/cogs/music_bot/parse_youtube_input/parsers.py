@@ -1,4 +1,6 @@
 from datetime import datetime
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
 
 
 def parse_duration(duration: int) -> str:
@@ -64,3 +66,21 @@ def readable_view_count(view_count: int) -> str:
             return f"{formatted_value}{suffix} {plural_suffix}"
 
     return "0 views"
+
+
+def stream_url_expiry(stream_url: str) -> Optional[float]:
+    """
+    Return the unix timestamp at which a googlevideo stream URL expires.
+
+    YouTube embeds the expiry as an ``expire`` query parameter. If it
+    is missing or malformed, None is returned and callers should fall
+    back to a default TTL.
+    """
+    expire = parse_qs(urlparse(stream_url).query).get("expire")
+    if not expire:
+        return None
+
+    try:
+        return float(expire[0])
+    except ValueError:
+        return None
@@ -0,0 +1,168 @@
+"""
+A persistent yt-dlp cache directory for YouTube's player data.
+
+To decipher stream URLs, yt-dlp downloads and interprets YouTube's player
+JavaScript, and caches what it derives from it under its `cachedir`. A
+fresh container starts with an empty cache, so the first extractions after
+each deploy pay for that again, in every extraction worker.
+
+`PlayerCache` points every YoutubeDL the bot builds (in this process and in
+extraction workers) at one shared directory. At startup it is warmed in the
+background from a locally stored seed copy (e.g. on a volume that outlives
+the container), and on shutdown anything new is copied back to the seed.
+
+yt-dlp writes each cache entry to a temporary file and renames it into
+place, so readers never see a partial entry. Copies to and from the seed
+are made the same way, under a lock file, so several threads and processes
+can share the directory.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from src.metrics import REGISTRY
+from src.parse_json import parse_json
+
+logger = logging.getLogger(__name__)
+
+LOCK_FILE = ".lock"
+
+EXTRACTION_PLAYER_CACHE = REGISTRY.histogram(
+    "gimlibot_extraction_player_cache_seconds",
+    "Time spent inside yt-dlp for an extraction, by whether YouTube's player "
+    "data had to be fetched and interpreted (cold) or came from the cache (warm).",
+    labelnames=("cache",),
+    buckets=(0.25, 0.5, 1.0, 1.5, 2.0, 3.0, 5.0, 7.5, 10.0, 20.0),
+)
+
+
+class PlayerCache:
+    """
+    The yt-dlp cache in `directory`, optionally seeded from and saved back
+    to `seed_directory`.
+    """
+
+    def __init__(self, directory: str, *, seed_directory: Optional[str] = None):
+        self.directory = directory
+        self.seed_directory = seed_directory
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config_path: str) -> Optional[PlayerCache]:
+        """Build the cache described by a config file, or None if it's disabled."""
+        config = parse_json(config_path)
+        if not config.get("enabled", True):
+            return None
+        return cls(
+            config.get("directory", ".cache/yt-dlp"),
+            seed_directory=config.get("seed_directory"),
+        )
+
+    def generation(self) -> int:
+        """
+        A value that changes whenever yt-dlp stores a new cache entry: the
+        newest modification time of the cache's sections (subdirectories).
+        """
+        newest = 0
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        newest = max(newest, entry.stat().st_mtime_ns)
+        except FileNotFoundError:
+            pass
+        return newest
+
+    def observe(self, seconds: float, generation: int):
+        """
+        Record an extraction's run time. It was cold if yt-dlp stored player
+        data while it ran, i.e. the `generation` it started at has changed.
+        """
+        cache = "warm" if self.generation() == generation else "cold"
+        EXTRACTION_PLAYER_CACHE.observe(seconds, cache=cache)
+
+    def warm(self) -> int:
+        """
+        Copy entries from the seed that the cache is missing (or has older
+        copies of). Returns how many were copied. This blocks.
+        """
+        if self.seed_directory is None:
+            return 0
+        copied = self._sync(self.seed_directory, self.directory)
+        logger.info("Warmed the yt-dlp cache with %d entries from the seed.", copied)
+        return copied
+
+    def persist(self) -> int:
+        """Copy new or updated entries back to the seed. This blocks."""
+        if self.seed_directory is None:
+            return 0
+        return self._sync(self.directory, self.seed_directory)
+
+    def _sync(self, source: str, destination: str) -> int:
+        if not os.path.isdir(source):
+            return 0
+
+        copied = 0
+        with self._locked(destination):
+            for root, _, files in os.walk(source):
+                relative = os.path.relpath(root, source)
+                target_root = os.path.normpath(os.path.join(destination, relative))
+                for name in files:
+                    if name == LOCK_FILE or name.endswith(".tmp"):
+                        continue
+                    path = os.path.join(root, name)
+                    target = os.path.join(target_root, name)
+                    if _is_up_to_date(target, path):
+                        continue
+                    os.makedirs(target_root, exist_ok=True)
+                    _copy_atomically(path, target)
+                    copied += 1
+        return copied
+
+    @contextmanager
+    def _locked(self, directory: str) -> Iterator[None]:
+        """Hold this process's lock, and the directory's lock file across processes."""
+        os.makedirs(directory, exist_ok=True)
+        with self._lock, open(os.path.join(directory, LOCK_FILE), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def with_player_cache(
+    ydl_config: Dict[str, Any], player_cache: Optional[PlayerCache]
+) -> Dict[str, Any]:
+    """`ydl_config`, pointed at the player cache's directory if there is one."""
+    if player_cache is None:
+        return ydl_config
+    return {**ydl_config, "cachedir": os.path.abspath(player_cache.directory)}
+
+
+def _is_up_to_date(target: str, source: str) -> bool:
+    try:
+        return os.stat(target).st_mtime_ns >= os.stat(source).st_mtime_ns
+    except FileNotFoundError:
+        return False
+
+
+def _copy_atomically(source: str, target: str):
+    """Copy a file (keeping its modification time) so it appears all at once."""
+    descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(target), suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "wb") as file, open(source, "rb") as original:
+            shutil.copyfileobj(original, file)
+        shutil.copystat(source, temporary)
+        os.replace(temporary, target)
+    except BaseException:
+        os.unlink(temporary)
+        raise
@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from src.cogs.music_bot.parse_youtube_input.metadata_cache import RECOUNT_INTERVAL
+from src.metrics import REGISTRY
+from src.parse_json import parse_json
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CACHE_LOOKUPS = REGISTRY.counter(
+    "gimlibot_search_cache_lookups_total",
+    "Search cache lookups, by outcome (hit/miss/expired).",
+    labelnames=("outcome",),
+)
+SEARCH_CACHE_EVICTIONS = REGISTRY.counter(
+    "gimlibot_search_cache_evictions_total",
+    "Entries evicted from the search cache to stay within max_entries.",
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS searches (
+    query TEXT PRIMARY KEY,
+    video_id TEXT NOT NULL,
+    resolved_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS searches_last_access ON searches (last_access);
+"""
+
+
+@dataclass
+class SearchCacheStats:
+    hits: int = 0
+    misses: int = 0
+    expired: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses + self.expired
+        return self.hits / lookups if lookups else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"hits={self.hits}, misses={self.misses}, expired={self.expired}, "
+            f"hit_rate={self.hit_rate:.1%}, evictions={self.evictions}"
+        )
+
+
+class SearchCache:
+    """
+    An on-disk cache of which video a normalised search query resolved to,
+    backed by SQLite, so a repeated search skips yt-dlp's search entirely.
+
+    Entries expire `ttl` seconds after the search was run (search results
+    drift over time) and are evicted least recently used beyond
+    `max_entries`. This is independent of the metadata cache: a query keeps
+    its video ID even after the video's metadata has been evicted, in which
+    case only the (cheaper) video extraction has to be repeated.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        max_entries: int = 20_000,
+        ttl: float = 7 * 24 * 60 * 60,
+    ):
+        if max_entries < 1 or ttl <= 0:
+            raise ValueError("max_entries and ttl must be positive.")
+
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stats = SearchCacheStats()
+
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        # A running count of the entries, so `put` needn't count them each time.
+        self._count = 0
+        self._puts = 0
+
+    @classmethod
+    def from_config(cls, config_path: str) -> Optional[SearchCache]:
+        """Build the cache described by a config file, or None if it's disabled."""
+        config = parse_json(config_path)
+        if not config.get("enabled", True):
+            return None
+        return cls(
+            config["path"],
+            max_entries=config.get("max_entries", 20_000),
+            ttl=config.get("ttl", 7 * 24 * 60 * 60),
+        )
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        # Connect lazily, so importing the module never touches the disk.
+        if self._connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            connection = sqlite3.connect(
+                self.path, check_same_thread=False, isolation_level=None
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(_SCHEMA)
+            (self._count,) = connection.execute(
+                "SELECT COUNT(*) FROM searches"
+            ).fetchone()
+            self._connection = connection
+            logger.info(f"Search cache opened at: {self.path}")
+
+        return self._connection
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self.connection.execute("SELECT COUNT(*) FROM searches").fetchone()
+        return count
+
+    def get(self, query: str) -> Optional[str]:
+        """
+        The video ID a normalised query last resolved to, or None if it hasn't
+        been searched for (or not within the TTL). Hits refresh the entry's
+        position in the LRU order.
+        """
+        now = time.time()
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT video_id, resolved_at FROM searches WHERE query = ?", (query,)
+            ).fetchone()
+
+            if row is not None and now - row[1] >= self.ttl:
+                self.connection.execute("DELETE FROM searches WHERE query = ?", (query,))
+                self._count -= 1
+                self.stats.expired += 1
+                SEARCH_CACHE_LOOKUPS.inc(outcome="expired")
+                return None
+            if row is None:
+                self.stats.misses += 1
+                SEARCH_CACHE_LOOKUPS.inc(outcome="miss")
+                return None
+
+            self.connection.execute(
+                "UPDATE searches SET last_access = ? WHERE query = ?", (now, query)
+            )
+            self.stats.hits += 1
+            SEARCH_CACHE_LOOKUPS.inc(outcome="hit")
+
+        logger.debug("Search cache hit for %r (%s)", query, self.stats)
+        return row[0]
+
+    def put(self, query: str, video_id: str) -> None:
+        """Remember the video a normalised query resolved to."""
+        now = time.time()
+        with self._lock:
+            exists = self.connection.execute(
+                "SELECT 1 FROM searches WHERE query = ?", (query,)
+            ).fetchone()
+            self.connection.execute(
+                "INSERT OR REPLACE INTO searches "
+                "(query, video_id, resolved_at, last_access) VALUES (?, ?, ?, ?)",
+                (query, video_id, now, now),
+            )
+            if exists is None:
+                self._count += 1
+            self._evict()
+
+    def discard(self, query: str) -> None:
+        """Forget a query, e.g. because its video is no longer available."""
+        with self._lock:
+            deleted = self.connection.execute(
+                "DELETE FROM searches WHERE query = ?", (query,)
+            ).rowcount
+            self._count -= deleted
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def _evict(self) -> None:
+        # Must be called while holding self._lock.
+        self._puts += 1
+        if self._puts % RECOUNT_INTERVAL == 0:
+            # Other processes (e.g. cluster workers) may share the file, so the
+            # running count is corrected every so often.
+            (self._count,) = self.connection.execute(
+                "SELECT COUNT(*) FROM searches"
+            ).fetchone()
+        overflow = self._count - self.max_entries
+        if overflow <= 0:
+            return
+
+        self.connection.execute(
+            "DELETE FROM searches WHERE query IN "
+            "(SELECT query FROM searches ORDER BY last_access ASC LIMIT ?)",
+            (overflow,),
+        )
+        self._count -= overflow
+        self.stats.evictions += overflow
+        SEARCH_CACHE_EVICTIONS.inc(overflow)
+        logger.debug(f"Evicted {overflow} entries from the search cache.")
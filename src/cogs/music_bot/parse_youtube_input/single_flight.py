@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+from src.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+SINGLE_FLIGHT_CALLS = REGISTRY.counter(
+    "gimlibot_single_flight_calls_total",
+    "Calls through a single-flight group, by whether they started work or joined "
+    "an identical call already in flight.",
+    labelnames=("group", "outcome"),
+)
+
+
+class SingleFlight:
+    """
+    Deduplicate concurrent calls that share a key.
+
+    The first caller for a key starts the work; anyone else asking for the
+    same key while it is in flight awaits the same task and gets the same
+    result (or exception). Cancelling one waiter never cancels the shared work.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._in_flight)
+
+    async def do(self, key: Hashable, factory: Callable[[], Awaitable[T]]) -> T:
+        task = self._in_flight.get(key)
+        if task is None:
+            SINGLE_FLIGHT_CALLS.inc(group=self.name, outcome="started")
+            task = asyncio.ensure_future(factory())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda task, key=key: self._forget(key, task))
+        else:
+            SINGLE_FLIGHT_CALLS.inc(group=self.name, outcome="coalesced")
+            logger.info("Joining in-flight %s for: %s", self.name, key)
+
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        self._in_flight.pop(key, None)
+        # Mark the exception as retrieved, in case every waiter was cancelled.
+        if not task.cancelled():
+            task.exception()
+
+    @property
+    def coalesced(self) -> float:
+        return SINGLE_FLIGHT_CALLS.value(group=self.name, outcome="coalesced")
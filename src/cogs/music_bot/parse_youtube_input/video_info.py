@@ -1,10 +1,10 @@
 from __future__ import annotations
 
 import logging
-from typing import Dict, Optional
+from typing import Any, Dict, Optional
 
 import discord
-from pydantic import BaseModel, Field, HttpUrl, field_validator
+from pydantic import BaseModel, ConfigDict, Field, HttpUrl, field_validator
 
 from src.cogs.music_bot.parse_youtube_input.parsers import (
     parse_date,
@@ -16,21 +16,39 @@ logger = logging.getLogger(__name__)
 
 
 class VideoDownloadInfo(BaseModel):
+    # Validators are built on first use (or by `warm_up`), not at import.
+    model_config = ConfigDict(defer_build=True)
+
     filesize: Optional[int]
     format_id: Optional[str]
-    quality: Optional[str]
+    quality: Optional[float]
 
     @classmethod
     def parse_video_download_info(cls, video_info: Dict[str, str]) -> VideoDownloadInfo:
         return cls(
-            filesize=video_info.get("filesize"),
+            # yt-dlp only estimates the size of some formats.
+            filesize=video_info.get("filesize") or video_info.get("filesize_approx"),
             format_id=video_info.get("format_id"),
             quality=video_info.get("quality"),
         )
 
+    def formatted_log(self) -> str:
+        """Return a formatted log string for the download information."""
+        lines = [
+            "Download Information:",
+            f"\tFile Size: {self.filesize}",
+            f"\tFormat ID: {self.format_id}",
+            f"\tQuality: {self.quality}",
+        ]
+        return "\n".join(lines)
+
 
 # TODO(ThomasHepworth): Add some tests for this class.
 class VideoInfo(BaseModel):
+    # Immutable, so one instance can be shared by every queue the track is in.
+    model_config = ConfigDict(frozen=True, defer_build=True)
+
+    video_id: Optional[str] = None
     title: str
     thumbnail: HttpUrl
     duration: int = Field(..., gt=0, description="Video duration in seconds.")
@@ -38,6 +56,7 @@ class VideoInfo(BaseModel):
     stream_url: HttpUrl
     view_count: int = Field(..., ge=0, description="Total video view count.")
     upload_date: str
+    acodec: Optional[str] = None
     download_info: Optional[VideoDownloadInfo] = None
 
     @field_validator("upload_date")
@@ -79,20 +98,38 @@ class VideoInfo(BaseModel):
             else:
                 video_download_info = None
 
-            return cls(
-                title=video_info.get("title", "Unknown Title"),
-                thumbnail=video_info.get("thumbnail"),
-                duration=video_info.get("duration"),
-                webpage_url=video_info.get("webpage_url"),
-                stream_url=video_info.get("url"),
-                view_count=video_info.get("view_count", 0),
-                upload_date=video_info.get("upload_date"),
-                download_info=video_download_info,
-            )
+            return cls(**_info_fields(video_info), download_info=video_download_info)
         except Exception as e:
             logging.error(f"Error parsing video information: {e}")
             raise ValueError("Invalid video information format.") from e
 
+    @classmethod
+    def from_trusted_info(
+        cls, video_info: Dict[str, Any], download_info: bool = False
+    ) -> VideoInfo:
+        """
+        Build a VideoInfo from an info dict that has already been through
+        `parse_video_information`, such as a metadata cache entry, without
+        running the full validation again. Only the URLs and display fields
+        are converted, so the result equals a validated record.
+        """
+        fields = _info_fields(video_info)
+        if not fields["stream_url"]:
+            raise ValueError("No stream URL in the video information.")
+        fields["thumbnail"] = HttpUrl(fields["thumbnail"])
+        fields["webpage_url"] = HttpUrl(fields["webpage_url"])
+        fields["view_count"] = readable_view_count(fields["view_count"])
+        fields["upload_date"] = parse_date(fields["upload_date"])
+
+        video_download_info = None
+        if download_info:
+            video_download_info = VideoDownloadInfo.model_construct(
+                filesize=video_info.get("filesize") or video_info.get("filesize_approx"),
+                format_id=video_info.get("format_id"),
+                quality=video_info.get("quality"),
+            )
+        return cls.model_construct(**fields, download_info=video_download_info)
+
     def formatted_log(self) -> str:
         """Return a formatted log string for video information."""
         lines = [
@@ -113,13 +150,13 @@ class VideoInfo(BaseModel):
         if self.download_info:
             logger.info(self.download_info.formatted_log())
 
-    def create_song_embed(self, requester: discord.Member) -> discord.Embed:
+    def create_song_embed(self, requester_id: int) -> discord.Embed:
         """
         Create a well-formatted Discord embed for the currently playing song.
 
         Args:
             video_info (VideoInfo): Parsed video information.
-            requester (discord.Member): The Discord member who requested the song.
+            requester_id (int): The ID of the Discord member who requested the song.
 
         Returns:
             discord.Embed: A formatted Discord embed with video information.
@@ -136,7 +173,7 @@ class VideoInfo(BaseModel):
         )
         embed.add_field(name="Views", value=self.view_count, inline=True)
         embed.add_field(name="Upload Date", value=self.upload_date, inline=True)
-        embed.add_field(name="Requested by", value=requester.mention, inline=True)
+        embed.add_field(name="Requested by", value=f"<@{requester_id}>", inline=True)
         embed.add_field(
             name="Watch URL", value=f"[Click here]({self.webpage_url})", inline=False
         )
@@ -153,7 +190,34 @@ class VideoInfo(BaseModel):
         Returns:
             str: A formatted string with song information.
         """
-        return (
-            f"`{order}.` [**{self.title}**]({self.webpage_url})\n\t"
-            f"⏱️ `{parse_duration(self.duration)}`"
-        )
+        return format_song_queue_entry(order, self.title, self.webpage_url, self.duration)
+
+
+def _info_fields(video_info: Dict[str, Any]) -> Dict[str, Any]:
+    """The VideoInfo fields of a yt-dlp info dict, before validation."""
+    return {
+        "video_id": video_info.get("id"),
+        "title": video_info.get("title", "Unknown Title"),
+        "thumbnail": video_info.get("thumbnail"),
+        "duration": video_info.get("duration"),
+        "webpage_url": video_info.get("webpage_url"),
+        "stream_url": video_info.get("url"),
+        "view_count": video_info.get("view_count", 0),
+        "upload_date": video_info.get("upload_date"),
+        "acodec": video_info.get("acodec"),
+    }
+
+
+def format_song_queue_entry(
+    order: int,
+    title: str,
+    webpage_url: str,
+    duration: Optional[int],
+    eta: Optional[float] = None,
+) -> str:
+    """Format a single line of the `!queue` listing."""
+    duration_text = parse_duration(duration) if duration else "Unknown duration"
+    entry = f"`{order}.` [**{title}**]({webpage_url})\n\t⏱️ `{duration_text}`"
+    if eta is not None:
+        entry += f" | ▶️ in `{parse_duration(int(eta))}`"
+    return entry
@@ -0,0 +1,178 @@
+"""
+Compact snapshots of each guild's queue on local disk, for a warm restart.
+
+A deploy or crash used to lose every queue, and the burst of `!play`
+commands that followed meant a burst of extractions. Every `interval`
+seconds (and on shutdown) each voice state's `VoiceState.snapshot` is
+written to `<directory>/<guild_id>.json`. On startup the bot rejoins each
+voice channel and picks the current song up where it left off. Only that
+song's stream URL is resolved straight away; the rest of the queue is
+restored as unresolved tracks, whose metadata (mostly from the metadata
+cache) is fetched as they near the front.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from src.cogs.music_bot.queued_track import QueuedTrack
+from src.metrics import REGISTRY
+from src.parse_json import parse_json
+
+if TYPE_CHECKING:
+    from src.cogs.music_bot.voice_state import VoiceState
+
+logger = logging.getLogger(__name__)
+
+Snapshot = Dict[str, Any]
+
+QUEUES_RESTORED = REGISTRY.counter(
+    "gimlibot_queues_restored_total",
+    "Guild queues restored from snapshots on startup, by outcome.",
+    labelnames=("outcome",),
+)
+
+
+class QueueSnapshots:
+    """
+    Reads and writes per-guild queue snapshots in `directory`. Snapshots
+    older than `max_age` seconds are ignored on startup, as nobody will be
+    waiting for those queues any more.
+    """
+
+    def __init__(self, directory: str, *, interval: float = 30, max_age: float = 3600):
+        self.directory = directory
+        self.interval = interval
+        self.max_age = max_age
+        # The last snapshot written for each guild, so unchanged ones are skipped.
+        self._written: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_config(cls, config_path: str) -> Optional[QueueSnapshots]:
+        """Build the store described by a config file, or None if it's disabled."""
+        config = parse_json(config_path)
+        if not config.get("enabled", True):
+            return None
+        return cls(
+            config.get("directory", ".cache/queues"),
+            interval=config.get("interval", 30),
+            max_age=config.get("max_age", 3600),
+        )
+
+    def path(self, guild_id: int) -> str:
+        return os.path.join(self.directory, f"{guild_id}.json")
+
+    def capture(
+        self, voice_states: Dict[int, VoiceState]
+    ) -> Dict[int, Optional[Snapshot]]:
+        """
+        Every voice state's snapshot, and None for guilds that had one written
+        but have since stopped playing or left (so theirs is deleted).
+        """
+        with self._lock:
+            snapshots = {guild_id: None for guild_id in self._written}
+        for guild_id, state in voice_states.items():
+            snapshots[guild_id] = state.snapshot()
+        return snapshots
+
+    def save(self, snapshots: Dict[int, Optional[Snapshot]]):
+        """
+        Write the snapshots that changed, each replacing the last one in a
+        single rename, and delete those that are None. This blocks.
+        """
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            for guild_id, snapshot in snapshots.items():
+                path = self.path(guild_id)
+                if snapshot is None:
+                    if self._written.pop(guild_id, None) is not None:
+                        self._remove(path)
+                    continue
+
+                # The save time alone doesn't make a snapshot worth rewriting.
+                data = json.dumps({**snapshot, "saved_at": None}, separators=(",", ":"))
+                if self._written.get(guild_id) == data:
+                    continue
+                temporary = f"{path}.tmp"
+                with open(temporary, "w") as file:
+                    json.dump(snapshot, file, separators=(",", ":"))
+                os.replace(temporary, path)
+                self._written[guild_id] = data
+
+    def load(self) -> Dict[int, Snapshot]:
+        """Every recent snapshot on disk, by guild ID. This blocks."""
+        snapshots = {}
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return snapshots
+
+        now = time.time()
+        for name in names:
+            guild_id, extension = os.path.splitext(name)
+            if extension != ".json" or not guild_id.isdigit():
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                with open(path) as file:
+                    snapshot = json.load(file)
+            except (OSError, ValueError):
+                logger.warning("Ignoring unreadable queue snapshot: %s", path)
+                continue
+            if now - snapshot.get("saved_at", 0) > self.max_age:
+                self._remove(path)
+                continue
+            snapshots[int(guild_id)] = snapshot
+        return snapshots
+
+    def discard(self, guild_id: int):
+        """Delete a guild's snapshot, e.g. once it can't be restored."""
+        with self._lock:
+            self._written.pop(guild_id, None)
+            self._remove(self.path(guild_id))
+
+    def restore(self, state: VoiceState, snapshot: Snapshot, *, guild_id: int):
+        """Queue a snapshot's songs on a new voice state that's already connected."""
+        with self._lock:
+            # Tracked from now on, so the snapshot is deleted if the queue ends.
+            self._written.setdefault(guild_id, "")
+        state.volume = snapshot.get("volume", state.volume)
+        state.loop = snapshot.get("loop", False)
+        if snapshot.get("current"):
+            track = QueuedTrack.from_snapshot(snapshot["current"], guild_id=guild_id)
+            state.resume(track, snapshot.get("position", 0.0))
+        for entry in snapshot.get("queue", ()):
+            state.songs.put_nowait(QueuedTrack.from_snapshot(entry, guild_id=guild_id))
+
+    def start(self, voice_states: Dict[int, VoiceState]):
+        """Save snapshots of `voice_states` every `interval` seconds."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(voice_states))
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self, voice_states: Dict[int, VoiceState]):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(self.save, self.capture(voice_states))
+            except Exception:
+                logger.exception("Failed to save queue snapshots.")
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,303 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+import weakref
+from typing import Any, Dict, List, Optional
+
+from discord.ext import commands
+
+from src.cogs.music_bot.parse_youtube_input.extract_from_youtube import (
+    OpusYtdlSource,
+    PooledYtdlSource,
+    YtdlSource,
+    cache_audio,
+    create_audio_source,
+    extract_video,
+    refresh_stream_url,
+    youtube_watch_url,
+)
+from src.cogs.music_bot.parse_youtube_input.parsers import stream_url_expiry
+from src.cogs.music_bot.parse_youtube_input.video_info import (
+    VideoInfo,
+    format_song_queue_entry,
+)
+from src.tracing import Trace, use
+
+logger = logging.getLogger(__name__)
+
+# Background audio cache downloads, referenced so they aren't garbage collected.
+_AUDIO_CACHE_FILLS: set[asyncio.Task] = set()
+
+# The shared VideoInfo of every queued track, by video ID. Entries disappear
+# once no queue holds the track any more.
+_TRACK_RECORDS: weakref.WeakValueDictionary[str, VideoInfo] = (
+    weakref.WeakValueDictionary()
+)
+
+
+def intern_video_info(video_info: VideoInfo) -> VideoInfo:
+    """
+    Return the shared instance of a track's (immutable) VideoInfo, so a song
+    queued in many guilds holds its metadata once. Records are matched by
+    video ID and stream URL; one with a different (e.g. refreshed) stream URL
+    replaces the shared one.
+    """
+    if video_info.video_id is None:
+        return video_info
+
+    shared = _TRACK_RECORDS.get(video_info.video_id)
+    if shared is not None and shared.stream_url == video_info.stream_url:
+        return shared
+    _TRACK_RECORDS[video_info.video_id] = video_info
+    return video_info
+
+
+class QueuedTrack:
+    """
+    A song queue entry that only holds a track's metadata.
+
+    No ffmpeg process or stream connection exists until the track is played,
+    at which point `create_source` re-resolves the stream URL if it has gone
+    stale while waiting in the queue.
+
+    Tracks queued from a playlist start out unresolved: they only carry the
+    ID, title and duration from the playlist listing, and their full metadata
+    is fetched by `resolve` shortly before they are needed.
+
+    Entries are kept small, as a busy bot holds a great many of them: the
+    metadata is an interned VideoInfo shared with every other queue holding
+    the same track, and the requester and channel are held by ID.
+    """
+
+    __slots__ = (
+        "video_info",
+        "requester_id",
+        "channel_id",
+        "guild_id",
+        "resolved_at",
+        "requested_at",
+        "trace",
+        "_video_id",
+        "_title",
+        "_duration",
+    )
+
+    # Defaults for when no metadata cache (which has its own settings) is configured.
+    STREAM_URL_TTL = 5 * 60 * 60  # Used when the URL carries no expiry.
+    STREAM_EXPIRY_MARGIN = 10 * 60
+
+    def __init__(
+        self,
+        video_info: Optional[VideoInfo],
+        *,
+        requester_id: int,
+        channel_id: int,
+        guild_id: int | None = None,
+        requested_at: float | None = None,
+        video_id: str | None = None,
+        title: str | None = None,
+        duration: int | None = None,
+    ):
+        if video_info is None and video_id is None:
+            raise ValueError("An unresolved track needs a video_id.")
+
+        self.video_info = intern_video_info(video_info) if video_info else None
+        self.requester_id = requester_id
+        self.channel_id = channel_id
+        self.guild_id = guild_id
+        self.resolved_at = time.time()
+        # When (by time.monotonic) the command that queued the track was run.
+        self.requested_at = requested_at
+        # The trace of the request that queued the track, followed to playback.
+        self.trace: Optional[Trace] = None
+
+        # Playlist listing details, used until the track is resolved.
+        self._video_id = video_id
+        self._title = title
+        self._duration = duration
+
+    @classmethod
+    async def from_search(
+        cls, ctx: commands.Context, search: str, *, requested_at: float | None = None
+    ) -> QueuedTrack:
+        """Extract a track's metadata without opening an audio stream."""
+        video_info = await extract_video(
+            YtdlSource.YTDL,
+            search,
+            cache=YtdlSource.METADATA_CACHE,
+            search_cache=YtdlSource.SEARCH_CACHE,
+            engine=YtdlSource.EXTRACTION_ENGINE,
+            guild_id=ctx.guild.id,
+        )
+        return cls(
+            video_info,
+            requester_id=ctx.author.id,
+            channel_id=ctx.channel.id,
+            guild_id=ctx.guild.id,
+            requested_at=requested_at,
+        )
+
+    @classmethod
+    def from_playlist_entry(
+        cls,
+        ctx: commands.Context,
+        entry: Dict[str, Any],
+        *,
+        requested_at: float | None = None,
+    ) -> QueuedTrack:
+        """Create an unresolved track from a flat playlist entry."""
+        duration = entry.get("duration")
+        return cls(
+            None,
+            requester_id=ctx.author.id,
+            channel_id=ctx.channel.id,
+            guild_id=ctx.guild.id,
+            requested_at=requested_at,
+            video_id=entry["id"],
+            title=entry.get("title") or "Unknown Title",
+            duration=int(duration) if duration else None,
+        )
+
+    @classmethod
+    def from_snapshot(cls, entry: List[Any], *, guild_id: int) -> QueuedTrack:
+        """An unresolved track from `to_snapshot`, to be resolved when needed."""
+        video_id, title, duration, requester_id, channel_id = entry
+        return cls(
+            None,
+            requester_id=requester_id,
+            channel_id=channel_id,
+            guild_id=guild_id,
+            video_id=video_id,
+            title=title,
+            duration=duration,
+        )
+
+    def to_snapshot(self) -> List[Any]:
+        """The track's ID, title, duration, requester and channel."""
+        return [
+            self.video_id,
+            self.title,
+            self.duration,
+            self.requester_id,
+            self.channel_id,
+        ]
+
+    @property
+    def resolved(self) -> bool:
+        return self.video_info is not None
+
+    @property
+    def video_id(self) -> str | None:
+        return self.video_info.video_id if self.resolved else self._video_id
+
+    @property
+    def title(self) -> str:
+        return self.video_info.title if self.resolved else self._title
+
+    @property
+    def duration(self) -> int | None:
+        return self.video_info.duration if self.resolved else self._duration
+
+    @property
+    def webpage_url(self) -> str:
+        if self.resolved:
+            return str(self.video_info.webpage_url)
+        return youtube_watch_url(self._video_id)
+
+    @property
+    def stream_expired(self) -> bool:
+        if not self.resolved:
+            return True
+
+        cache = YtdlSource.METADATA_CACHE
+        if cache is not None:
+            ttl, margin = cache.stream_url_ttl, cache.expiry_margin
+        else:
+            ttl, margin = self.STREAM_URL_TTL, self.STREAM_EXPIRY_MARGIN
+
+        expires_at = stream_url_expiry(self.video_info.stream_url)
+        if expires_at is None:
+            expires_at = self.resolved_at + ttl
+        return time.time() >= expires_at - margin
+
+    async def resolve(self) -> VideoInfo:
+        """Fetch the full metadata of a track queued from a playlist."""
+        if not self.resolved:
+            with use(self.trace):
+                video_info = await extract_video(
+                    YtdlSource.YTDL,
+                    youtube_watch_url(self._video_id),
+                    cache=YtdlSource.METADATA_CACHE,
+                    engine=YtdlSource.EXTRACTION_ENGINE,
+                    guild_id=self.guild_id,
+                )
+            self.video_info = intern_video_info(video_info)
+            self.resolved_at = time.time()
+            # The playlist listing details are superseded by the full metadata.
+            self._video_id = self._title = self._duration = None
+        return self.video_info
+
+    async def create_source(
+        self, *, volume: float = 0.5, start: float = 0.0
+    ) -> YtdlSource | OpusYtdlSource | PooledYtdlSource:
+        """
+        Spawn ffmpeg for this track, starting `start` seconds in, refreshing a
+        stale stream URL first.
+        """
+        if not self.resolved:
+            await self.resolve()
+
+        # Reopening a track part way through (e.g. for a volume change) isn't a play.
+        video_info = self._from_audio_cache(count_play=start == 0)
+        if video_info is None:
+            shared = _TRACK_RECORDS.get(self.video_id)
+            if shared is not None and shared is not self.video_info:
+                # Another queue may have already refreshed this track's stream.
+                self.video_info = shared
+            if self.stream_expired:
+                video_info = await refresh_stream_url(
+                    YtdlSource.YTDL,
+                    self.video_info,
+                    cache=YtdlSource.METADATA_CACHE,
+                    engine=YtdlSource.EXTRACTION_ENGINE,
+                    guild_id=self.guild_id,
+                )
+                self.video_info = intern_video_info(video_info)
+                self.resolved_at = time.time()
+            video_info = self.video_info
+
+        return await create_audio_source(video_info, volume=volume, start=start)
+
+    def _from_audio_cache(self, *, count_play: bool) -> Optional[VideoInfo]:
+        """
+        Point the track at its locally cached audio, if there is any. On a
+        miss, count the play, and start caching the track in the background
+        once it has been played often enough.
+        """
+        cache = YtdlSource.AUDIO_CACHE
+        if cache is None:
+            return None
+
+        path = cache.lookup(self.video_id)
+        if path is not None:
+            # The cached format may not match the stream's, so let ffmpeg probe it.
+            return self.video_info.model_copy(update={"stream_url": path, "acodec": None})
+
+        download_info = self.video_info.download_info
+        filesize = download_info.filesize if download_info else None
+        if count_play and cache.record_play(self.video_id, filesize):
+            logger.info(f"Caching the audio of a popular track: {self}")
+            task = asyncio.create_task(cache_audio(cache, self.video_info))
+            _AUDIO_CACHE_FILLS.add(task)
+            task.add_done_callback(_AUDIO_CACHE_FILLS.discard)
+        return None
+
+    def generate_song_queue_embed(self, order: int, eta: Optional[float] = None) -> str:
+        return format_song_queue_entry(
+            order, self.title, self.webpage_url, self.duration, eta=eta
+        )
+
+    def __repr__(self):
+        return self.title
@@ -1,57 +1,133 @@
 import asyncio
 import random
 from collections.abc import Sequence
-from typing import Any
+from typing import Any, Hashable, List, Optional
+
+from src.cogs.music_bot.indexed_list import IndexedList
+
+
+def _song_duration(song: Any) -> float:
+    # Unresolved playlist entries may not know their duration yet.
+    return getattr(song, "duration", None) or 0
+
+
+def _song_requester(song: Any) -> Optional[Hashable]:
+    return getattr(song, "requester_id", None)
 
 
-# TODO(ThomasHepworth): Perhaps we should turn this into an ordered set instead of a list.
-# Then, we can pop elements by name, and we can also check if an element is in the queue.
 class SongQueue(asyncio.Queue, Sequence):
     """
     A song queue that extends asyncio.Queue and behaves like a list for easy manipulation.
+
+    The underlying storage is an IndexedList, so indexing, removal, insertion
+    and moves are O(log n) and never copy the queue, while `get`/`put` keep
+    asyncio.Queue's semantics (including waking any waiting getters). It also
+    keeps running totals of song durations, so the time remaining before any
+    position (and per requester) is available without walking the queue.
     """
 
+    def _init(self, maxsize: int):
+        self._queue = IndexedList(weight=_song_duration, group=_song_requester)
+        # Set whenever a song is added, for `wait_for_song`.
+        self._song_added = asyncio.Event()
+
+    def _put(self, item: Any):
+        self._queue.append(item)
+        self._song_added.set()
+
+    def _get(self) -> Any:
+        return self._queue.popleft()
+
     def __getitem__(self, index: int | slice):
-        items = self._get_items_snapshot()
-        if isinstance(index, slice):
-            return items[index]
-        return items[index]
+        return self._queue[index]
 
     def __len__(self):
         return self.qsize()
 
     def __iter__(self):
-        return iter(self._get_items_snapshot())
+        return iter(self._queue)
+
+    def contains_video(self, video_id: Hashable) -> bool:
+        """O(1) check for whether a video is already queued."""
+        return self._queue.contains_key(video_id)
+
+    @property
+    def total_duration(self) -> float:
+        """The combined duration of every queued song, in seconds."""
+        return self._queue.total_weight
+
+    def duration_before(self, index: int) -> float:
+        """How long the songs ahead of position `index` will take to play."""
+        return self._queue.weight_before(index)
+
+    def requester_duration(self, requester_id: Hashable) -> float:
+        """The combined duration of the songs queued by one member."""
+        return self._queue.group_weight(requester_id)
+
+    def refresh_duration(self, index: int):
+        """Pick up a song's duration after it changes (e.g. once it is resolved)."""
+        self._queue.refresh_weight(index)
 
     def clear(self):
-        while not self.empty():
-            self.get_nowait()
+        count = len(self._queue)
+        self._queue.clear()
+        self._forget(count)
 
     def shuffle(self):
-        items = self._get_items_snapshot()
+        items = list(self._queue)
         random.shuffle(items)
-        self._rebuild_queue(items)
+        self._queue.clear()
+        self._queue.extend(items)
 
     def remove(self, index: int):
-        items = self._get_items_snapshot()
-        if 0 <= index < len(items):
-            del items[index]
-            self._rebuild_queue(items)
-        else:
+        if 0 <= index < len(self):
+            item = self._queue.pop(index)
+            self._forget(1)
+            return item
+        raise IndexError("Index out of range")
+
+    def remove_range(self, start: int, stop: int) -> List[Any]:
+        """Remove the songs in [start, stop), returning them."""
+        if not 0 <= start < stop <= len(self):
+            raise IndexError("Index out of range")
+        removed = self._queue.remove_range(start, stop)
+        self._forget(len(removed))
+        return removed
+
+    def insert(self, index: int, item: Any):
+        """Queue a song before position `index`, like `list.insert`."""
+        self._queue.insert(index, item)
+        self._song_added.set()
+        self._unfinished_tasks += 1
+        self._finished.clear()
+        self._wakeup_next(self._getters)
+
+    def move(self, source: int, destination: int):
+        if not (0 <= source < len(self) and 0 <= destination < len(self)):
+            raise IndexError("Index out of range")
+        self._queue.move(source, destination)
+
+    def move_to_front(self, index: int):
+        if not 0 <= index < len(self):
             raise IndexError("Index out of range")
+        self._queue.move_to_front(index)
+
+    async def wait_for_song(self):
+        """Wait until the queue holds a song, without taking it off the queue."""
+        while self.empty():
+            self._song_added.clear()
+            await self._song_added.wait()
 
     def peek(self) -> Any:
         if self.empty():
             raise asyncio.QueueEmpty("Queue is empty")
-        return self._get_items_snapshot()[0]
+        return self._queue[0]
 
     def as_list(self) -> list:
-        return self._get_items_snapshot()
-
-    def _get_items_snapshot(self) -> list:
         return list(self._queue)
 
-    def _rebuild_queue(self, items: list):
-        self._queue.clear()
-        for item in items:
-            self.put_nowait(item)
+    def _forget(self, count: int):
+        # Removed songs will never be taken off the queue, so count them as
+        # done; otherwise `join` would wait for them forever.
+        for _ in range(count):
+            self.task_done()
@@ -2,35 +2,87 @@ from __future__ import annotations
 
 import asyncio
 import logging
-from typing import TYPE_CHECKING
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
 from asyncio.exceptions import TimeoutError
 
+import discord
 from async_timeout import timeout
 from discord.ext import commands
 
+from src import tracing
+from src._exceptions import YTDLError, record_error
+from src.cogs.music_bot.notifier import Notifier
+from src.cogs.music_bot.parse_youtube_input.extract_from_youtube import default_volume
 from src.cogs.music_bot.song_queue import SongQueue
+from src.metrics import REGISTRY, Histogram
 
 if TYPE_CHECKING:
     from src.cogs.music_bot.parse_youtube_input.extract_from_youtube import YtdlSource
+    from src.cogs.music_bot.queued_track import QueuedTrack
 
 logger = logging.getLogger(__name__)
 
+INTER_TRACK_GAP = REGISTRY.histogram(
+    "gimlibot_inter_track_gap_seconds",
+    "Silence between the end of one queued track and the first frame of the next.",
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0),
+)
+FIRST_AUDIO = REGISTRY.histogram(
+    "gimlibot_command_to_first_audio_seconds",
+    "Time from a play command to its song's first frame, for songs that started "
+    "straight away rather than waiting behind others in the queue.",
+    buckets=(0.25, 0.5, 1.0, 1.5, 2.0, 3.0, 5.0, 7.5, 10.0, 20.0),
+)
+PREFETCHES = REGISTRY.counter(
+    "gimlibot_prefetches_total",
+    "Prefetched tracks, by whether they were used or discarded.",
+    labelnames=("outcome",),
+)
+
 
 class VoiceState:
     TIMEOUT = 300  # 5-minute timeout for waiting on the next song
+    PREFETCH_SECONDS = 15  # Start preparing the next song this long before the end
+    PREFETCH_FRAMES = 15  # 20ms frames buffered ahead of playback (300ms)
+    RESOLVE_AHEAD = 5  # Queued songs whose full metadata is fetched ahead of time
+    RESOLVE_BATCH_SIZE = 2  # ...and how many of those are fetched concurrently
 
-    def __init__(self, bot: commands.Bot, ctx: commands.Context):
+    def __init__(self, bot: commands.Bot, ctx: Optional[commands.Context]):
+        # `ctx` is the command that created the state; None for a restored one.
         self.bot = bot
         self._ctx = ctx
 
+        self.current_track: QueuedTrack = None
         self.current_ytdl_source: YtdlSource = None
         self.voice = None
         self.next_ytdl_source: YtdlSource = asyncio.Event()
-        self.songs: SongQueue[YtdlSource] = SongQueue()
+        self.songs: SongQueue[QueuedTrack] = SongQueue()
+        self.notifier = Notifier()
 
         self._loop = False
-        self._volume = 0.5
+        self._volume = default_volume()
         self.skip_votes = set()
+        # When (by time.monotonic) a command or the player last used this state.
+        self.last_active = time.monotonic()
+
+        # Background preparation of the song at the head of the queue.
+        self._track_started_at: Optional[float] = None
+        self._track_ended_at: Optional[float] = None
+        self._prefetch_task: Optional[asyncio.Task] = None
+        self._prefetch_track: Optional[QueuedTrack] = None
+        self._prefetched_source: Optional[YtdlSource] = None
+
+        # Background resolution of songs queued from playlists.
+        self._resolver: Optional[asyncio.Task] = None
+        self._resolve_again = False
+
+        # Reopening the current song's stream after a volume change (Opus sources).
+        self._restart_task: Optional[asyncio.Task] = None
+
+        # A song restored from a snapshot, to pick up where it left off.
+        self._resume_track: Optional[QueuedTrack] = None
+        self._resume_position = 0.0
 
         self.audio_player = asyncio.create_task(self.audio_player_task())
 
@@ -51,24 +103,123 @@ class VoiceState:
         if not (0.0 <= value <= 1.0):
             raise ValueError("Volume must be between 0.0 and 1.0")
         self._volume = value
+        if not self.current_ytdl_source:
+            return
+
+        if self.current_ytdl_source.LIVE_VOLUME:
+            self.current_ytdl_source.volume = value
+        else:
+            # ffmpeg applies the volume to Opus sources, so reopen the stream.
+            if self._restart_task is not None and not self._restart_task.done():
+                self._restart_task.cancel()
+            self._restart_task = asyncio.create_task(self._restart_current_source())
+
+    @property
+    def current_remaining(self) -> float:
+        """Seconds left of the song that is currently playing."""
+        if not self.current_track or not self.current_ytdl_source:
+            return 0.0
+        duration = self.current_track.duration or 0
+        return max(0.0, duration - self.current_ytdl_source.position)
+
+    @property
+    def total_remaining(self) -> float:
+        """Seconds until the current song and the whole queue have played."""
+        return self.current_remaining + self.songs.total_duration
+
+    def time_until(self, index: int) -> float:
+        """Seconds until the queued song at `index` starts playing, in O(log n)."""
+        return self.current_remaining + self.songs.duration_before(index)
 
     @property
     def is_playing(self):
-        logger.info(            
-            f"Voice: {self.voice}"
-            f"Connected: {self.voice.is_connected()}"
-            f"Current: {self.current_ytdl_source}"
-        )
+        # Checked by nearly every command, so only logged at debug level.
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Voice: %s Connected: %s Current: %s",
+                self.voice,
+                self.voice is not None and self.voice.is_connected(),
+                self.current_ytdl_source,
+            )
         return self.voice and self.voice.is_connected() and self.current_ytdl_source
 
+    def touch(self):
+        """Mark the state as in use, so it isn't evicted as idle."""
+        self.last_active = time.monotonic()
+
+    @property
+    def idle_for(self) -> float:
+        """Seconds since the state was last used, or 0 while a song is playing."""
+        if self.is_playing:
+            return 0.0
+        return time.monotonic() - self.last_active
+
+    @property
+    def finished(self) -> bool:
+        """Whether the player has stopped for good (e.g. after timing out)."""
+        return self.audio_player is not None and self.audio_player.done()
+
+    def tasks(self) -> List[asyncio.Task]:
+        """The background tasks this state is running."""
+        tasks = (
+            self.audio_player,
+            self._prefetch_task,
+            self._resolver,
+            self._restart_task,
+        )
+        return [task for task in tasks if task is not None and not task.done()]
+
+    def sources(self) -> List[YtdlSource]:
+        """The audio sources this state holds on to (and is responsible for)."""
+        sources = [self.current_ytdl_source, self._prefetched_source]
+        if self.voice is not None:
+            sources.append(self.voice.source)
+        return [source for source in sources if source is not None]
+
+    def resume(self, track: QueuedTrack, position: float):
+        """
+        Queue `track` to play from `position` seconds in, e.g. after a restart.
+        Call this before anything else is queued.
+        """
+        self._resume_track, self._resume_position = track, position
+        self.songs.put_nowait(track)
+
+    def snapshot(self) -> Optional[Dict[str, Any]]:
+        """
+        A compact record of what's playing and queued, to restore after a
+        restart (see `QueueSnapshots`), or None if there's nothing to restore.
+        """
+        if self.voice is None or not self.voice.is_connected():
+            return None
+        current = self.current_track if self.current_ytdl_source is not None else None
+        if current is None and self.songs.empty():
+            return None
+
+        return {
+            "voice_channel_id": self.voice.channel.id,
+            "volume": self._volume,
+            "loop": self.loop,
+            "current": current.to_snapshot() if current else None,
+            "position": round(self.current_ytdl_source.position, 2) if current else 0.0,
+            "queue": [track.to_snapshot() for track in self.songs],
+            "saved_at": time.time(),
+        }
+
     async def audio_player_task(self):
+        # Spans belong to the track being played, not to whichever request
+        # happened to create this task.
+        tracing.detach()
         while True:
             self.next_ytdl_source.clear()
+            current_track = self.current_track
             try:
+                # Only songs that were already waiting count towards the gap metric;
+                # otherwise we'd be measuring how long the queue sat empty.
+                track_was_queued = self.loop or not self.songs.empty()
                 if not self.loop:
                     try:
                         async with timeout(self.TIMEOUT):
-                            self.current_ytdl_source = await self.songs.get()
+                            self.current_track = await self.songs.get()
                     except TimeoutError:
                         time_elapsed = self.TIMEOUT / 60
                         logger.info(
@@ -76,29 +227,289 @@ class VoiceState:
                         )
                         asyncio.create_task(self.stop())
                         return
-                    
-                current_song = self.current_ytdl_source
-                    
-                logger.info(f"Attempting to play to playent: {current_song} of type: {type(current_song)}")
-                current_song.source.volume = self._volume
-                self.voice.play(self.current_ytdl_source.source, after=self.play_next_song)
-                await current_song.channel.send(
-                    embed=current_song.video_info.create_song_embed(current_song.requester)
+
+                current_track = self.current_track
+                logger.info("Attempting to play: %s", current_track)
+                self.schedule_resolve_ahead()
+
+                trace = current_track.trace
+                if trace is not None and "enqueued" in trace.marks:
+                    trace.record("queue_wait", trace.marks["enqueued"])
+
+                # ffmpeg is only spawned (and a stale stream URL refreshed) once
+                # the track has actually been dequeued, unless it was prefetched.
+                start = 0.0
+                if current_track is self._resume_track:
+                    start, self._resume_track = self._resume_position, None
+                with tracing.use(trace), tracing.span("ffmpeg_spawn"):
+                    self.current_ytdl_source = await self._take_prefetched_source(
+                        current_track
+                    )
+                    if self.current_ytdl_source is None:
+                        self.current_ytdl_source = await current_track.create_source(
+                            volume=self._volume, start=start
+                        )
+                self.current_ytdl_source.on_first_frame = self._first_frame_hook(
+                    current_track, track_was_queued
+                )
+                # Only the first play counts; not loops or restarts.
+                current_track.requested_at = current_track.trace = None
+
+                self.last_active = time.monotonic()
+                # Prefetching counts from the song's start, even when resumed.
+                self._track_started_at = self.last_active - start
+                self.voice.play(self.current_ytdl_source, after=self.play_next_song)
+                self._schedule_prefetch()
+                self.notifier.now_playing(
+                    self.track_channel(current_track),
+                    current_track.video_info.create_song_embed(
+                        current_track.requester_id
+                    ),
                 )
 
                 await self.next_ytdl_source.wait()
+                self.current_ytdl_source = None
+                self.touch()
+
+            except YTDLError as e:
+                # One unavailable video (common in playlists) shouldn't stop the player.
+                record_error(e)
+                logger.warning(f"Skipping song that couldn't be resolved: {e}")
+                self.current_ytdl_source = None
+                self.loop = False
+                self.notifier.notice(
+                    self.track_channel(current_track), f"Skipping {current_track}: {e}"
+                )
 
-            except Exception:
+            except Exception as e:
                 logger.error("Error in audio_player_task:", exc_info=True)
-                await self._ctx.send(f"Failed to play song: {current_song}!")
+                record_error(e)
+                channel = self._ctx or self.track_channel(current_track)
+                await channel.send(f"Failed to play song: {current_track}!")
                 break
 
+    async def _restart_current_source(self):
+        """
+        Swap the current song's source for a new one opened at the current
+        position, e.g. to pick up a volume change.
+        """
+        old_source, track = self.current_ytdl_source, self.current_track
+        source = None
+        try:
+            source = await track.create_source(
+                volume=self._volume, start=old_source.position
+            )
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, source.prime, self.PREFETCH_FRAMES)
+            # The old stream kept playing while the new one opened; catch up.
+            await loop.run_in_executor(None, source.skip_to, old_source.position)
+        except asyncio.CancelledError:
+            if source is not None:
+                source.cleanup()
+            raise
+        except Exception:
+            logger.warning(f"Failed to reopen song at new volume: {track}", exc_info=True)
+            if source is not None:
+                source.cleanup()
+            return
+
+        if (
+            self.current_ytdl_source is not old_source
+            or not self.voice
+            or not (self.voice.is_playing() or self.voice.is_paused())
+        ):
+            source.cleanup()
+            return
+
+        self.voice.source = source
+        self.current_ytdl_source = source
+        old_source.cleanup()
+
+    def track_channel(self, track: QueuedTrack) -> discord.abc.Messageable:
+        """The channel a track was queued from, for messages about it."""
+        return self.bot.get_partial_messageable(
+            track.channel_id, guild_id=track.guild_id
+        )
+
     def play_next_song(self, error=None):
-        logging.info(f"Playing the next song in the queue: {self.songs}")
+        # This runs on the audio thread; don't format the whole queue here.
+        logger.info("Song finished; %d left in the queue.", len(self.songs))
         if error:
             logger.error(f"Error playing song: {error}")
+        self._track_ended_at = time.monotonic()
         self.next_ytdl_source.set()
 
+    def _first_frame_hook(
+        self, track: QueuedTrack, track_was_queued: bool
+    ) -> Optional[Callable[[], None]]:
+        """What to record (on the audio thread) once a track's first frame is sent."""
+        hooks: List[Callable[[], None]] = []
+        if track_was_queued and self._track_ended_at is not None:
+            hooks.append(self._record_since(INTER_TRACK_GAP, self._track_ended_at))
+        elif not track_was_queued and track.requested_at is not None:
+            hooks.append(self._record_since(FIRST_AUDIO, track.requested_at))
+
+        trace = track.trace
+        if trace is not None:
+            play_started_at = time.monotonic()
+            hooks.append(lambda: trace.record("first_audio", play_started_at))
+            if not track_was_queued:
+                hooks.append(lambda: trace.record("end_to_end", trace.started_at))
+
+        if not hooks:
+            return None
+
+        def on_first_frame():
+            for hook in hooks:
+                hook()
+
+        return on_first_frame
+
+    @staticmethod
+    def _record_since(histogram: Histogram, started_at: float):
+        def record():
+            histogram.observe(time.monotonic() - started_at)
+
+        return record
+
+    def on_queue_changed(self):
+        """Call after adding, removing or reordering queued songs."""
+        self.refresh_prefetch()
+        self.schedule_resolve_ahead()
+
+    def schedule_resolve_ahead(self):
+        """Make sure the next few queued songs have their full metadata."""
+        if self._resolver is None or self._resolver.done():
+            self._resolver = asyncio.create_task(self._resolve_ahead())
+        else:
+            self._resolve_again = True
+
+    async def _resolve_ahead(self):
+        # Each track resolves under its own trace, if it has one.
+        tracing.detach()
+        while True:
+            self._resolve_again = False
+            window = self.songs[: self.RESOLVE_AHEAD]
+            pending = [track for track in window if not track.resolved]
+
+            for start in range(0, len(pending), self.RESOLVE_BATCH_SIZE):
+                batch = pending[start : start + self.RESOLVE_BATCH_SIZE]
+                results = await asyncio.gather(
+                    *(track.resolve() for track in batch), return_exceptions=True
+                )
+                for track, result in zip(batch, results):
+                    if isinstance(result, Exception):
+                        record_error(result)
+                        logger.warning(f"Failed to resolve queued song {track}: {result}")
+
+            # Resolved songs may now know their real duration.
+            for index in range(min(self.RESOLVE_AHEAD, len(self.songs))):
+                self.songs.refresh_duration(index)
+
+            if not self._resolve_again:
+                return
+
+    def refresh_prefetch(self):
+        """
+        Re-point the prefetch stage at the current head of the queue.
+        Call this after anything that reorders or removes queued songs.
+        """
+        if self._prefetch_track is None:
+            return
+
+        try:
+            head = self.songs.peek()
+        except asyncio.QueueEmpty:
+            head = None
+
+        if head is not self._prefetch_track:
+            logger.info(
+                f"Queue head changed, redirecting prefetch from: {self._prefetch_track}"
+            )
+            self._cancel_prefetch()
+            self._schedule_prefetch()
+
+    def _schedule_prefetch(self):
+        if self.loop or self.current_track is None or self._track_started_at is None:
+            return
+        if not self.current_track.duration:
+            # Livestreams have no end to prepare for.
+            return
+
+        self._cancel_prefetch()
+        self._prefetch_task = asyncio.create_task(self._prefetch_next())
+
+    async def _prefetch_next(self):
+        """Open and buffer the next song's stream shortly before the current one ends."""
+        elapsed = time.monotonic() - self._track_started_at
+        remaining = self.current_track.duration - elapsed
+        await asyncio.sleep(max(0.0, remaining - self.PREFETCH_SECONDS))
+
+        # Songs added during the prefetch window still get prepared in time.
+        # If the song ends first, the player cancels this once it dequeues.
+        await self.songs.wait_for_song()
+        if self.next_ytdl_source.is_set():
+            return
+
+        track = self.songs.peek()
+        self._prefetch_track = track
+        source = None
+        try:
+            logger.info("Prefetching the next song: %s", track)
+            source = await track.create_source(volume=self._volume)
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, source.prime, self.PREFETCH_FRAMES)
+        except asyncio.CancelledError:
+            if source is not None:
+                source.cleanup()
+            raise
+        except Exception:
+            logger.warning(f"Failed to prefetch song: {track}", exc_info=True)
+            if source is not None:
+                source.cleanup()
+            self._prefetch_track = None
+            return
+
+        self._prefetched_source = source
+
+    async def _take_prefetched_source(self, track: QueuedTrack) -> Optional[YtdlSource]:
+        """Hand over the prefetched source if it was prepared for `track`."""
+        task, prefetch_track = self._prefetch_task, self._prefetch_track
+        if task is not None and not task.done() and prefetch_track is track:
+            # The stream is already being opened; finishing it beats starting over.
+            await asyncio.wait([task])
+
+        source = self._prefetched_source
+        if source is not None and prefetch_track is track:
+            self._prefetched_source = None
+            self._prefetch_track = None
+            self._prefetch_task = None
+            if source.LIVE_VOLUME:
+                source.volume = self._volume
+            elif source.volume != self._volume:
+                # Opened before a volume change, which can't be applied in place.
+                logger.info("Discarding prefetched song opened at old volume: %s", track)
+                source.cleanup()
+                PREFETCHES.inc(outcome="discarded")
+                return None
+            PREFETCHES.inc(outcome="used")
+            return source
+
+        self._cancel_prefetch()
+        return None
+
+    def _cancel_prefetch(self):
+        if self._prefetch_task is not None and not self._prefetch_task.done():
+            self._prefetch_task.cancel()
+        if self._prefetched_source is not None:
+            logger.info("Discarding prefetched song: %s", self._prefetch_track)
+            self._prefetched_source.cleanup()
+            PREFETCHES.inc(outcome="discarded")
+
+        self._prefetch_task = None
+        self._prefetch_track = None
+        self._prefetched_source = None
+
     def skip(self):
         self.skip_votes.clear()
         if self.is_playing:
@@ -112,6 +523,12 @@ class VoiceState:
             while not self.songs.empty():
                 await self.songs.get_nowait()
 
+        self._cancel_prefetch()
+        self.notifier.close()
+        if self._restart_task is not None:
+            self._restart_task.cancel()
+        if self._resolver is not None:
+            self._resolver.cancel()
         if self.audio_player:
             self.audio_player.cancel()
 
@@ -1,25 +1,67 @@
 from __future__ import annotations
 
+import asyncio
 import logging
 import math
+import time
+from collections import Counter
+from typing import Dict, Optional
 
 import discord
 from discord.ext import commands
 
-from src._exceptions import VoiceError, YTDLError
-from src.cogs.music_bot.parse_youtube_input.extract_from_youtube import YtdlSource
+from src import tracing
+from src._exceptions import VoiceError, YTDLError, record_error
+from src.cogs.music_bot.lifecycle import VoiceStateJanitor, top_consumers
+from src.cogs.music_bot.parse_youtube_input.extract_from_youtube import (
+    YtdlSource,
+    is_youtube_playlist_url,
+    iter_playlist,
+    warm_up,
+)
 from src.cogs.music_bot.parse_youtube_input.parsers import parse_duration
+from src.cogs.music_bot.queue_snapshots import (
+    QUEUES_RESTORED,
+    QueueSnapshots,
+    Snapshot,
+)
+from src.cogs.music_bot.queued_track import QueuedTrack
 from src.cogs.music_bot.voice_state import VoiceState
+from src.metrics import REGISTRY
 
 logger = logging.getLogger(__name__)
 
+SONG_QUEUE_DEPTH = REGISTRY.gauge(
+    "gimlibot_song_queue_depth",
+    "Songs waiting in each guild's queue.",
+    labelnames=("guild",),
+)
+VOICE_STATES = REGISTRY.gauge(
+    "gimlibot_voice_states",
+    "Guilds with an active voice state.",
+)
+
 
 class MusicCog(commands.Cog):
     ITEMS_PER_PAGE = 10
+    PLAYLIST_BATCH_SIZE = 25
+    MAX_PLAYLIST_TRACKS = 500
+
+    VOICE_STATES_CONFIG = "config/voice-states.json"
+    QUEUE_SNAPSHOTS_CONFIG = "config/queue-snapshots.json"
+    RESTORE_CONCURRENCY = 5  # Voice channels rejoined at once on startup
 
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self.voice_states = {}
+        self.janitor = VoiceStateJanitor.from_config(
+            self.voice_states, self.VOICE_STATES_CONFIG
+        )
+        self.snapshots = QueueSnapshots.from_config(self.QUEUE_SNAPSHOTS_CONFIG)
+        self._restored = False
+        # Loads yt-dlp in the background; referenced so it isn't garbage collected.
+        self._warm_up: Optional[asyncio.Task] = None
+        REGISTRY.add_collector(self.collect_metrics)
 
     def get_voice_state(self, ctx: commands.Context):
         state = self.voice_states.get(ctx.guild.id)
@@ -29,10 +71,116 @@ class MusicCog(commands.Cog):
 
         return state
 
+    def voice_state_counts(self) -> Dict[Optional[int], int]:
+        """The number of active voice states on each gateway shard."""
+        counts = Counter()
+        for guild_id in self.voice_states:
+            guild = self.bot.get_guild(guild_id)
+            counts[guild.shard_id if guild else None] += 1
+        return dict(counts)
+
+    def rate_budgets(self) -> Dict[int, float]:
+        """The fraction of each channel's message rate limit used by notifications."""
+        budgets = {}
+        for state in self.voice_states.values():
+            budgets.update(state.notifier.rate_budget())
+        return budgets
+
+    def collect_metrics(self):
+        """Set the queue gauges; run by the metrics registry on every scrape."""
+        VOICE_STATES.set(len(self.voice_states))
+        states = self.voice_states.items()
+        SONG_QUEUE_DEPTH.replace(
+            {(guild_id,): len(state.songs) for guild_id, state in states}
+        )
+
+    async def cog_load(self):
+        # yt-dlp is loaded in the background, rather than at import or by the
+        # first !play.
+        self._warm_up = asyncio.create_task(asyncio.to_thread(warm_up))
+        self._warm_up.add_done_callback(self._warm_up_done)
+        if self.janitor is not None:
+            self.janitor.start()
+        if self.snapshots is not None:
+            self.snapshots.start(self.voice_states)
+
+    @staticmethod
+    def _warm_up_done(task: asyncio.Task):
+        # The first !play loads whatever didn't get warmed up.
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Failed to warm up yt-dlp.", exc_info=task.exception())
+
     def cog_unload(self):
+        REGISTRY.remove_collector(self.collect_metrics)
+        if self.janitor is not None:
+            self.janitor.stop()
+        if YtdlSource.PLAYER_CACHE is not None:
+            try:
+                YtdlSource.PLAYER_CACHE.persist()
+            except OSError:
+                logger.exception("Failed to save the yt-dlp player cache.")
+        if self.snapshots is not None:
+            # Runs on shutdown, before the voice clients are disconnected.
+            self.snapshots.stop()
+            try:
+                self.snapshots.save(self.snapshots.capture(self.voice_states))
+            except Exception:
+                logger.exception("Failed to save queue snapshots.")
         for state in self.voice_states.values():
             self.bot.loop.create_task(state.stop())
 
+    @commands.Cog.listener()
+    async def on_ready(self):
+        # on_ready fires again after reconnects; only restore once.
+        if self.snapshots is None or self._restored:
+            return
+        self._restored = True
+
+        snapshots = await asyncio.to_thread(self.snapshots.load)
+        semaphore = asyncio.Semaphore(self.RESTORE_CONCURRENCY)
+
+        async def restore(guild_id: int, snapshot: Snapshot):
+            async with semaphore:
+                await self.restore_queue(guild_id, snapshot)
+
+        await asyncio.gather(
+            *(restore(guild_id, snapshot) for guild_id, snapshot in snapshots.items())
+        )
+
+    async def restore_queue(self, guild_id: int, snapshot: Snapshot):
+        """Rejoin a guild's voice channel and carry on with its snapshotted queue."""
+        guild = self.bot.get_guild(guild_id)
+        if guild is None:
+            # Another worker's shard, or the bot has left the guild.
+            return
+        if guild_id in self.voice_states:
+            # Someone has already started a new queue.
+            QUEUES_RESTORED.inc(outcome="superseded")
+            return
+
+        channel = guild.get_channel(snapshot["voice_channel_id"])
+        if not isinstance(channel, discord.VoiceChannel):
+            self.snapshots.discard(guild_id)
+            QUEUES_RESTORED.inc(outcome="failed")
+            return
+
+        state = VoiceState(self.bot, None)
+        self.voice_states[guild_id] = state
+        try:
+            state.voice = await channel.connect()
+        except Exception:
+            logger.warning("Failed to rejoin voice in guild %s.", guild_id, exc_info=True)
+            QUEUES_RESTORED.inc(outcome="failed")
+            self.voice_states.pop(guild_id, None)
+            await state.stop()
+            return
+
+        self.snapshots.restore(state, snapshot, guild_id=guild_id)
+        QUEUES_RESTORED.inc(outcome="restored")
+        logger.info(
+            "Restored the queue of guild %s (%d songs).", guild_id, len(state.songs)
+        )
+
     def cog_check(self, ctx: commands.Context):
         if not ctx.guild:
             raise commands.NoPrivateMessage(
@@ -43,10 +191,18 @@ class MusicCog(commands.Cog):
 
     async def cog_before_invoke(self, ctx: commands.Context):
         ctx.voice_state = self.get_voice_state(ctx)
+        ctx.voice_state.touch()
+
+    async def cog_after_invoke(self, ctx: commands.Context):
+        # Close a traced command's root span, whether or not it succeeded.
+        trace = tracing.current_trace()
+        if trace is not None:
+            trace.record("command", trace.started_at, failed=ctx.command_failed)
 
     async def cog_command_error(
         self, ctx: commands.Context, error: commands.CommandError
     ):
+        record_error(getattr(error, "original", error))
         await ctx.send("An error occurred: {}".format(str(error)))
 
     @commands.command(name="join", invoke_without_subcommand=True)
@@ -54,11 +210,12 @@ class MusicCog(commands.Cog):
         """Joins a voice channel."""
 
         destination = ctx.author.voice.channel
-        if ctx.voice_state.voice:
-            await ctx.voice_state.voice.move_to(destination)
-            return
+        with tracing.span("voice_connect"):
+            if ctx.voice_state.voice:
+                await ctx.voice_state.voice.move_to(destination)
+                return
 
-        ctx.voice_state.voice = await destination.connect()
+            ctx.voice_state.voice = await destination.connect()
 
     @commands.command(name="summon")
     @commands.has_permissions(manage_guild=True)
@@ -92,7 +249,31 @@ class MusicCog(commands.Cog):
 
         await ctx.voice_state.stop()
         await ctx.message.add_reaction("🕊️")
-        del self.voice_states[ctx.guild.id]
+        self.voice_states.pop(ctx.guild.id, None)
+
+    @commands.command(name="resources")
+    @commands.is_owner()
+    async def _resources(self, ctx: commands.Context, count: int = 10):
+        """Shows the guilds whose voice states are using the most resources."""
+
+        usage = top_consumers(self.voice_states, count)
+        header = ("guild", "ffmpeg", "tasks", "songs", "queue KiB", "idle")
+        lines = ["{:<20}{:>7}{:>6}{:>7}{:>10}{:>8}".format(*header)]
+        for entry in usage:
+            guild = self.bot.get_guild(entry.guild_id)
+            name = guild.name[:19] if guild else str(entry.guild_id)
+            lines.append(
+                f"{name:<20}{entry.ffmpeg_processes:>7}{entry.tasks:>6}"
+                f"{entry.queued_tracks:>7}{entry.queued_bytes / 1024:>10.1f}"
+                f"{int(entry.idle_for):>7}s"
+            )
+
+        embed = discord.Embed(
+            title=f"🧮 Top {len(usage)} of {len(self.voice_states)} voice states",
+            description="```\n" + "\n".join(lines) + "\n```",
+            color=discord.Color.blurple(),
+        )
+        await ctx.send(embed=embed)
 
     @commands.command(name="volume")
     async def _volume(self, ctx: commands.Context, *, volume: int):
@@ -111,7 +292,13 @@ class MusicCog(commands.Cog):
     async def _now(self, ctx: commands.Context):
         """Displays the currently playing song."""
 
-        await ctx.send(embed=ctx.voice_state.current_ytdl_source.create_embed())
+        if not ctx.voice_state.current_track:
+            return await ctx.send("Nothing being played at the moment.")
+
+        current_track = ctx.voice_state.current_track
+        await ctx.send(
+            embed=current_track.video_info.create_song_embed(current_track.requester_id)
+        )
 
     @commands.command(name="pause")
     @commands.has_permissions(manage_guild=True)
@@ -137,6 +324,7 @@ class MusicCog(commands.Cog):
         """Stops playing song and clears the queue."""
 
         ctx.voice_state.songs.clear()
+        ctx.voice_state.on_queue_changed()
 
         if not ctx.voice_state.is_playing:
             ctx.voice_state.voice.stop()
@@ -148,6 +336,7 @@ class MusicCog(commands.Cog):
         """Clears the current queue."""
 
         ctx.voice_state.songs.clear()
+        ctx.voice_state.on_queue_changed()
         await ctx.send("Song queue cleared ☕")
 
     @commands.command(name="skip")  # not currently working
@@ -160,7 +349,7 @@ class MusicCog(commands.Cog):
             return await ctx.send("Not playing any music right now...")
 
         voter = ctx.message.author
-        if voter == ctx.voice_state.current_ytdl_source.requester:
+        if voter.id == ctx.voice_state.current_track.requester_id:
             await ctx.message.add_reaction("⏭")
             ctx.voice_state.skip()
 
@@ -199,24 +388,31 @@ class MusicCog(commands.Cog):
         start_index = (page - 1) * self.ITEMS_PER_PAGE
         end_index = start_index + self.ITEMS_PER_PAGE
 
-        # Build the queue display and calculate total duration
+        # Build the queue display. ETAs come from the queue's running duration
+        # totals, so only the visible page is walked.
         queue_description = []
-        total_duration = 0
+        eta = ctx.voice_state.time_until(start_index)
 
         for n, song in enumerate(songs[start_index:end_index], start=start_index):
-            queue_description.append(song.video_info.generate_song_queue_embed(n + 1))
-            total_duration += song.video_info.duration
+            queue_description.append(song.generate_song_queue_embed(n + 1, eta=eta))
+            eta += song.duration or 0
 
         logger.info("Queue successfully constructed.")
         # Prepare embed message
-        total_duration = parse_duration(total_duration)
-        logger.info(f"Total duration of all items in queue: {total_duration}")
+        total_remaining = parse_duration(int(ctx.voice_state.total_remaining))
+        requester_total = parse_duration(int(songs.requester_duration(ctx.author.id)))
+        logger.info(f"Total duration of all items in queue: {total_remaining}")
         embed = discord.Embed(
-            title=f"🎶 Current Queue: {total_duration} remaining 🎶",
+            title=f"🎶 Current Queue: {total_remaining} remaining 🎶",
             description="\n".join(queue_description),
             color=discord.Color.blurple(),
         )
-        embed.set_footer(text=f"Page {page}/{total_pages} | Total duration:")
+        embed.set_footer(
+            text=(
+                f"Page {page}/{total_pages} | {total_songs} songs"
+                f" | Queued by you: {requester_total}"
+            )
+        )
 
         await ctx.send(embed=embed)
 
@@ -228,16 +424,34 @@ class MusicCog(commands.Cog):
             return await ctx.send("Empty queue.")
 
         ctx.voice_state.songs.shuffle()
+        ctx.voice_state.on_queue_changed()
         await ctx.message.add_reaction("✅")
 
     @commands.command(name="remove")
-    async def _remove(self, ctx: commands.Context, index: int = 1):
-        """Removes a song from the queue at a given index."""
+    async def _remove(self, ctx: commands.Context, index: int = 1, end: int = None):
+        """Removes a song from the queue at a given index.
+        Pass a second index to remove every song between the two (inclusive).
+        """
 
         if len(ctx.voice_state.songs) == 0:
             return await ctx.send("Empty queue.")
 
-        ctx.voice_state.songs.remove(index - 1)
+        if end is None:
+            ctx.voice_state.songs.remove(index - 1)
+        else:
+            ctx.voice_state.songs.remove_range(index - 1, end)
+        ctx.voice_state.on_queue_changed()
+        await ctx.message.add_reaction("✅")
+
+    @commands.command(name="move")
+    async def _move(self, ctx: commands.Context, source: int, destination: int = 1):
+        """Moves a song to a new position in the queue (the front by default)."""
+
+        if len(ctx.voice_state.songs) == 0:
+            return await ctx.send("Empty queue.")
+
+        ctx.voice_state.songs.move(source - 1, destination - 1)
+        ctx.voice_state.on_queue_changed()
         await ctx.message.add_reaction("✅")
 
     @commands.command(name="loop")
@@ -263,31 +477,92 @@ class MusicCog(commands.Cog):
         https://rg3.github.io/youtube-dl/supportedsites.html
         """
 
+        requested_at = time.monotonic()
         if not ctx.voice_state.voice:
             await ctx.invoke(self._join)
 
         already_playing = ctx.voice_state.is_playing
 
+        if is_youtube_playlist_url(search):
+            return await self._play_playlist(ctx, search, requested_at=requested_at)
+
         async with ctx.typing():
             try:
-                ytdl_source = await YtdlSource.get_from_source(ctx, search)
+                with tracing.span("resolve"):
+                    track = await QueuedTrack.from_search(
+                        ctx, search, requested_at=requested_at
+                    )
             except YTDLError as e:
-                await ctx.send(
+                record_error(e)
+                return await ctx.send(
                     f"An error occurred while processing this request: {str(e)}"
                 )
 
-            await ctx.voice_state.songs.put(ytdl_source)
-            logger.info(f"Current queue: {ctx.voice_state.songs.as_list()}")
+            with tracing.span("enqueue"):
+                await ctx.voice_state.songs.put(track)
+                track.trace = tracing.current_trace()
+                tracing.mark("enqueued")
+                ctx.voice_state.on_queue_changed()
+            logger.info("Queued %s (%d in the queue).", track, len(ctx.voice_state.songs))
             await ctx.message.add_reaction("🎵")
             if already_playing:
-                await ctx.send(f"🔊 Queued: {ytdl_source.video_info.title}")
+                ctx.voice_state.notifier.queued(ctx.channel, track.title)
+
+    async def _play_playlist(
+        self, ctx: commands.Context, url: str, *, requested_at: Optional[float] = None
+    ):
+        """
+        Queue a playlist incrementally. Each batch of the (flat) listing is
+        queued as soon as it arrives, so the first song can start playing
+        while the rest of the playlist is still being enumerated.
+        """
+        queued = 0
+        try:
+            async for batch in iter_playlist(
+                YtdlSource.YTDL,
+                url,
+                batch_size=self.PLAYLIST_BATCH_SIZE,
+                limit=self.MAX_PLAYLIST_TRACKS,
+                engine=YtdlSource.EXTRACTION_ENGINE,
+                guild_id=ctx.guild.id,
+            ):
+                with tracing.span("enqueue", tracks=len(batch)):
+                    for entry in batch:
+                        track = QueuedTrack.from_playlist_entry(
+                            ctx, entry, requested_at=requested_at
+                        )
+                        await ctx.voice_state.songs.put(track)
+                        # Only the playlist's first song is followed to playback.
+                        if not queued and entry is batch[0]:
+                            track.trace = tracing.current_trace()
+                            tracing.mark("enqueued")
+                    ctx.voice_state.on_queue_changed()
+
+                if not queued and batch:
+                    await ctx.message.add_reaction("🎵")
+                queued += len(batch)
+        except YTDLError as e:
+            record_error(e)
+            await ctx.send(f"An error occurred while processing this request: {str(e)}")
+            if not queued:
+                return
+
+        logger.info(f"Queued {queued} songs from playlist: {url}")
+        await ctx.send(f"🔊 Queued {queued} songs from the playlist.")
 
     @_join.before_invoke
     @_play.before_invoke
     async def ensure_voice_state(self, ctx: commands.Context):
-        if not ctx.author.voice or not ctx.author.voice.channel:
-            raise commands.CommandError("You are not connected to any voice channel.")
+        # This is the first hook to run for a command, so start its trace here.
+        if ctx.command.name == "_play":
+            tracing.TRACER.start_trace(guild_id=ctx.guild.id)
+
+        with tracing.span("ensure_voice_state"):
+            if not ctx.author.voice or not ctx.author.voice.channel:
+                raise commands.CommandError(
+                    "You are not connected to any voice channel."
+                )
 
-        if ctx.voice_client:
-            if ctx.voice_client.channel != ctx.author.voice.channel:
-                raise commands.CommandError("Bot is already in a voice channel.")
+            if ctx.voice_client:
+                if ctx.voice_client.channel != ctx.author.voice.channel:
+                    raise commands.CommandError("Bot is already in a voice channel.")
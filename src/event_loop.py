@@ -0,0 +1,53 @@
+"""
+Choose the asyncio event loop implementation the bot runs on.
+
+Set `EVENT_LOOP=uvloop` to run on uvloop (`pip install .[performance]`),
+which has less overhead per callback than the default loop. Falls back to
+the default loop, with a warning, where uvloop isn't installed.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Any, Callable, Coroutine, Optional
+
+from src.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+EVENT_LOOP: str = os.getenv("EVENT_LOOP", "asyncio").lower()
+
+EVENT_LOOP_INFO = REGISTRY.gauge(
+    "gimlibot_event_loop_info",
+    "The event loop implementation in use (always 1).",
+    labelnames=("backend",),
+)
+
+
+def loop_factory(
+    backend: str = EVENT_LOOP,
+) -> Optional[Callable[[], asyncio.AbstractEventLoop]]:
+    """The factory for the requested backend's loops, or None for the default."""
+    if backend == "asyncio":
+        return None
+    if backend != "uvloop":
+        raise ValueError(
+            f"Unknown event loop backend: '{backend}'. Use asyncio or uvloop."
+        )
+
+    try:
+        import uvloop
+    except ImportError:
+        logger.warning("uvloop is not installed; using the default asyncio event loop.")
+        return None
+    return uvloop.new_event_loop
+
+
+def run(main: Coroutine[Any, Any, Any], *, backend: str = EVENT_LOOP) -> Any:
+    """`asyncio.run`, on the configured event loop implementation."""
+    factory = loop_factory(backend)
+    used = "asyncio" if factory is None else backend
+    EVENT_LOOP_INFO.set(1, backend=used)
+    logger.info("Running on the %s event loop.", used)
+    with asyncio.Runner(loop_factory=factory) as runner:
+        return runner.run(main)
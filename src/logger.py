@@ -1,11 +1,34 @@
+import atexit
+import copy
+import json
 import logging
 import os
-from typing import Union
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, Tuple, Union
+
+from src.metrics import REGISTRY
 
 # Define log format and log level
 LOG_FORMAT: str = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 LOG_LEVEL: Union[int, str] = os.getenv("LOG_LEVEL", "INFO").upper()
 # LOG_LEVEL: Union[int, str] = os.getenv("LOG_LEVEL", "DEBUG").upper()
+# Write logs from a background thread, so a slow stdout never stalls the caller.
+LOG_ASYNC: bool = os.getenv("LOG_ASYNC", "1") != "0"
+# One JSON object per line instead of LOG_FORMAT, for log collectors.
+LOG_JSON: bool = os.getenv("LOG_JSON", "0") == "1"
+# INFO and DEBUG messages allowed per call site each minute (0, the default,
+# for no limit).
+LOG_RATE_LIMIT: int = int(os.getenv("LOG_RATE_LIMIT", "0"))
+
+_LISTENER: Optional[QueueListener] = None
+
+LOG_RECORDS_DROPPED = REGISTRY.counter(
+    "gimlibot_log_records_dropped_total",
+    "Log records dropped because the logging queue was full.",
+)
 
 
 def _validate_log_level(log_level: Union[int, str]) -> Union[int, str]:
@@ -23,20 +46,144 @@ def _validate_log_level(log_level: Union[int, str]) -> Union[int, str]:
     return log_level
 
 
-def setup_root_logger() -> None:
+class TextFormatter(logging.Formatter):
+    """A plain formatter that notes how many similar records were rate limited."""
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        message = super().formatMessage(record)
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            message += f" (suppressed {suppressed} similar messages)"
+        return message
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats each record as a single line of JSON."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "suppressed", 0):
+            entry["suppressed"] = record.suppressed
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Let through at most `limit` records from each call site (source file and
+    line) every `period` seconds, for messages that would otherwise fire per
+    frame or per check. Warnings and errors always pass. The next record let
+    through from a call site carries how many were dropped in a `suppressed`
+    attribute (the message itself is left alone, as other handlers share it).
+    """
+
+    def __init__(self, limit: int, period: float = 60.0):
+        super().__init__()
+        self.limit = limit
+        self.period = period
+        # Call site -> (start of its current period, records seen in it).
+        self._windows: Dict[Tuple[str, int], Tuple[float, int]] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            started_at, seen = self._windows.get(key, (now, 0))
+            if now - started_at >= self.period:
+                suppressed = max(0, seen - self.limit)
+                started_at, seen = now, 0
+            else:
+                suppressed = 0
+            self._windows[key] = (started_at, seen + 1)
+
+        if seen >= self.limit:
+            return False
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Hands records to the listener thread without blocking. Only the message
+    itself is formatted by the caller (so later changes to its arguments
+    don't show up); timestamps, tracebacks and JSON are formatted by the
+    listener. When the queue is full, records are dropped and counted.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg, record.args = record.getMessage(), None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+
+def _stop_listener() -> None:
+    global _LISTENER
+    if _LISTENER is not None:
+        _LISTENER.stop()
+        _LISTENER = None
+
+
+# Write out whatever is still queued when the process exits.
+atexit.register(_stop_listener)
+
+
+def setup_root_logger(
+    *,
+    async_mode: bool = LOG_ASYNC,
+    json_output: bool = LOG_JSON,
+    rate_limit: int = LOG_RATE_LIMIT,
+    queue_size: int = 10_000,
+) -> None:
     """
     Configures the root logger with the specified log level and format.
     This function should be called once at the beginning of your application.
+
+    In async mode (the default) records are queued and written to the
+    console by a listener thread, which is flushed at exit.
     """
+    global _LISTENER
     _validate_log_level(LOG_LEVEL)
+    _stop_listener()
+
+    console = logging.StreamHandler()  # Console output
+    console.setFormatter(JsonFormatter() if json_output else TextFormatter(LOG_FORMAT))
+
+    handler: logging.Handler = console
+    if async_mode:
+        handler = NonBlockingQueueHandler(queue.Queue(queue_size))
+        _LISTENER = QueueListener(handler.queue, console)
+        _LISTENER.start()
+    if rate_limit > 0:
+        handler.addFilter(RateLimitFilter(rate_limit))
 
     # Setup the root logger configuration - this should be sufficient for this application
-    logging.basicConfig(
-        level=LOG_LEVEL,
-        format=LOG_FORMAT,
-        handlers=[logging.StreamHandler()],  # Console output
-    )
+    # `force` replaces the handler of any earlier call, whose listener has stopped.
+    logging.basicConfig(level=LOG_LEVEL, handlers=[handler], force=True)
 
     logging.info(
-        f"Root logger has been set up with:\n\t- {LOG_LEVEL=}\n\t- {LOG_FORMAT=}"
+        "Root logger has been set up with:\n\t- LOG_LEVEL=%r\n\t- LOG_FORMAT=%r"
+        "\n\t- LOG_ASYNC=%r\n\t- LOG_JSON=%r",
+        LOG_LEVEL,
+        LOG_FORMAT,
+        async_mode,
+        json_output,
     )
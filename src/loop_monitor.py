@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+from src.metrics import REGISTRY
+from src.parse_json import parse_json
+
+logger = logging.getLogger(__name__)
+
+EVENT_LOOP_LAG = REGISTRY.histogram(
+    "gimlibot_event_loop_lag_seconds",
+    "How late the event loop woke a sleeping task, i.e. how long callbacks "
+    "were held up behind other work on the loop.",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+EVENT_LOOP_STALLS = REGISTRY.counter(
+    "gimlibot_event_loop_stalls_total",
+    "Times the event loop was blocked for longer than the stall threshold.",
+)
+
+
+class LoopLagMonitor:
+    """
+    Measure event loop lag by sleeping for `interval` and observing how much
+    later than that the loop got back to us. Everything on the loop (gateway
+    heartbeats, commands, the voice send path's bookkeeping) is delayed by at
+    least as much.
+
+    With a `stall_threshold`, a watchdog thread also checks whether the loop
+    is overdue while it is still blocked, and logs the stack of the loop
+    thread at that moment, i.e. whatever is holding it up.
+    """
+
+    def __init__(self, *, interval: float = 0.5, stall_threshold: Optional[float] = None):
+        if interval <= 0:
+            raise ValueError("interval must be positive.")
+        if stall_threshold is not None and stall_threshold <= 0:
+            raise ValueError("stall_threshold must be positive.")
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._loop_thread_id: Optional[int] = None
+        # When the monitor task should next wake up (by time.monotonic).
+        self._due_at: Optional[float] = None
+
+    @classmethod
+    def from_config(cls, config_path: str) -> LoopLagMonitor:
+        config = parse_json(config_path)
+        return cls(
+            interval=config.get("loop_lag_interval", 0.5),
+            stall_threshold=config.get("loop_stall_threshold"),
+        )
+
+    def start(self):
+        """Start monitoring the running loop; call from a coroutine on it."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        if self.stall_threshold is not None and self._watchdog is None:
+            self._loop_thread_id = threading.get_ident()
+            self._stopped.clear()
+            self._watchdog = threading.Thread(
+                target=self._watch, daemon=True, name="loop-watchdog"
+            )
+            self._watchdog.start()
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._watchdog is not None:
+            self._stopped.set()
+            self._watchdog.join()
+            self._watchdog = None
+
+    async def _run(self):
+        while True:
+            started = time.monotonic()
+            self._due_at = started + self.interval
+            await asyncio.sleep(self.interval)
+            EVENT_LOOP_LAG.observe(max(0.0, time.monotonic() - started - self.interval))
+
+    def _watch(self):
+        reported_due_at = None
+        check_every = min(self.interval, self.stall_threshold) / 2
+        while not self._stopped.wait(check_every):
+            due_at = self._due_at
+            if due_at is None or due_at == reported_due_at:
+                continue
+            overdue = time.monotonic() - due_at
+            if overdue >= self.stall_threshold:
+                # Report each stall once, while the loop is still stuck in it.
+                reported_due_at = due_at
+                EVENT_LOOP_STALLS.inc()
+                logger.warning(
+                    "Event loop blocked for at least %.3fs. Loop thread stack:\n%s",
+                    overdue,
+                    self.loop_stack(),
+                )
+
+    def loop_stack(self) -> str:
+        """The current stack of the thread running the loop."""
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return "(loop thread not found)"
+        return "".join(traceback.format_stack(frame))
@@ -0,0 +1,283 @@
+"""
+Minimal, dependency-free metrics primitives for the bot.
+
+Metrics are registered once at import time (module level) and updated from
+both the event loop and the voice threads, so every update takes a lock.
+Values that are cheaper to read when asked for than to keep up to date (queue
+depths, say) are set by collectors, which run just before each exposition.
+"""
+
+from __future__ import annotations
+
+import bisect
+import logging
+import math
+import threading
+import weakref
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+LabelValues = Tuple[str, ...]
+
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _label_values(self, labels: Dict[str, object]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"Metric {self.name} expects labels {self.labelnames}, "
+                f"got {tuple(labels)}."
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, description, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        if amount < 0:
+            raise ValueError("Counters can only be incremented.")
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._label_values(labels), 0)
+
+    def samples(self) -> List[Tuple[LabelValues, float]]:
+        with self._lock:
+            return list(self._values.items())
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) - amount
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def replace(self, values: Dict[LabelValues, float]) -> None:
+        """Replace every labelled value at once, dropping label sets not given."""
+        values = {tuple(str(value) for value in key): v for key, v in values.items()}
+        with self._lock:
+            self._values = values
+
+
+class HistogramSnapshot:
+    def __init__(self, buckets: Sequence[float], counts: Sequence[int], total: float):
+        self.buckets = tuple(buckets)
+        self.counts = tuple(counts)
+        self.total = total
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def cumulative(self) -> List[Tuple[float, int]]:
+        """(upper bound, cumulative count) pairs, ending with +Inf."""
+        running = 0
+        pairs = []
+        for bound, count in zip((*self.buckets, float("inf")), self.counts):
+            running += count
+            pairs.append((bound, running))
+        return pairs
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, description, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # One count per bucket, plus the +Inf overflow bucket.
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._totals: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._label_values(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * (len(self.buckets) + 1))
+            counts[index] += 1
+            self._totals[key] = self._totals.get(key, 0.0) + value
+
+    def snapshot(self, **labels) -> HistogramSnapshot:
+        key = self._label_values(labels)
+        with self._lock:
+            counts = list(self._counts.get(key, [0] * (len(self.buckets) + 1)))
+            total = self._totals.get(key, 0.0)
+        return HistogramSnapshot(self.buckets, counts, total)
+
+    def samples(self) -> List[Tuple[LabelValues, HistogramSnapshot]]:
+        with self._lock:
+            keys = list(self._counts)
+        return [(key, self.snapshot(**dict(zip(self.labelnames, key)))) for key in keys]
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def _escape(value: str, *, quotes: bool = True) -> str:
+    value = value.replace("\\", "\\\\").replace("\n", "\\n")
+    return value.replace('"', '\\"') if quotes else value
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Optional[Callable[[], None]]]] = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric_cls, name: str, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = metric_cls(name, *args, **kwargs)
+                self._metrics[name] = metric
+            elif type(metric) is not metric_cls:
+                raise ValueError(
+                    f"Metric {name} is already registered as a {metric.kind}."
+                )
+            return metric
+
+    def counter(self, name: str, description: str, labelnames=()) -> Counter:
+        return self._register(Counter, name, description, labelnames)
+
+    def gauge(self, name: str, description: str, labelnames=()) -> Gauge:
+        return self._register(Gauge, name, description, labelnames)
+
+    def histogram(
+        self, name: str, description: str, labelnames=(), buckets=DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram, name, description, labelnames, buckets)
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def collect(self) -> List[_Metric]:
+        with self._lock:
+            return list(self._metrics.values())
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """
+        Run `collector` before every exposition, to set gauges from state that
+        isn't tracked as it changes. Bound methods are held weakly, so a
+        collector doesn't keep its object (e.g. a cog) alive.
+        """
+        ref = (
+            weakref.WeakMethod(collector)
+            if hasattr(collector, "__self__")
+            else (lambda: collector)
+        )
+        with self._lock:
+            self._collectors.append(ref)
+
+    def remove_collector(self, collector: Callable[[], None]) -> None:
+        with self._lock:
+            self._collectors = [ref for ref in self._collectors if ref() != collector]
+
+    def run_collectors(self) -> None:
+        with self._lock:
+            # Drop the collectors of objects that have since been garbage collected.
+            self._collectors = [ref for ref in self._collectors if ref() is not None]
+            collectors = [ref() for ref in self._collectors]
+        for collector in collectors:
+            if collector is None:
+                continue
+            try:
+                collector()
+            except Exception:
+                logger.exception(f"Metrics collector {collector} failed.")
+
+    def render(self) -> str:
+        """Every metric in the Prometheus text exposition format (version 0.0.4)."""
+        self.run_collectors()
+        lines: List[str] = []
+        for metric in sorted(self.collect(), key=lambda metric: metric.name):
+            description = _escape(metric.description, quotes=False)
+            lines.append(f"# HELP {metric.name} {description}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            if isinstance(metric, Histogram):
+                self._render_histogram(metric, lines)
+                continue
+            # Unlabelled metrics are exported as zero before their first update.
+            samples = metric.samples() or ([] if metric.labelnames else [((), 0)])
+            for values, value in sorted(samples):
+                labels = _format_labels(metric.labelnames, values)
+                lines.append(f"{metric.name}{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _render_histogram(metric: Histogram, lines: List[str]) -> None:
+        names = (*metric.labelnames, "le")
+        samples = metric.samples()
+        if not samples and not metric.labelnames:
+            samples = [((), metric.snapshot())]
+        for values, snapshot in sorted(samples, key=lambda sample: sample[0]):
+            for bound, count in snapshot.cumulative():
+                labels = _format_labels(names, (*values, _format_value(bound)))
+                lines.append(f"{metric.name}_bucket{labels} {count}")
+            labels = _format_labels(metric.labelnames, values)
+            lines.append(f"{metric.name}_sum{labels} {_format_value(snapshot.total)}")
+            lines.append(f"{metric.name}_count{labels} {snapshot.count}")
+
+
+REGISTRY = MetricsRegistry()
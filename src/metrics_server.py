@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Optional
+
+from async_timeout import timeout
+
+from src.metrics import REGISTRY, MetricsRegistry
+from src.parse_json import parse_json
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class MetricsServer:
+    """
+    A minimal HTTP server on the bot's event loop that serves the metrics
+    registry at `/metrics` in the Prometheus text format.
+
+    It is cheap enough to leave running: nothing is computed between scrapes,
+    and a scrape only snapshots the registry (and runs its collectors), which
+    takes well under a millisecond. It listens on localhost by default; put
+    it behind something else before exposing it any further.
+    """
+
+    PATH = "/metrics"
+    REQUEST_TIMEOUT = 5
+    MAX_HEADERS = 100
+
+    def __init__(
+        self,
+        registry: MetricsRegistry = REGISTRY,
+        *,
+        host: str = "127.0.0.1",
+        port: int = 9108,
+    ):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._server: Optional[asyncio.Server] = None
+
+    @classmethod
+    def from_config(
+        cls, config_path: str, *, port_offset: int = 0
+    ) -> Optional[MetricsServer]:
+        """
+        Build the server described by a config file, or None if it's disabled.
+        Cluster workers each serve their own metrics, at `port + port_offset`.
+        """
+        config = parse_json(config_path)
+        if not config.get("enabled", True):
+            return None
+        return cls(
+            host=config.get("host", "127.0.0.1"),
+            port=config.get("port", 9108) + port_offset,
+        )
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        # Port 0 asks the OS for a free port; report the one we got.
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"Serving metrics at http://{self.host}:{self.port}{self.PATH}")
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            async with timeout(self.REQUEST_TIMEOUT):
+                request_line = await reader.readline()
+                # The headers don't matter, but have to be read off the socket.
+                for _ in range(self.MAX_HEADERS):
+                    if (await reader.readline()).strip() == b"":
+                        break
+
+            method, target, *_ = request_line.decode("latin-1").split() or ("", "")
+            path = target.split("?", 1)[0]
+            if method not in ("GET", "HEAD"):
+                status, body = "405 Method Not Allowed", b"Method not allowed\n"
+            elif path != self.PATH:
+                status, body = "404 Not Found", b"Not found\n"
+            else:
+                status, body = "200 OK", self.registry.render().encode()
+
+            headers = (
+                f"HTTP/1.1 {status}\r\n"
+                f"Content-Type: {CONTENT_TYPE}\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                "Connection: close\r\n\r\n"
+            )
+            writer.write(headers.encode("latin-1"))
+            if method != "HEAD":
+                writer.write(body)
+            await writer.drain()
+        except (TimeoutError, ConnectionError, ValueError) as e:
+            logger.debug("Dropped a metrics request: %r", e)
+        finally:
+            writer.close()
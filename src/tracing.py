@@ -0,0 +1,328 @@
+"""
+Lightweight request tracing for the play pipeline.
+
+A trace is started for each traced command and follows it through the event
+loop via a context variable, so any code it calls can open a `span` without
+being passed anything; tracks carry their trace into the player task, which
+re-activates it with `use`. Finished spans are written as JSON lines to a
+local file by a background thread, and the recent durations of each stage
+are kept for `Tracer.summary`.
+
+Summarise an exported file with `python -m benchmarks.trace_summary`.
+"""
+
+from __future__ import annotations
+
+import itertools
+import json
+import logging
+import math
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional
+
+from src.parse_json import parse_json
+
+logger = logging.getLogger(__name__)
+
+_CURRENT_TRACE: ContextVar[Optional[Trace]] = ContextVar("trace", default=None)
+_CURRENT_SPAN: ContextVar[Optional[int]] = ContextVar("span", default=None)
+
+
+@dataclass
+class Span:
+    name: str
+    request_id: str
+    guild_id: Optional[int]
+    span_id: int
+    parent_id: Optional[int]
+    start: float  # Unix time
+    duration: float  # Seconds
+    error: Optional[str] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+
+class Trace:
+    """The spans of one request, identified by `request_id`."""
+
+    def __init__(self, tracer: Tracer, *, guild_id: Optional[int]):
+        self.tracer = tracer
+        self.guild_id = guild_id
+        self.request_id = uuid.uuid4().hex[:16]
+        self.started_at = time.monotonic()
+        # Points in time (by time.monotonic) that later spans are measured from.
+        self.marks: Dict[str, float] = {}
+        self._span_ids = itertools.count(1)
+
+    def mark(self, name: str):
+        self.marks[name] = time.monotonic()
+
+    def record(
+        self,
+        name: str,
+        started_at: float,
+        ended_at: Optional[float] = None,
+        *,
+        parent_id: Optional[int] = None,
+        error: Optional[str] = None,
+        **attributes,
+    ) -> Span:
+        """
+        Record a span that ran from `started_at` to `ended_at` (by
+        time.monotonic, defaulting to now). Safe to call from any thread.
+        """
+        return self._export(
+            name, next(self._span_ids), parent_id, started_at, ended_at, error, attributes
+        )
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[None]:
+        """Time the body of a `with` block as a span, nested in the current one."""
+        span_id = next(self._span_ids)
+        parent_id = _CURRENT_SPAN.get()
+        token = _CURRENT_SPAN.set(span_id)
+        started_at, error = time.monotonic(), None
+        try:
+            yield
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            _CURRENT_SPAN.reset(token)
+            self._export(name, span_id, parent_id, started_at, None, error, attributes)
+
+    def _export(
+        self,
+        name: str,
+        span_id: int,
+        parent_id: Optional[int],
+        started_at: float,
+        ended_at: Optional[float],
+        error: Optional[str],
+        attributes: Dict[str, Any],
+    ) -> Span:
+        now = time.monotonic()
+        ended_at = now if ended_at is None else ended_at
+        span = Span(
+            name=name,
+            request_id=self.request_id,
+            guild_id=self.guild_id,
+            span_id=span_id,
+            parent_id=parent_id,
+            start=time.time() - (now - started_at),
+            duration=max(0.0, ended_at - started_at),
+            error=error,
+            attributes=attributes,
+        )
+        self.tracer.export(span)
+        return span
+
+
+@dataclass
+class StageSummary:
+    count: int
+    p50: float
+    p90: float
+    p99: float
+    max: float
+
+    def __str__(self) -> str:
+        return (
+            f"count={self.count} p50={self.p50 * 1000:.1f}ms "
+            f"p90={self.p90 * 1000:.1f}ms p99={self.p99 * 1000:.1f}ms "
+            f"max={self.max * 1000:.1f}ms"
+        )
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    """The nearest-rank percentile of already sorted values."""
+    if not ordered:
+        return float("nan")
+    rank = max(1, math.ceil(fraction * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(durations: Dict[str, Iterable[float]]) -> Dict[str, StageSummary]:
+    """Percentiles of each stage's span durations, in seconds."""
+    summary = {}
+    for name, values in durations.items():
+        ordered = sorted(values)
+        if ordered:
+            summary[name] = StageSummary(
+                count=len(ordered),
+                p50=percentile(ordered, 0.5),
+                p90=percentile(ordered, 0.9),
+                p99=percentile(ordered, 0.99),
+                max=ordered[-1],
+            )
+    return summary
+
+
+def load_durations(path: str) -> Dict[str, List[float]]:
+    """Every span duration in an exported trace file, by stage."""
+    durations: Dict[str, List[float]] = defaultdict(list)
+    with open(path) as file:
+        for line in file:
+            if line.strip():
+                span = json.loads(line)
+                durations[span["name"]].append(span["duration"])
+    return durations
+
+
+class Tracer:
+    """
+    Starts traces and exports their spans as JSON lines to `path` (if set),
+    from a writer thread so the event loop never waits on the disk. The file
+    is rotated to `path + ".1"` once it grows past `max_bytes`.
+    """
+
+    SUMMARY_SPANS = 1000  # Recent spans per stage kept for `summary`
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        *,
+        enabled: bool = True,
+        max_bytes: int = 50 * 2**20,
+    ):
+        self.path = path
+        self.enabled = enabled
+        self.max_bytes = max_bytes
+        self._recent: Dict[str, Deque[float]] = defaultdict(
+            lambda: deque(maxlen=self.SUMMARY_SPANS)
+        )
+        self._lock = threading.Lock()
+        self._queue: queue.SimpleQueue[Optional[Span]] = queue.SimpleQueue()
+        self._writer: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_config(cls, config_path: str) -> Tracer:
+        config = parse_json(config_path)
+        return cls(
+            config.get("path"),
+            enabled=config.get("enabled", True),
+            max_bytes=config.get("max_bytes", 50 * 2**20),
+        )
+
+    def start_trace(self, *, guild_id: Optional[int]) -> Optional[Trace]:
+        """Start a trace and make it current for the rest of this task."""
+        if not self.enabled:
+            return None
+        trace = Trace(self, guild_id=guild_id)
+        _CURRENT_TRACE.set(trace)
+        _CURRENT_SPAN.set(None)
+        return trace
+
+    def export(self, span: Span):
+        with self._lock:
+            self._recent[span.name].append(span.duration)
+            if self.path is None:
+                return
+            if self._writer is None:
+                self._writer = threading.Thread(
+                    target=self._write_spans, daemon=True, name="trace-writer"
+                )
+                self._writer.start()
+        self._queue.put(span)
+
+    def summary(self) -> Dict[str, StageSummary]:
+        """Percentiles of the most recent spans of each stage."""
+        with self._lock:
+            durations = {name: list(values) for name, values in self._recent.items()}
+        return summarize(durations)
+
+    def close(self):
+        """Write out any queued spans and stop the writer thread."""
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            self._queue.put(None)
+            writer.join()
+
+    def _write_spans(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        file = open(self.path, "a")
+        try:
+            while True:
+                span = self._queue.get()
+                # Write everything that's queued up in one go.
+                batch = []
+                while span is not None:
+                    batch.append(json.dumps(asdict(span), default=str))
+                    try:
+                        span = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                if batch:
+                    file.write("\n".join(batch) + "\n")
+                    file.flush()
+                if span is None:
+                    return
+                if file.tell() >= self.max_bytes:
+                    file.close()
+                    os.replace(self.path, self.path + ".1")
+                    file = open(self.path, "a")
+        except OSError:
+            logger.exception(f"Failed to write traces to {self.path}.")
+        finally:
+            file.close()
+
+
+TRACER = Tracer.from_config("config/tracing.json")
+
+
+def current_trace() -> Optional[Trace]:
+    return _CURRENT_TRACE.get()
+
+
+def current_span_id() -> Optional[int]:
+    return _CURRENT_SPAN.get()
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[None]:
+    """A span of the current trace, or nothing if no request is being traced."""
+    trace = _CURRENT_TRACE.get()
+    if trace is None:
+        yield
+        return
+    with trace.span(name, **attributes):
+        yield
+
+
+def mark(name: str):
+    """Mark a point in time on the current trace, if there is one."""
+    trace = _CURRENT_TRACE.get()
+    if trace is not None:
+        trace.mark(name)
+
+
+@contextmanager
+def use(trace: Optional[Trace]) -> Iterator[None]:
+    """Make `trace` the current trace (None for none) within a `with` block."""
+    trace_token = _CURRENT_TRACE.set(trace)
+    span_token = _CURRENT_SPAN.set(None)
+    try:
+        yield
+    finally:
+        _CURRENT_SPAN.reset(span_token)
+        _CURRENT_TRACE.reset(trace_token)
+
+
+def detach():
+    """
+    Stop tracing in the current task. Long-lived tasks call this first, as
+    they inherit the trace of whichever request happened to create them.
+    """
+    _CURRENT_TRACE.set(None)
+    _CURRENT_SPAN.set(None)
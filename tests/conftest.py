@@ -31,3 +31,21 @@ def pytest_collection_modifyitems(config: Config, items: list[Item]) -> None:
     for item in items:
         if "slow" in item.keywords and "slow" not in markers:
             item.add_marker(skip_slow)
+
+
+def make_info(video_id: str, expire: float | None = None) -> dict:
+    """A trimmed-down yt-dlp info dict for a video, as `extract_info` returns it."""
+    stream_url = f"https://rr1.googlevideo.com/videoplayback?id={video_id}"
+    if expire is not None:
+        stream_url += f"&expire={int(expire)}"
+    return {
+        "id": video_id,
+        "title": f"Video {video_id}",
+        "thumbnail": f"https://i.ytimg.com/vi/{video_id}/hq.jpg",
+        "duration": 212,
+        "webpage_url": f"https://www.youtube.com/watch?v={video_id}",
+        "url": stream_url,
+        "view_count": 1_000,
+        "upload_date": "20091025",
+        "formats": [{"format_id": "251"}] * 50,
+    }
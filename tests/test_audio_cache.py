@@ -0,0 +1,128 @@
+import os
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+from conftest import make_info
+
+from src.cogs.music_bot.parse_youtube_input.audio_cache import AudioCache
+from src.cogs.music_bot.parse_youtube_input.extract_from_youtube import (
+    YtdlSource,
+    cache_audio,
+    ffmpeg_options,
+)
+from src.cogs.music_bot.parse_youtube_input.video_info import VideoInfo
+from src.cogs.music_bot.queued_track import QueuedTrack
+
+
+@pytest.fixture
+def cache(tmp_path) -> AudioCache:
+    return AudioCache(str(tmp_path / "audio"), max_bytes=100, min_plays=2)
+
+
+def write_download(cache: AudioCache, video_id: str, size: int) -> None:
+    """Pretend yt-dlp has finished downloading a track."""
+    os.makedirs(cache.partial_directory, exist_ok=True)
+    with open(os.path.join(cache.partial_directory, f"{video_id}.webm"), "wb") as file:
+        file.write(b"\0" * size)
+
+
+def test_tracks_are_cached_once_popular(cache: AudioCache):
+    assert not cache.record_play("abc", filesize=40)
+    assert cache.record_play("abc", filesize=40)
+    # Already being downloaded.
+    assert not cache.record_play("abc", filesize=40)
+
+    write_download(cache, "abc", 40)
+    path = cache.store("abc")
+
+    assert cache.lookup("abc") == path
+    assert os.path.getsize(path) == 40
+    assert cache.total_bytes == 40
+    assert not os.listdir(cache.partial_directory)
+
+
+def test_tracks_over_budget_are_never_cached(cache: AudioCache):
+    for _ in range(3):
+        assert not cache.record_play("huge", filesize=1_000)
+
+
+def test_least_recently_played_files_are_evicted(cache: AudioCache):
+    for video_id in ("a", "b", "c"):
+        write_download(cache, video_id, 40)
+        cache.store(video_id)
+        time.sleep(0.01)
+
+    assert "a" not in cache
+    assert cache.total_bytes == 80
+
+    cache.lookup("b")
+    write_download(cache, "d", 40)
+    cache.store("d")
+
+    assert "c" not in cache
+    assert {"b", "d"} <= set(cache.files)
+
+
+def test_cached_files_survive_a_restart(cache: AudioCache):
+    write_download(cache, "abc", 40)
+    cache.store("abc")
+
+    reopened = AudioCache(cache.directory, max_bytes=100)
+
+    assert reopened.lookup("abc") is not None
+    assert reopened.total_bytes == 40
+
+
+def test_ffmpeg_options_skip_reconnects_for_local_files():
+    config = {"before_options": "-reconnect 1", "options": "-vn"}
+
+    remote = ffmpeg_options(config, "https://rr1.googlevideo.com/videoplayback")
+    local = ffmpeg_options(config, "/cache/audio/abc.webm", start=5)
+
+    assert remote["before_options"] == "-reconnect 1"
+    assert local == {"before_options": "-ss 5.000", "options": "-vn"}
+
+
+@pytest.mark.asyncio
+async def test_cache_audio_downloads_with_the_cache_downloader(cache: AudioCache):
+    def extract_info(url, download):
+        write_download(cache, "abc", 10)
+        return make_info("abc", expire=1) | {"filesize": 10}
+
+    downloader = Mock()
+    downloader.extract_info.side_effect = extract_info
+
+    with patch.object(AudioCache, "downloader", downloader):
+        path = await cache_audio(cache, Mock(video_id="abc"))
+
+    downloader.extract_info.assert_called_once_with(
+        "https://www.youtube.com/watch?v=abc", download=True
+    )
+    assert path is not None
+    assert path == cache.lookup("abc")
+
+
+@pytest.mark.asyncio
+async def test_cached_tracks_play_from_disk_without_a_refresh(cache: AudioCache):
+    write_download(cache, "abc", 10)
+    cache.store("abc")
+    # The stream URL has long expired, but isn't needed.
+    track = QueuedTrack(
+        VideoInfo.parse_video_information(
+            make_info("abc", expire=1) | {"filesize": 10}, download_info=True
+        ),
+        requester_id=1,
+        channel_id=2,
+    )
+
+    with (
+        patch.object(YtdlSource, "AUDIO_CACHE", cache),
+        patch.dict(YtdlSource.PLAYBACK_CONFIG, mode="pcm"),
+        patch.object(YtdlSource, "from_video_info") as from_video_info,
+    ):
+        await track.create_source()
+
+    video_info = from_video_info.call_args.args[0]
+    assert video_info.stream_url == cache.lookup("abc")
+    assert track.video_info.download_info.filesize == 10
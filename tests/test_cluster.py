@@ -0,0 +1,90 @@
+import queue
+from unittest.mock import Mock
+
+import pytest
+
+from src.cluster import ClusterConfig, HealthReport, Supervisor, assign_shards
+
+
+def test_assign_shards_splits_contiguous_runs():
+    assert assign_shards(10, 3) == [[0, 1, 2, 3], [4, 5, 6], [7, 8, 9]]
+    assert assign_shards(2, 2) == [[0], [1]]
+
+    with pytest.raises(ValueError):
+        assign_shards(2, 3)
+
+
+def make_report(worker_id: int, pid: int) -> HealthReport:
+    return HealthReport(
+        worker_id=worker_id,
+        pid=pid,
+        shard_ids=[worker_id],
+        ready=True,
+        guilds={worker_id: 10},
+        voice_states={worker_id: 2},
+        latencies={worker_id: 0.05},
+        max_rss_bytes=100 * 2**20,
+        threads=12,
+    )
+
+
+@pytest.fixture
+def supervisor() -> Supervisor:
+    pids = iter(range(100, 200))
+
+    def start_process(worker):
+        return Mock(pid=next(pids), is_alive=Mock(return_value=True), exitcode=None)
+
+    config = ClusterConfig(
+        workers=2, shard_count=4, heartbeat_timeout=30, identify_interval=5
+    )
+    supervisor = Supervisor(config, token="token", start_process=start_process)
+    # Skip the multiprocessing queue's feeder thread, so reports arrive immediately.
+    supervisor._reports = queue.Queue()
+    supervisor.plan(supervisor.shard_count)
+    return supervisor
+
+
+def test_worker_starts_are_staggered_by_identify_rate(supervisor: Supervisor):
+    supervisor.start_pending(now=0)
+    supervisor.start_pending(now=5)
+    assert supervisor.workers[1].process is None
+
+    # Worker 0 runs two shards, so worker 1 waits for both to identify.
+    supervisor.start_pending(now=10)
+    assert supervisor.workers[1].process.pid == 101
+
+
+def test_dead_and_hung_workers_are_restarted(supervisor: Supervisor):
+    supervisor.start_pending(now=0)
+    supervisor.start_pending(now=10)
+    dead, hung = supervisor.workers
+    dead.process.is_alive.return_value = False
+    old_hung_process = hung.process
+
+    supervisor._reports.put(make_report(1, pid=hung.process.pid))
+    supervisor.drain_reports(now=20)
+    assert hung.last_report.voice_states == {1: 2}
+
+    supervisor.check_workers(now=45)
+    assert dead.restarts == 1 and hung.restarts == 0
+
+    supervisor.check_workers(now=60)
+    assert hung.restarts == 1
+    old_hung_process.terminate.assert_called_once()
+
+    # Restarts wait out their backoff, then get fresh processes.
+    supervisor.start_pending(now=46)
+    assert dead.process.pid == 100  # Not yet restarted
+    supervisor.start_pending(now=70)
+    supervisor.start_pending(now=80)
+    assert dead.process.pid == 102
+    assert hung.process.pid == 103
+
+
+def test_reports_from_replaced_processes_are_ignored(supervisor: Supervisor):
+    supervisor.start_pending(now=0)
+    supervisor._reports.put(make_report(0, pid=999))
+    supervisor.drain_reports(now=1)
+
+    assert supervisor.health()[0] is None
@@ -0,0 +1,85 @@
+import sys
+import threading
+from unittest.mock import Mock, patch
+
+import discord
+
+from src.cogs.music_bot import encoder_pool
+from src.cogs.music_bot.encoder_pool import CREDIT_BATCH, PooledStream, _EncodeStream
+
+FRAME_SIZE = discord.opus.Encoder.FRAME_SIZE
+
+
+def fake_ffmpeg(frames: int) -> list:
+    """A command line that writes `frames` frames of PCM, like ffmpeg would."""
+    code = (
+        f"import sys; sys.stdout.buffer.write(b'\\x01\\x00' * {FRAME_SIZE // 2 * frames})"
+    )
+    return [sys.executable, "-c", code]
+
+
+def test_encode_stream_scales_encodes_and_marks_the_end():
+    sent = []
+    stream = _EncodeStream(
+        7,
+        fake_ffmpeg(3),
+        volume=2.0,
+        encode=lambda pcm: pcm[:4],
+        send=lambda stream_id, packet: sent.append((stream_id, packet)),
+    )
+
+    stream.run()
+
+    assert sent == [(7, b"\x02\x00\x02\x00")] * 3 + [(7, b"")]
+
+
+def test_encode_stream_waits_for_credit():
+    sent = []
+    with patch.object(encoder_pool, "WINDOW", 2):
+        stream = _EncodeStream(
+            1, fake_ffmpeg(5), volume=1.0, encode=bytes, send=lambda *p: sent.append(p)
+        )
+    stream.start()
+
+    stream.join(timeout=0.5)
+    assert len(sent) == 2
+
+    stream.close()
+    stream.join(timeout=5)
+    assert not stream.is_alive()
+    assert len(sent) == 2
+
+
+def make_stream() -> PooledStream:
+    worker = Mock(streams={})
+    stream = PooledStream(3, worker)
+    worker.streams[3] = stream
+    return stream
+
+
+def test_pooled_stream_returns_credit_as_packets_are_played():
+    stream = make_stream()
+    for n in range(CREDIT_BATCH + 1):
+        stream._deliver(bytes([n]))
+    stream._deliver(b"")
+
+    packets = [stream.read() for _ in range(CREDIT_BATCH + 1)]
+
+    assert packets == [bytes([n]) for n in range(CREDIT_BATCH + 1)]
+    stream.worker.send.assert_called_once_with("credit", 3, CREDIT_BATCH)
+    assert stream.read() == b""
+    assert stream.read() == b""
+
+
+def test_closing_a_pooled_stream_unblocks_its_reader():
+    stream = make_stream()
+    result = []
+    reader = threading.Thread(target=lambda: result.append(stream.read()))
+    reader.start()
+
+    stream.close()
+    reader.join(timeout=5)
+
+    assert result == [b""]
+    stream.worker.send.assert_called_once_with("close", 3)
+    assert 3 not in stream.worker.streams
@@ -0,0 +1,133 @@
+import asyncio
+import threading
+import time
+
+import pytest
+import yt_dlp
+
+from src.cogs.music_bot.parse_youtube_input import extraction_engine
+from src.cogs.music_bot.parse_youtube_input.extraction_engine import (
+    EXTRACTION_RUN_TIME,
+    ExtractionEngine,
+)
+
+
+class FakeYoutubeDL:
+    """Records the order and concurrency of extract_info calls."""
+
+    def __init__(self, delay: float = 0.02):
+        self.delay = delay
+        self.calls = []
+        self.running = 0
+        self.max_running = 0
+        self._lock = threading.Lock()
+
+    def extract_info(self, url: str, download: bool = False):
+        with self._lock:
+            self.calls.append(url)
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(self.delay)
+        with self._lock:
+            self.running -= 1
+        if url == "broken":
+            raise RuntimeError("Video unavailable")
+        return {"id": url}
+
+
+@pytest.fixture
+def ytdl() -> FakeYoutubeDL:
+    return FakeYoutubeDL()
+
+
+async def submit(engine: ExtractionEngine, ytdl: FakeYoutubeDL, jobs):
+    tasks = [
+        asyncio.create_task(engine.extract_info(ytdl, url, guild_id=guild))
+        for guild, url in jobs
+    ]
+    return await asyncio.gather(*tasks)
+
+
+@pytest.mark.asyncio
+async def test_results_are_returned(ytdl: FakeYoutubeDL):
+    engine = ExtractionEngine(max_workers=2)
+    results = await submit(engine, ytdl, [(1, "a"), (2, "b")])
+
+    assert results == [{"id": "a"}, {"id": "b"}]
+    assert EXTRACTION_RUN_TIME.snapshot(backend="thread").count >= 2
+    engine.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_guilds_are_served_round_robin(ytdl: FakeYoutubeDL):
+    engine = ExtractionEngine(max_workers=1, per_guild_limit=1)
+    busy_guild = [(1, f"busy-{n}") for n in range(6)]
+
+    await submit(engine, ytdl, [*busy_guild, (2, "quiet")])
+
+    # The quiet guild shouldn't wait behind all of the busy guild's links.
+    assert ytdl.calls.index("quiet") <= 2
+    engine.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_per_guild_limit(ytdl: FakeYoutubeDL):
+    engine = ExtractionEngine(max_workers=4, per_guild_limit=2)
+
+    await submit(engine, ytdl, [(1, f"song-{n}") for n in range(6)])
+
+    assert ytdl.max_running == 2
+    engine.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_errors_propagate(ytdl: FakeYoutubeDL):
+    engine = ExtractionEngine(max_workers=1)
+
+    with pytest.raises(RuntimeError, match="Video unavailable"):
+        await engine.extract_info(ytdl, "broken", guild_id=1)
+    # The worker slot is released after a failure.
+    assert await engine.extract_info(ytdl, "fine", guild_id=1) == {"id": "fine"}
+    engine.shutdown()
+
+
+def test_invalid_configuration():
+    with pytest.raises(ValueError):
+        ExtractionEngine(backend="fibre")
+    with pytest.raises(ValueError):
+        ExtractionEngine(backend="process")
+
+
+def offline_extract_info(self, url: str, download: bool = True):
+    return {
+        "id": url,
+        "title": f"Video {url}",
+        "url": f"https://rr1.googlevideo.com/videoplayback?id={url}",
+        "formats": [{"format_id": "251"}] * 50,
+        "http_headers": {"User-Agent": "yt-dlp"},
+    }
+
+
+def init_offline_worker(ydl_config: dict):
+    """Build the worker's YoutubeDL as usual, minus the network."""
+    yt_dlp.YoutubeDL.extract_info = offline_extract_info
+    extraction_engine._init_worker(ydl_config)
+
+
+@pytest.mark.asyncio
+async def test_process_backend_extracts_in_a_worker(monkeypatch):
+    # Pickled by reference, so the spawned worker runs this module's version.
+    monkeypatch.setattr(extraction_engine, "_init_worker", init_offline_worker)
+    engine = ExtractionEngine(
+        backend="process", max_workers=1, ydl_config={"quiet": True}
+    )
+    try:
+        info = await engine.extract_info(None, "abc", guild_id=1)
+    finally:
+        engine.shutdown()
+
+    # Only the trimmed info dict crosses back over the process boundary.
+    assert info["url"] == "https://rr1.googlevideo.com/videoplayback?id=abc"
+    assert info["title"] == "Video abc"
+    assert "formats" not in info and "http_headers" not in info
+    assert EXTRACTION_RUN_TIME.snapshot(backend="process").count >= 1
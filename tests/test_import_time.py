@@ -0,0 +1,30 @@
+import subprocess
+import sys
+
+import pytest
+
+from benchmarks.bench_import_time import import_times
+
+
+@pytest.mark.slow
+def test_importing_the_music_cog_defers_yt_dlp():
+    times = import_times("src.cogs.music_cog")
+
+    assert "src.cogs.music_cog" in times
+    assert not any(name.split(".")[0] == "yt_dlp" for name in times)
+
+
+@pytest.mark.slow
+def test_downloader_only_registers_youtube_extractors():
+    code = (
+        "from src.cogs.music_bot.parse_youtube_input.extract_from_youtube import "
+        "YtdlSource\n"
+        "print(*YtdlSource.YTDL._ies, sep=',')"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+
+    extractors = result.stdout.strip().splitlines()[-1].split(",")
+    assert "Youtube" in extractors
+    assert all(name.startswith("Youtube") for name in extractors)
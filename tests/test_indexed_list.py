@@ -0,0 +1,134 @@
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from src.cogs.music_bot.indexed_list import IndexedList
+
+
+def test_behaves_like_a_list_under_random_operations():
+    rng = random.Random(1234)
+    expected = list(range(50))
+    indexed = IndexedList(expected)
+
+    for step in range(2_000):
+        operation = rng.choice(["insert", "append", "pop", "move", "remove_range"])
+        if len(expected) < 10:  # Keep enough items around to exercise indexing.
+            operation = "append"
+        if operation == "insert":
+            index = rng.randint(0, len(expected))
+            expected.insert(index, step)
+            indexed.insert(index, step)
+        elif operation == "append":
+            expected.append(step)
+            indexed.append(step)
+        elif expected and operation == "pop":
+            index = rng.randrange(len(expected))
+            assert indexed.pop(index) == expected.pop(index)
+        elif expected and operation == "move":
+            source, destination = (
+                rng.randrange(len(expected)),
+                rng.randrange(len(expected)),
+            )
+            expected.insert(destination, expected.pop(source))
+            indexed.move(source, destination)
+        elif expected and operation == "remove_range":
+            start = rng.randrange(len(expected))
+            stop = rng.randint(start, min(len(expected), start + 5))
+            assert indexed.remove_range(start, stop) == expected[start:stop]
+            del expected[start:stop]
+
+        assert len(indexed) == len(expected)
+
+    assert list(indexed) == expected
+    assert [indexed[n] for n in range(len(expected))] == expected
+    assert indexed[3:17] == expected[3:17]
+    assert indexed[::3] == expected[::3]
+    assert indexed[-1] == expected[-1]
+
+
+def test_popleft_and_move_to_front():
+    indexed = IndexedList(["a", "b", "c", "d"])
+
+    indexed.move_to_front(2)
+    assert list(indexed) == ["c", "a", "b", "d"]
+    assert indexed.popleft() == "c"
+    assert list(indexed) == ["a", "b", "d"]
+
+
+def test_membership_by_video_id():
+    songs = [SimpleNamespace(video_id=video_id) for video_id in ("a", "b", "a")]
+    indexed = IndexedList(songs)
+
+    assert indexed.contains_key("a")
+    assert indexed.contains_key("b")
+
+    indexed.pop(0)
+    assert indexed.contains_key("a")
+    indexed.remove_range(0, 2)
+    assert not indexed.contains_key("a")
+    assert not indexed.contains_key("b")
+
+
+def test_out_of_range():
+    indexed = IndexedList()
+    with pytest.raises(IndexError):
+        indexed.popleft()
+    with pytest.raises(IndexError):
+        _ = indexed[0]
+    assert indexed[:] == []
+
+
+def test_weights_and_groups_under_random_operations():
+    rng = random.Random(4321)
+    songs = [
+        SimpleNamespace(duration=rng.randint(60, 600), requester=rng.randint(1, 4))
+        for _ in range(100)
+    ]
+    expected = list(songs)
+    indexed = IndexedList(
+        songs,
+        weight=lambda song: song.duration,
+        group=lambda song: song.requester,
+    )
+
+    for _ in range(500):
+        source, destination = rng.randrange(len(expected)), rng.randrange(len(expected))
+        expected.insert(destination, expected.pop(source))
+        indexed.move(source, destination)
+        if rng.random() < 0.2:
+            expected.pop(0)
+            indexed.popleft()
+            song = SimpleNamespace(
+                duration=rng.randint(60, 600), requester=rng.randint(1, 4)
+            )
+            expected.append(song)
+            indexed.append(song)
+
+    assert indexed.total_weight == sum(song.duration for song in expected)
+    for index in (0, 1, 17, 50, len(expected)):
+        assert indexed.weight_before(index) == sum(
+            song.duration for song in expected[:index]
+        )
+    for requester in range(1, 5):
+        assert indexed.group_weight(requester) == sum(
+            song.duration for song in expected if song.requester == requester
+        )
+
+
+def test_refresh_weight():
+    songs = [SimpleNamespace(duration=None, requester=1) for _ in range(10)]
+    indexed = IndexedList(
+        songs,
+        weight=lambda song: song.duration or 0,
+        group=lambda song: song.requester,
+    )
+    assert indexed.total_weight == 0
+
+    songs[4].duration = 200
+    indexed.refresh_weight(4)
+
+    assert indexed.total_weight == 200
+    assert indexed.weight_before(4) == 0
+    assert indexed.weight_before(5) == 200
+    assert indexed.group_weight(1) == 200
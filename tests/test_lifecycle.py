@@ -0,0 +1,105 @@
+import weakref
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock, patch
+
+import discord
+
+from src.cogs.music_bot.lifecycle import (
+    ORPHANED_FFMPEG,
+    VoiceStateJanitor,
+    top_consumers,
+)
+from src.cogs.music_bot.parse_youtube_input.extract_from_youtube import _TrackAudio
+from src.cogs.music_bot.queued_track import QueuedTrack
+from src.cogs.music_bot.voice_state import VoiceState
+
+EXTRACT_MODULE = "src.cogs.music_bot.parse_youtube_input.extract_from_youtube"
+
+
+class FakeSource(_TrackAudio, discord.AudioSource):
+    def __init__(self, title: str):
+        self.cleaned = False
+        self._init_track_audio(video_info=SimpleNamespace(title=title), start=0.0)
+
+    def _read_frame(self) -> bytes:
+        return b""
+
+    def cleanup(self):
+        self.cleaned = True
+        super().cleanup()
+
+
+class FakeState:
+    def __init__(self, *, finished=False, idle_for=0.0, sources=()):
+        self.finished = finished
+        self.idle_for = idle_for
+        self._sources = list(sources)
+        self.stop = AsyncMock()
+
+    def sources(self):
+        return self._sources
+
+
+def make_voice_state(tracks: int) -> VoiceState:
+    with patch("asyncio.create_task", return_value=Mock()):
+        state = VoiceState(Mock(), Mock())
+    state.audio_player.done.return_value = False
+    for n in range(tracks):
+        state.songs.put_nowait(
+            QueuedTrack(None, requester_id=1, channel_id=2, video_id=f"video-{n}")
+        )
+    return state
+
+
+async def test_sweep_evicts_finished_and_idle_states():
+    finished, idle, active = (
+        FakeState(finished=True),
+        FakeState(idle_for=600),
+        FakeState(),
+    )
+    voice_states = {1: finished, 2: idle, 3: active}
+    janitor = VoiceStateJanitor(voice_states, idle_timeout=300)
+
+    assert await janitor.sweep() == 2
+    assert voice_states == {3: active}
+    finished.stop.assert_awaited_once()
+    idle.stop.assert_awaited_once()
+    active.stop.assert_not_awaited()
+
+
+def test_clean_orphans_spares_owned_and_new_sources():
+    # Only this test's sources, not any left running by other tests.
+    with patch(f"{EXTRACT_MODULE}._LIVE_SOURCES", weakref.WeakSet()):
+        check_clean_orphans()
+
+
+def check_clean_orphans():
+    owned, orphan, opening = FakeSource("owned"), FakeSource("orphan"), FakeSource("new")
+    for source in (owned, orphan):
+        source.created_at -= 600
+    janitor = VoiceStateJanitor({1: FakeState(sources=[owned])}, orphan_grace=120)
+
+    cleaned = ORPHANED_FFMPEG.value()
+    assert janitor.clean_orphans() == 1
+    assert ORPHANED_FFMPEG.value() == cleaned + 1
+    assert (owned.cleaned, orphan.cleaned, opening.cleaned) == (False, True, False)
+    assert not orphan.ffmpeg_running
+
+    for source in (owned, opening):
+        source.cleanup()
+
+
+async def test_top_consumers_orders_by_resource_usage():
+    small, large = make_voice_state(1), make_voice_state(50)
+    large.current_ytdl_source = FakeSource("playing")
+    try:
+        usage = top_consumers({1: small, 2: large}, count=1)
+    finally:
+        large.current_ytdl_source.cleanup()
+
+    [entry] = usage
+    assert entry.guild_id == 2
+    assert entry.ffmpeg_processes == 1
+    assert entry.queued_tracks == 50
+    assert entry.queued_bytes > top_consumers({1: small})[0].queued_bytes
+    assert entry.tasks == 1  # The (mocked) audio player
@@ -0,0 +1,85 @@
+import json
+import logging
+import queue
+import sys
+
+from src import logger
+from src.logger import (
+    LOG_RECORDS_DROPPED,
+    JsonFormatter,
+    NonBlockingQueueHandler,
+    RateLimitFilter,
+    TextFormatter,
+    setup_root_logger,
+)
+
+
+def make_record(msg="Attempting to play: %s", args=("song",), level=logging.INFO, line=1):
+    return logging.LogRecord("gimlibot", level, "voice_state.py", line, msg, args, None)
+
+
+def test_rate_limit_filter_drops_and_reports(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr("src.logger.time.monotonic", lambda: now[0])
+    rate_limit = RateLimitFilter(limit=2, period=10)
+
+    allowed = [rate_limit.filter(make_record()) for _ in range(5)]
+    assert allowed == [True, True, False, False, False]
+    # Other call sites, and warnings, have their own budget.
+    assert rate_limit.filter(make_record(line=2))
+    assert rate_limit.filter(make_record(level=logging.WARNING))
+
+    now[0] = 10.0
+    record = make_record()
+    assert rate_limit.filter(record)
+    # Other handlers see the record too, so only the formatters add the count.
+    assert record.getMessage() == "Attempting to play: song"
+    assert TextFormatter("%(message)s").format(record) == (
+        "Attempting to play: song (suppressed 3 similar messages)"
+    )
+    assert json.loads(JsonFormatter().format(record))["suppressed"] == 3
+
+
+def test_queue_handler_formats_message_eagerly_and_drops_when_full():
+    handler = NonBlockingQueueHandler(queue.Queue(1))
+    args = ["first"]
+    handler.handle(make_record("Queue: %s", (args,)))
+    args.append("second")
+
+    dropped = LOG_RECORDS_DROPPED.value()
+    handler.handle(make_record())
+    assert LOG_RECORDS_DROPPED.value() == dropped + 1
+
+    record = handler.queue.get_nowait()
+    assert record.getMessage() == "Queue: ['first']"
+    assert record.args is None
+
+
+def test_json_formatter():
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record = logging.LogRecord(
+            "gimlibot", logging.ERROR, "bot.py", 1, "Failed: %s", ("x",), sys.exc_info()
+        )
+
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["level"] == "ERROR"
+    assert entry["logger"] == "gimlibot"
+    assert entry["message"] == "Failed: x"
+    assert "ValueError: boom" in entry["exception"]
+
+
+def test_setting_up_again_replaces_the_queue_handler():
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    try:
+        setup_root_logger(async_mode=True)
+        setup_root_logger(async_mode=True)
+
+        (handler,) = root.handlers
+        assert isinstance(handler, NonBlockingQueueHandler)
+        assert handler.queue is logger._LISTENER.queue
+    finally:
+        logger._stop_listener()
+        root.handlers, root.level = handlers, level
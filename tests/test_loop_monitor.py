@@ -0,0 +1,39 @@
+import asyncio
+import logging
+import time
+
+import pytest
+
+from src.event_loop import loop_factory, run
+from src.loop_monitor import EVENT_LOOP_STALLS, LoopLagMonitor
+
+
+def block_the_loop():
+    time.sleep(0.3)
+
+
+async def test_stall_logs_the_blocking_stack(caplog):
+    monitor = LoopLagMonitor(interval=0.05, stall_threshold=0.1)
+    stalls = EVENT_LOOP_STALLS.value()
+    monitor.start()
+    try:
+        await asyncio.sleep(0.1)
+        with caplog.at_level(logging.WARNING, logger="src.loop_monitor"):
+            block_the_loop()
+            await asyncio.sleep(0.1)
+    finally:
+        monitor.stop()
+
+    assert EVENT_LOOP_STALLS.value() == stalls + 1
+    [record] = caplog.records
+    assert "block_the_loop" in record.getMessage()
+
+
+def test_event_loop_backend():
+    async def main():
+        return 42
+
+    assert loop_factory("asyncio") is None
+    assert run(main(), backend="asyncio") == 42
+    with pytest.raises(ValueError):
+        loop_factory("trio")
@@ -0,0 +1,177 @@
+import time
+from unittest.mock import Mock
+
+import pytest
+from conftest import make_info
+
+from src._exceptions import YTDLError
+from src.cogs.music_bot.parse_youtube_input.extract_from_youtube import (
+    VideoInfo,
+    extract_video,
+)
+from src.cogs.music_bot.parse_youtube_input.metadata_cache import (
+    METADATA_CACHE_EVICTIONS,
+    METADATA_CACHE_LOOKUPS,
+    MetadataCache,
+    trim_info,
+)
+
+
+@pytest.fixture
+def cache(tmp_path) -> MetadataCache:
+    cache = MetadataCache(str(tmp_path / "metadata.sqlite3"), max_entries=3)
+    yield cache
+    cache.close()
+
+
+def test_put_and_get(cache: MetadataCache):
+    cache.put(make_info("abc", expire=time.time() + 3600))
+
+    cached = cache.get("abc")
+
+    assert cached.metadata["title"] == "Video abc"
+    assert "formats" not in cached.metadata
+    assert not cached.stream_expired
+    assert cache.stats.hits == 1
+    assert cache.get("something else") is None
+    assert cache.stats.misses == 1
+
+
+def test_stream_url_expiry_is_tracked_separately(cache: MetadataCache):
+    cache.put(make_info("abc", expire=time.time() - 1))
+    cached = cache.get(video_id="abc")
+    assert cached.stream_expired
+
+    cache.update_stream_url("abc", make_info("abc", expire=time.time() + 3600)["url"])
+    assert not cache.get(video_id="abc").stream_expired
+    assert cache.stats.stream_refreshes == 1
+
+
+def test_lru_eviction(cache: MetadataCache):
+    for video_id in ("a", "b", "c"):
+        cache.put(make_info(video_id))
+        time.sleep(0.001)
+
+    # Touch "a", so "b" becomes the least recently used entry.
+    cache.get(video_id="a")
+    cache.put(make_info("d"))
+
+    assert len(cache) == 3
+    assert cache.get(video_id="b") is None
+    assert cache.get(video_id="a") is not None
+    assert cache.stats.evictions == 1
+
+
+def test_replacing_an_entry_does_not_count_towards_the_cap(cache: MetadataCache):
+    evictions = METADATA_CACHE_EVICTIONS.value()
+    hits = METADATA_CACHE_LOOKUPS.value(outcome="hit")
+    for video_id in ("a", "b", "b", "b", "c"):
+        cache.put(make_info(video_id))
+
+    assert len(cache) == 3
+    assert cache.get(video_id="a") is not None
+    assert METADATA_CACHE_LOOKUPS.value(outcome="hit") == hits + 1
+    assert METADATA_CACHE_EVICTIONS.value() == evictions
+
+    cache.put(make_info("d"))
+    assert len(cache) == 3
+    assert METADATA_CACHE_EVICTIONS.value() == evictions + 1
+
+
+def test_cache_survives_reopening(tmp_path):
+    path = str(tmp_path / "metadata.sqlite3")
+    first = MetadataCache(path)
+    first.put(make_info("abc"))
+    first.close()
+
+    second = MetadataCache(path)
+    assert second.get(video_id="abc").metadata["title"] == "Video abc"
+    second.close()
+
+
+@pytest.mark.asyncio
+async def test_extract_video_hits_cache(cache: MetadataCache):
+    ytdl = Mock()
+    ytdl.extract_info.return_value = make_info("abc", expire=time.time() + 3600)
+
+    first = await extract_video(ytdl, "https://youtu.be/abc", cache=cache)
+    second = await extract_video(ytdl, "https://www.youtube.com/watch?v=abc", cache=cache)
+
+    assert first.title == second.title == "Video abc"
+    ytdl.extract_info.assert_called_once_with("https://youtu.be/abc", download=False)
+
+
+@pytest.mark.asyncio
+async def test_extract_video_refreshes_only_stream_url(cache: MetadataCache):
+    cache.put(make_info("abc", expire=time.time() - 1))
+    fresh = make_info("abc", expire=time.time() + 3600)
+    fresh["title"] = "A title that should not be used"
+    ytdl = Mock()
+    ytdl.extract_info.return_value = fresh
+
+    video_info = await extract_video(
+        ytdl, "https://www.youtube.com/watch?v=abc", cache=cache
+    )
+
+    assert video_info.title == "Video abc"
+    assert video_info.stream_url == fresh["url"]
+    ytdl.extract_info.assert_called_once_with(
+        "https://www.youtube.com/watch?v=abc", download=False
+    )
+
+
+def test_trim_info_keeps_only_what_video_info_needs():
+    info = make_info("abc")
+    info["thumbnails"] = [{"url": "https://i.ytimg.com/vi/abc/1.jpg"}] * 40
+
+    trimmed = trim_info({"entries": [info, None]})
+
+    (entry,) = trimmed["entries"]
+    assert "formats" not in entry and "thumbnails" not in entry
+    assert entry["url"] == info["url"]
+    assert VideoInfo.parse_video_information(entry) == (
+        VideoInfo.parse_video_information(info)
+    )
+
+
+def test_trusted_info_matches_validated_info():
+    info = trim_info(make_info("abc"))
+
+    validated = VideoInfo.parse_video_information(info, download_info=True)
+    trusted = VideoInfo.from_trusted_info(info, download_info=True)
+
+    assert trusted == validated
+    assert type(trusted.webpage_url) is type(validated.webpage_url)
+
+
+def test_trusted_info_needs_a_stream_url():
+    info = trim_info(make_info("abc"))
+    info["url"] = None
+
+    with pytest.raises(ValueError):
+        VideoInfo.from_trusted_info(info)
+
+
+@pytest.mark.asyncio
+async def test_refresh_without_a_stream_url_is_rejected(cache: MetadataCache):
+    cache.put(make_info("abc", expire=time.time() - 1))
+    ytdl = Mock()
+    ytdl.extract_info.return_value = {"id": "abc", "url": None}
+
+    with pytest.raises(YTDLError):
+        await extract_video(ytdl, "https://youtu.be/abc", cache=cache)
+
+    assert cache.get(video_id="abc").stream_url is not None
+
+
+@pytest.mark.asyncio
+async def test_invalid_extractions_are_not_cached(cache: MetadataCache):
+    info = make_info("abc")
+    info["duration"] = None
+    ytdl = Mock()
+    ytdl.extract_info.return_value = info
+
+    with pytest.raises(YTDLError):
+        await extract_video(ytdl, "https://youtu.be/abc", cache=cache)
+
+    assert len(cache) == 0
@@ -0,0 +1,135 @@
+import asyncio
+import json
+
+import pytest
+
+from src.cogs.metrics_cog import MetricsCog
+from src.metrics import MetricsRegistry
+from src.metrics_server import MetricsServer
+
+
+def test_counter_with_labels():
+    registry = MetricsRegistry()
+    counter = registry.counter("requests_total", "Requests.", labelnames=("outcome",))
+
+    counter.inc(outcome="hit")
+    counter.inc(2, outcome="hit")
+    counter.inc(outcome="miss")
+
+    assert counter.value(outcome="hit") == 3
+    assert counter.value(outcome="miss") == 1
+    with pytest.raises(ValueError):
+        counter.inc(-1, outcome="hit")
+    with pytest.raises(ValueError):
+        counter.inc(colour="blue")
+
+
+def test_histogram_buckets():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("gap_seconds", "Gaps.", buckets=(0.1, 1.0))
+
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value)
+
+    snapshot = histogram.snapshot()
+    assert snapshot.count == 4
+    assert snapshot.total == pytest.approx(3.65)
+    assert snapshot.cumulative() == [(0.1, 2), (1.0, 3), (float("inf"), 4)]
+
+
+def test_registry_returns_existing_metric():
+    registry = MetricsRegistry()
+    counter = registry.counter("events_total", "Events.")
+
+    assert registry.counter("events_total", "Events.") is counter
+    with pytest.raises(ValueError):
+        registry.histogram("events_total", "Events.")
+
+
+def test_render_prometheus_text():
+    registry = MetricsRegistry()
+    counter = registry.counter("errors_total", "Errors.", labelnames=("type",))
+    histogram = registry.histogram("lag_seconds", "Lag.", buckets=(0.1, 1.0))
+
+    counter.inc(type='Bad "quote"')
+    histogram.observe(0.05)
+    histogram.observe(2.5)
+
+    assert registry.render().splitlines() == [
+        "# HELP errors_total Errors.",
+        "# TYPE errors_total counter",
+        'errors_total{type="Bad \\"quote\\""} 1',
+        "# HELP lag_seconds Lag.",
+        "# TYPE lag_seconds histogram",
+        'lag_seconds_bucket{le="0.1"} 1',
+        'lag_seconds_bucket{le="1"} 1',
+        'lag_seconds_bucket{le="+Inf"} 2',
+        "lag_seconds_sum 2.55",
+        "lag_seconds_count 2",
+    ]
+
+
+def test_collectors_run_before_render():
+    registry = MetricsRegistry()
+    depth = registry.gauge("queue_depth", "Depth.", labelnames=("guild",))
+
+    class Cog:
+        queues = {1: 3, 2: 0}
+
+        def collect(self):
+            depth.replace({(guild,): size for guild, size in self.queues.items()})
+
+    cog = Cog()
+    registry.add_collector(cog.collect)
+    assert 'queue_depth{guild="1"} 3' in registry.render()
+
+    cog.queues = {2: 5}
+    text = registry.render()
+    assert 'queue_depth{guild="2"} 5' in text
+    assert 'guild="1"' not in text
+
+    # Collectors don't keep their objects alive.
+    del cog
+    registry.run_collectors()
+    assert registry._collectors == []
+
+
+async def test_metrics_server():
+    registry = MetricsRegistry()
+    registry.counter("events_total", "Events.").inc(3)
+    server = MetricsServer(registry, port=0)
+    await server.start()
+
+    async def fetch(path: str) -> bytes:
+        reader, writer = await asyncio.open_connection(server.host, server.port)
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+        response = await reader.read()
+        writer.close()
+        return response
+
+    try:
+        response = await fetch("/metrics")
+        assert response.startswith(b"HTTP/1.1 200 OK\r\n")
+        assert b"Content-Type: text/plain; version=0.0.4" in response
+        assert response.endswith(b"events_total 3\n")
+
+        assert (await fetch("/")).startswith(b"HTTP/1.1 404")
+    finally:
+        await server.stop()
+
+
+@pytest.mark.parametrize("enabled", [True, False])
+async def test_metrics_cog_runs_the_loop_monitor_either_way(tmp_path, enabled):
+    config = tmp_path / "metrics.json"
+    config.write_text(json.dumps({"enabled": enabled, "port": 0}))
+    cog = MetricsCog(str(config))
+
+    await cog.cog_load()
+    assert cog.monitor._task is not None
+    assert (cog.server is not None) == enabled
+    server = cog.server._server if enabled else None
+
+    await cog.cog_unload()
+    assert cog.monitor._task is None
+    if enabled:
+        assert not server.is_serving()
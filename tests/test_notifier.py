@@ -0,0 +1,97 @@
+import asyncio
+from unittest.mock import AsyncMock, Mock, patch
+
+import discord
+import pytest
+
+from src.cogs.music_bot.notifier import Notifier
+
+
+@pytest.fixture
+def notifier():
+    with (
+        patch.object(Notifier, "WINDOW", 0.01),
+        patch.object(Notifier, "RATE_PERIOD", 0.2),
+    ):
+        notifier = Notifier()
+        yield notifier
+        notifier.close()
+
+
+def make_channel(channel_id: int = 1) -> Mock:
+    channel = Mock(spec=["id", "send"], id=channel_id)
+    channel.send = AsyncMock(side_effect=lambda *args, **kwargs: make_message())
+    return channel
+
+
+def make_message() -> Mock:
+    message = Mock()
+    message.edit = AsyncMock(return_value=message)
+    return message
+
+
+async def test_queued_tracks_are_coalesced(notifier: Notifier):
+    channel = make_channel()
+    for n in range(7):
+        notifier.queued(channel, f"Song {n}")
+
+    await notifier.flush()
+
+    channel.send.assert_awaited_once_with(
+        "🔊 Queued 7 tracks: Song 0, Song 1, Song 2, Song 3, Song 4 and 2 more"
+    )
+
+
+async def test_a_single_track_is_announced_by_name(notifier: Notifier):
+    channel = make_channel()
+    notifier.queued(channel, "Song 0")
+
+    await notifier.flush()
+
+    channel.send.assert_awaited_once_with("🔊 Queued: Song 0")
+
+
+async def test_now_playing_is_edited_in_place(notifier: Notifier):
+    channel = make_channel()
+    first, second = discord.Embed(title="first"), discord.Embed(title="second")
+
+    notifier.now_playing(channel, first)
+    await notifier.flush()
+    notifier.now_playing(channel, second)
+    await notifier.flush()
+
+    channel.send.assert_awaited_once_with(embed=first)
+    message = notifier._outboxes[channel.id].now_playing_message
+    message.edit.assert_awaited_once_with(embed=second)
+
+
+async def test_now_playing_is_reposted_after_other_messages(notifier: Notifier):
+    channel = make_channel()
+
+    notifier.now_playing(channel, discord.Embed(title="first"))
+    await notifier.flush()
+    notifier.queued(channel, "Song 0")
+    notifier.now_playing(channel, discord.Embed(title="second"))
+    await notifier.flush()
+
+    assert channel.send.await_count == 3
+    assert channel.send.await_args_list[1].args == ("🔊 Queued: Song 0",)
+
+
+async def test_sends_are_paced_by_the_rate_limit(notifier: Notifier):
+    channel = make_channel()
+    with patch.object(Notifier, "RATE_LIMIT", 2):
+        for n in range(2):
+            notifier.notice(channel, f"Notice {n}")
+            await notifier.flush()
+        assert notifier.rate_budget() == {channel.id: 1.0}
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        notifier.notice(channel, "Over budget")
+        notifier.notice(channel, "Merged")
+        await notifier.flush()
+
+    assert loop.time() - started >= 0.1
+    assert channel.send.await_count == 3
+    assert channel.send.await_args_list[-1].args == ("Over budget\nMerged",)
@@ -4,6 +4,7 @@ from src.cogs.music_bot.parse_youtube_input.parsers import (
     parse_date,
     parse_duration,
     readable_view_count,
+    stream_url_expiry,
 )
 
 
@@ -47,3 +48,15 @@ def test_parse_date(date_str: str, expected: str):
 )
 def test_readable_view_count(view_count: int, expected: str):
     assert readable_view_count(view_count) == expected
+
+
+@pytest.mark.parametrize(
+    ("stream_url", "expected"),
+    [
+        ("https://rr1.googlevideo.com/videoplayback?expire=1734567890&ei=x", 1734567890),
+        ("https://rr1.googlevideo.com/videoplayback?ei=x", None),
+        ("https://rr1.googlevideo.com/videoplayback?expire=soon", None),
+    ],
+)
+def test_stream_url_expiry(stream_url: str, expected: float | None):
+    assert stream_url_expiry(stream_url) == expected
@@ -0,0 +1,71 @@
+import os
+
+from src.cogs.music_bot.parse_youtube_input.extraction_engine import ExtractionEngine
+from src.cogs.music_bot.parse_youtube_input.player_cache import (
+    EXTRACTION_PLAYER_CACHE,
+    PlayerCache,
+    with_player_cache,
+)
+
+
+def write_entry(directory, section: str, key: str, data: str, mtime: int = None):
+    path = os.path.join(directory, section, f"{key}.json")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as file:
+        file.write(data)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+    return path
+
+
+class CachingYoutubeDL:
+    """Stores player data on its first extraction, like yt-dlp on a cold cache."""
+
+    def __init__(self, cachedir: str):
+        self.cachedir = cachedir
+
+    def extract_info(self, url: str, download: bool = False):
+        if not os.path.exists(os.path.join(self.cachedir, "youtube-nsig")):
+            write_entry(self.cachedir, "youtube-nsig", "player", "{}")
+        return {"id": url}
+
+
+def test_warm_copies_missing_and_newer_entries_from_the_seed(tmp_path):
+    seed, directory = tmp_path / "seed", tmp_path / "cache"
+    write_entry(seed, "youtube-nsig", "new", "seeded", mtime=2_000)
+    write_entry(seed, "youtube-nsig", "stale", "seeded", mtime=1_000)
+    write_entry(directory, "youtube-nsig", "stale", "fresher", mtime=3_000)
+    cache = PlayerCache(str(directory), seed_directory=str(seed))
+
+    assert cache.warm() == 1
+    assert (directory / "youtube-nsig" / "new.json").read_text() == "seeded"
+    assert (directory / "youtube-nsig" / "stale.json").read_text() == "fresher"
+    assert not any(
+        name.endswith(".tmp") for name in os.listdir(directory / "youtube-nsig")
+    )
+    assert cache.warm() == 0
+
+    # Anything learned while running is saved back to the seed.
+    write_entry(directory, "youtube-sigfuncs", "player", "learned")
+    assert cache.persist() == 2
+    assert (seed / "youtube-sigfuncs" / "player.json").read_text() == "learned"
+    assert (seed / "youtube-nsig" / "stale.json").read_text() == "fresher"
+
+
+async def test_extractions_are_timed_by_player_cache_state(tmp_path):
+    cache = PlayerCache(str(tmp_path / "cache"))
+    config = with_player_cache({"quiet": True}, cache)
+    assert config["cachedir"] == str(tmp_path / "cache")
+
+    engine = ExtractionEngine(max_workers=1, player_cache=cache)
+    ytdl = CachingYoutubeDL(config["cachedir"])
+    cold = EXTRACTION_PLAYER_CACHE.snapshot(cache="cold").count
+    warm = EXTRACTION_PLAYER_CACHE.snapshot(cache="warm").count
+    try:
+        await engine.extract_info(ytdl, "first")
+        await engine.extract_info(ytdl, "second")
+    finally:
+        engine.shutdown()
+
+    assert EXTRACTION_PLAYER_CACHE.snapshot(cache="cold").count == cold + 1
+    assert EXTRACTION_PLAYER_CACHE.snapshot(cache="warm").count == warm + 1
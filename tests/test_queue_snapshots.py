@@ -0,0 +1,100 @@
+import json
+import os
+import time
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+from src.cogs.music_bot.queue_snapshots import QueueSnapshots
+from src.cogs.music_bot.queued_track import QueuedTrack
+from src.cogs.music_bot.voice_state import VoiceState
+
+
+def make_track(n: int) -> QueuedTrack:
+    return QueuedTrack(
+        None,
+        requester_id=7,
+        channel_id=8,
+        guild_id=1,
+        video_id=f"video-{n}",
+        title=f"Song {n}",
+        duration=200,
+    )
+
+
+def make_voice_state() -> VoiceState:
+    with patch("asyncio.create_task", return_value=Mock()):
+        return VoiceState(Mock(), None)
+
+
+def playing_voice_state(tracks: int) -> VoiceState:
+    state = make_voice_state()
+    state.voice = Mock(channel=SimpleNamespace(id=99))
+    state.voice.is_connected.return_value = True
+    state.current_track = make_track(0)
+    state.current_ytdl_source = SimpleNamespace(position=42.5, LIVE_VOLUME=True)
+    for n in range(1, tracks + 1):
+        state.songs.put_nowait(make_track(n))
+    return state
+
+
+def test_snapshot_round_trip(tmp_path):
+    snapshots = QueueSnapshots(str(tmp_path))
+    state = playing_voice_state(tracks=3)
+    state.volume = 0.3
+
+    snapshots.save(snapshots.capture({1: state}))
+    [restored] = snapshots.load().values()
+    assert restored["voice_channel_id"] == 99
+    assert restored["position"] == 42.5
+    assert restored["current"] == ["video-0", "Song 0", 200, 7, 8]
+    assert len(restored["queue"]) == 3
+
+    new_state = make_voice_state()
+    snapshots.restore(new_state, restored, guild_id=1)
+    assert new_state.volume == 0.3
+    assert [track.video_id for track in new_state.songs] == [
+        "video-0",
+        "video-1",
+        "video-2",
+        "video-3",
+    ]
+    # Nothing is resolved up front; the current song resumes part way through.
+    assert not any(track.resolved for track in new_state.songs)
+    assert new_state._resume_track is new_state.songs.peek()
+    assert new_state._resume_position == 42.5
+
+
+def test_unchanged_snapshots_are_not_rewritten_and_ended_ones_are_deleted(tmp_path):
+    snapshots = QueueSnapshots(str(tmp_path))
+    state = playing_voice_state(tracks=1)
+    path = snapshots.path(1)
+
+    snapshots.save(snapshots.capture({1: state}))
+    written_at = os.stat(path).st_mtime_ns
+    time.sleep(0.01)
+    snapshots.save(snapshots.capture({1: state}))
+    assert os.stat(path).st_mtime_ns == written_at
+
+    # The guild left voice (its state was removed).
+    snapshots.save(snapshots.capture({}))
+    assert not os.path.exists(path)
+    assert os.listdir(tmp_path) == []
+
+
+def test_stale_and_unreadable_snapshots_are_skipped(tmp_path):
+    snapshots = QueueSnapshots(str(tmp_path), max_age=60)
+    (tmp_path / "1.json").write_text(json.dumps({"saved_at": time.time() - 120}))
+    (tmp_path / "2.json").write_text("{not json")
+    (tmp_path / "3.json").write_text(json.dumps({"saved_at": time.time()}))
+
+    assert list(snapshots.load()) == [3]
+    assert not (tmp_path / "1.json").exists()
+
+
+def test_nothing_to_snapshot_without_voice_or_songs():
+    state = make_voice_state()
+    assert state.snapshot() is None
+
+    state.voice = Mock()
+    state.voice.is_connected.return_value = True
+    assert state.snapshot() is None
@@ -0,0 +1,206 @@
+import time
+from unittest.mock import Mock, patch
+
+import discord
+import pytest
+from conftest import make_info
+
+from src.cogs.music_bot import queued_track
+from src.cogs.music_bot.parse_youtube_input.extract_from_youtube import (
+    OpusYtdlSource,
+    YtdlSource,
+)
+from src.cogs.music_bot.parse_youtube_input.metadata_cache import trim_info
+from src.cogs.music_bot.parse_youtube_input.video_info import VideoInfo
+from src.cogs.music_bot.queued_track import QueuedTrack, intern_video_info
+
+EXTRACT_MODULE = "src.cogs.music_bot.parse_youtube_input.extract_from_youtube"
+
+
+def make_video_info(expire: float) -> VideoInfo:
+    return VideoInfo.parse_video_information(make_info("abc", expire=expire))
+
+
+@pytest.fixture(autouse=True)
+def track_records():
+    """Start each test without interned VideoInfo from earlier tests."""
+    queued_track._TRACK_RECORDS.clear()
+    yield queued_track._TRACK_RECORDS
+
+
+@pytest.fixture
+def ffmpeg():
+    with (
+        patch.dict(YtdlSource.PLAYBACK_CONFIG, mode="pcm"),
+        patch(f"{EXTRACT_MODULE}.discord.FFmpegPCMAudio") as ffmpeg,
+    ):
+        ffmpeg.return_value = Mock(spec=discord.AudioSource)
+        ffmpeg.return_value.is_opus.return_value = False
+        yield ffmpeg
+
+
+@pytest.fixture
+def spawn_ffmpeg():
+    """Capture the ffmpeg command lines of Opus sources, without running ffmpeg."""
+    with (
+        patch.dict(YtdlSource.PLAYBACK_CONFIG, mode="opus"),
+        patch.object(discord.FFmpegAudio, "_spawn_process") as spawn,
+    ):
+        yield spawn
+
+
+def ffmpeg_args(spawn: Mock) -> str:
+    return " ".join(spawn.call_args.args[0])
+
+
+def test_queued_track_holds_no_audio_source(ffmpeg):
+    track = QueuedTrack(make_video_info(time.time() + 3600), requester_id=1, channel_id=2)
+
+    assert track.title == "Video abc"
+    assert not track.stream_expired
+    ffmpeg.assert_not_called()
+
+
+def test_stream_expiry_follows_the_metadata_cache_settings():
+    track = QueuedTrack(make_video_info(time.time() + 3600), requester_id=1, channel_id=2)
+    cache = Mock(stream_url_ttl=18_000, expiry_margin=600)
+
+    with patch.object(YtdlSource, "METADATA_CACHE", cache):
+        assert not track.stream_expired
+        cache.expiry_margin = 4000
+        assert track.stream_expired
+
+
+@pytest.mark.asyncio
+async def test_create_source_spawns_ffmpeg(ffmpeg):
+    track = QueuedTrack(make_video_info(time.time() + 3600), requester_id=1, channel_id=2)
+
+    source = await track.create_source(volume=0.3)
+
+    assert isinstance(source, YtdlSource)
+    assert source.volume == 0.3
+    ffmpeg.assert_called_once()
+    assert ffmpeg.call_args.args[0] == track.video_info.stream_url
+
+
+@pytest.mark.asyncio
+async def test_create_source_refreshes_stale_stream_url(ffmpeg):
+    track = QueuedTrack(make_video_info(time.time() - 1), requester_id=1, channel_id=2)
+    fresh_url = (
+        f"https://rr1.googlevideo.com/videoplayback?expire={int(time.time()) + 3600}"
+    )
+    ytdl = Mock()
+    ytdl.extract_info.return_value = {"id": "abc", "url": fresh_url}
+
+    with (
+        patch.object(YtdlSource, "YTDL", ytdl),
+        patch.object(YtdlSource, "METADATA_CACHE", None),
+    ):
+        await track.create_source()
+
+    ytdl.extract_info.assert_called_once_with(
+        "https://www.youtube.com/watch?v=abc", download=False
+    )
+    assert ffmpeg.call_args.args[0] == fresh_url
+    assert not track.stream_expired
+
+
+@pytest.mark.asyncio
+async def test_playlist_entry_is_resolved_lazily(ffmpeg):
+    ctx = Mock()
+    track = QueuedTrack.from_playlist_entry(
+        ctx, {"id": "abc", "title": "Listed title", "duration": 212.0}
+    )
+
+    assert not track.resolved
+    assert track.title == "Listed title"
+    assert track.duration == 212
+    assert track.webpage_url == "https://www.youtube.com/watch?v=abc"
+
+    ytdl = Mock()
+    ytdl.extract_info.return_value = make_info("abc", expire=time.time() + 3600)
+
+    with (
+        patch.object(YtdlSource, "YTDL", ytdl),
+        patch.object(YtdlSource, "METADATA_CACHE", None),
+    ):
+        await track.create_source()
+
+    assert track.resolved
+    assert track.title == "Video abc"
+    ytdl.extract_info.assert_called_once_with(
+        "https://www.youtube.com/watch?v=abc", download=False
+    )
+
+
+@pytest.mark.asyncio
+async def test_opus_stream_at_full_volume_is_passed_through(spawn_ffmpeg):
+    info = make_info("abc", expire=time.time() + 3600) | {"acodec": "opus"}
+    track = QueuedTrack(
+        VideoInfo.parse_video_information(info), requester_id=1, channel_id=2
+    )
+
+    source = await track.create_source(volume=1.0)
+
+    assert isinstance(source, OpusYtdlSource)
+    assert source.is_opus()
+    assert source.passthrough
+    args = ffmpeg_args(spawn_ffmpeg)
+    assert "-c:a copy" in args
+    assert "volume=" not in args
+
+
+@pytest.mark.asyncio
+async def test_opus_source_applies_volume_and_start_in_ffmpeg(spawn_ffmpeg):
+    info = make_info("abc", expire=time.time() + 3600) | {"acodec": "opus"}
+    track = QueuedTrack(
+        VideoInfo.parse_video_information(info), requester_id=1, channel_id=2
+    )
+
+    source = await track.create_source(volume=0.5, start=30.0)
+
+    assert not source.passthrough
+    assert source.position == 30.0
+    args = ffmpeg_args(spawn_ffmpeg)
+    assert args.index("-ss 30.000") < args.index("-i ")
+    assert "-c:a libopus" in args
+    assert "-filter:a volume=0.500" in args
+
+
+def test_tracks_share_interned_video_info():
+    expire = time.time() + 3600
+    first = QueuedTrack(make_video_info(expire), requester_id=1, channel_id=2)
+    second = QueuedTrack(make_video_info(expire), requester_id=3, channel_id=4)
+
+    assert first.video_info is second.video_info
+    assert (first.requester_id, second.requester_id) == (1, 3)
+    assert not hasattr(first, "__dict__")
+
+
+def test_cached_and_freshly_extracted_records_are_interned_together():
+    info = trim_info(make_info("abc", expire=time.time() + 3600))
+    cached = intern_video_info(VideoInfo.from_trusted_info(info, download_info=True))
+    fresh = VideoInfo.parse_video_information(info, download_info=True)
+
+    assert intern_video_info(fresh) is cached
+
+
+@pytest.mark.asyncio
+async def test_refreshed_stream_url_is_shared(ffmpeg, track_records):
+    stale = make_video_info(time.time() - 1)
+    first = QueuedTrack(stale, requester_id=1, channel_id=2)
+    second = QueuedTrack(stale, requester_id=3, channel_id=4)
+    fresh_url = make_info("abc", expire=time.time() + 3600)["url"]
+    ytdl = Mock()
+    ytdl.extract_info.return_value = {"id": "abc", "url": fresh_url}
+
+    with (
+        patch.object(YtdlSource, "YTDL", ytdl),
+        patch.object(YtdlSource, "METADATA_CACHE", None),
+    ):
+        await first.create_source()
+        await second.create_source()
+
+    ytdl.extract_info.assert_called_once()
+    assert second.video_info is first.video_info is track_records["abc"]
+    assert second.video_info.stream_url == fresh_url
@@ -0,0 +1,134 @@
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+from conftest import make_info
+
+from src._exceptions import YTDLError
+from src.cogs.music_bot.parse_youtube_input.extract_from_youtube import extract_video
+from src.cogs.music_bot.parse_youtube_input.metadata_cache import MetadataCache
+from src.cogs.music_bot.parse_youtube_input.search_cache import (
+    SEARCH_CACHE_EVICTIONS,
+    SearchCache,
+)
+
+
+@pytest.fixture
+def search_cache(tmp_path) -> SearchCache:
+    cache = SearchCache(str(tmp_path / "searches.sqlite3"), max_entries=3, ttl=60)
+    yield cache
+    cache.close()
+
+
+@pytest.fixture
+def cache(tmp_path) -> MetadataCache:
+    cache = MetadataCache(str(tmp_path / "metadata.sqlite3"))
+    yield cache
+    cache.close()
+
+
+def test_put_and_get(search_cache: SearchCache):
+    search_cache.put("never gonna", "abc")
+
+    assert search_cache.get("never gonna") == "abc"
+    assert search_cache.get("something else") is None
+    assert (search_cache.stats.hits, search_cache.stats.misses) == (1, 1)
+
+
+def test_entries_expire(search_cache: SearchCache):
+    search_cache.put("never gonna", "abc")
+
+    with patch("time.time", return_value=time.time() + 61):
+        assert search_cache.get("never gonna") is None
+
+    assert search_cache.stats.expired == 1
+    assert len(search_cache) == 0
+
+
+def test_lru_eviction(search_cache: SearchCache):
+    for query in ("a", "b", "c"):
+        search_cache.put(query, query.upper())
+        time.sleep(0.001)
+
+    # Touch "a", so "b" becomes the least recently used entry.
+    search_cache.get("a")
+    search_cache.put("d", "D")
+
+    assert len(search_cache) == 3
+    assert search_cache.get("b") is None
+    assert search_cache.get("a") == "A"
+    assert search_cache.stats.evictions == 1
+
+
+def test_replacing_or_discarding_an_entry_keeps_the_count(search_cache: SearchCache):
+    evictions = SEARCH_CACHE_EVICTIONS.value()
+    for query in ("a", "b", "b", "b", "c"):
+        search_cache.put(query, query.upper())
+    search_cache.discard("c")
+    search_cache.put("c", "C")
+
+    assert len(search_cache) == 3
+    assert search_cache.get("a") == "A"
+    assert SEARCH_CACHE_EVICTIONS.value() == evictions
+
+    search_cache.put("d", "D")
+    assert len(search_cache) == 3
+    assert SEARCH_CACHE_EVICTIONS.value() == evictions + 1
+
+
+def test_cache_survives_reopening(tmp_path):
+    path = str(tmp_path / "searches.sqlite3")
+    first = SearchCache(path)
+    first.put("never gonna", "abc")
+    first.close()
+
+    second = SearchCache(path)
+    assert second.get("never gonna") == "abc"
+    second.close()
+
+
+@pytest.mark.asyncio
+async def test_repeated_searches_skip_the_search(
+    search_cache: SearchCache, cache: MetadataCache
+):
+    ytdl = Mock()
+    ytdl.extract_info.return_value = {
+        "entries": [make_info("abc", expire=time.time() + 3600)]
+    }
+
+    first = await extract_video(
+        ytdl, "Never  Gonna", cache=cache, search_cache=search_cache
+    )
+    second = await extract_video(
+        ytdl, "never gonna", cache=cache, search_cache=search_cache
+    )
+
+    assert first.title == second.title == "Video abc"
+    ytdl.extract_info.assert_called_once_with("ytsearch:Never  Gonna", download=False)
+    assert search_cache.get("never gonna") == "abc"
+
+
+@pytest.mark.asyncio
+async def test_searches_outlive_evicted_metadata(search_cache: SearchCache):
+    search_cache.put("never gonna", "abc")
+    ytdl = Mock()
+    ytdl.extract_info.return_value = make_info("abc", expire=time.time() + 3600)
+
+    video_info = await extract_video(ytdl, "Never Gonna", search_cache=search_cache)
+
+    assert video_info.video_id == "abc"
+    ytdl.extract_info.assert_called_once_with(
+        "https://www.youtube.com/watch?v=abc", download=False
+    )
+
+
+@pytest.mark.asyncio
+async def test_unavailable_videos_are_searched_for_again(search_cache: SearchCache):
+    search_cache.put("never gonna", "abc")
+    ytdl = Mock()
+    ytdl.extract_info.side_effect = Exception("Video unavailable")
+
+    with pytest.raises(YTDLError):
+        await extract_video(ytdl, "never gonna", search_cache=search_cache)
+
+    assert len(search_cache) == 0
@@ -0,0 +1,91 @@
+import asyncio
+import time
+from unittest.mock import Mock
+
+import pytest
+from conftest import make_info
+
+from src.cogs.music_bot.parse_youtube_input.extract_from_youtube import extract_video
+from src.cogs.music_bot.parse_youtube_input.single_flight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_result():
+    group = SingleFlight("test_shared")
+    calls = 0
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return object()
+
+    results = await asyncio.gather(*(group.do("key", work) for _ in range(5)))
+
+    assert calls == 1
+    assert all(result is results[0] for result in results)
+    assert group.coalesced == 4
+    assert len(group) == 0
+
+
+@pytest.mark.asyncio
+async def test_errors_propagate_to_every_waiter():
+    group = SingleFlight("test_errors")
+
+    async def work():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("Video unavailable")
+
+    results = await asyncio.gather(
+        *(group.do("key", work) for _ in range(3)), return_exceptions=True
+    )
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_cancel_shared_work():
+    group = SingleFlight("test_cancel")
+
+    async def work():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    first = asyncio.create_task(group.do("key", work))
+    second = asyncio.create_task(group.do("key", work))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    assert await second == "done"
+
+
+@pytest.mark.asyncio
+async def test_distinct_keys_run_separately():
+    group = SingleFlight("test_distinct")
+
+    async def work(value):
+        await asyncio.sleep(0.01)
+        return value
+
+    results = await asyncio.gather(
+        group.do("a", lambda: work("a")), group.do("b", lambda: work("b"))
+    )
+    assert results == ["a", "b"]
+
+
+@pytest.mark.asyncio
+async def test_extract_video_coalesces_identical_searches():
+    def extract_info(url, download=False):
+        time.sleep(0.02)
+        return {"entries": [make_info("abc")]}
+
+    ytdl = Mock()
+    ytdl.extract_info.side_effect = extract_info
+
+    results = await asyncio.gather(
+        extract_video(ytdl, "Never Gonna Give You Up"),
+        extract_video(ytdl, "never gonna  give you up"),
+    )
+
+    assert ytdl.extract_info.call_count == 1
+    assert results[0] is results[1]
@@ -1,4 +1,5 @@
 import asyncio
+from types import SimpleNamespace
 
 import pytest
 
@@ -118,3 +119,83 @@ async def test_index_out_of_range(song_queue: SongQueue):
 async def test_slicing_empty_queue(song_queue: SongQueue):
     """Test slicing an empty queue."""
     assert song_queue[:] == []
+
+
+@pytest.mark.asyncio
+async def test_bulk_operations(song_queue: SongQueue):
+    for n in range(1, 7):
+        await song_queue.put(f"Song {n}")
+
+    assert song_queue.remove_range(1, 3) == ["Song 2", "Song 3"]
+    song_queue.move_to_front(2)
+    song_queue.move(0, 3)
+
+    assert song_queue.as_list() == ["Song 1", "Song 4", "Song 6", "Song 5"]
+    with pytest.raises(IndexError):
+        song_queue.remove_range(2, 10)
+
+
+@pytest.mark.asyncio
+async def test_insert_wakes_waiting_getter(song_queue: SongQueue):
+    getter = asyncio.create_task(song_queue.get())
+    await asyncio.sleep(0)
+
+    song_queue.insert(0, "Song 1")
+
+    assert await asyncio.wait_for(getter, timeout=1) == "Song 1"
+
+
+@pytest.mark.asyncio
+async def test_insert_follows_list_semantics(song_queue: SongQueue):
+    expected = []
+    for index, song in [(0, "a"), (-1, "b"), (-5, "c"), (10, "d"), (-2, "e")]:
+        expected.insert(index, song)
+        song_queue.insert(index, song)
+
+    assert song_queue.as_list() == expected
+
+
+@pytest.mark.asyncio
+async def test_removed_songs_do_not_block_join(song_queue: SongQueue):
+    for n in range(1, 7):
+        await song_queue.put(f"Song {n}")
+    song_queue.insert(0, "Song 0")
+
+    song_queue.remove(0)
+    song_queue.remove_range(0, 2)
+    await song_queue.get()
+    song_queue.task_done()
+    song_queue.clear()
+
+    await asyncio.wait_for(song_queue.join(), timeout=1)
+
+
+@pytest.mark.asyncio
+async def test_contains_video(song_queue: SongQueue):
+    await song_queue.put(SimpleNamespace(video_id="abc"))
+
+    assert song_queue.contains_video("abc")
+    assert not song_queue.contains_video("xyz")
+
+    await song_queue.get()
+    assert not song_queue.contains_video("abc")
+
+
+@pytest.mark.asyncio
+async def test_running_durations(song_queue: SongQueue):
+    for duration, requester_id in ((100, 1), (200, 2), (300, 1)):
+        await song_queue.put(
+            SimpleNamespace(duration=duration, requester_id=requester_id)
+        )
+
+    assert song_queue.total_duration == 600
+    assert song_queue.duration_before(2) == 300
+    assert song_queue.requester_duration(1) == 400
+
+    song_queue.remove(0)
+    assert song_queue.total_duration == 500
+    assert song_queue.duration_before(1) == 200
+    assert song_queue.requester_duration(1) == 300
+
+    await song_queue.get()
+    assert song_queue.requester_duration(2) == 0
@@ -0,0 +1,104 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from src import tracing
+from src.cogs.music_bot.parse_youtube_input.extraction_engine import ExtractionEngine
+from src.tracing import Tracer, summarize
+
+
+class FakeYoutubeDL:
+    def extract_info(self, url: str, download: bool = False):
+        time.sleep(0.01)
+        return {"id": url}
+
+
+def read_spans(path):
+    with open(path) as file:
+        return [json.loads(line) for line in file]
+
+
+async def test_spans_are_exported_as_json_lines(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracer = Tracer(str(path))
+
+    async def command():
+        trace = tracer.start_trace(guild_id=42)
+        with tracing.span("resolve"):
+            with tracing.span("extract_info", search=True):
+                await asyncio.sleep(0.01)
+        with pytest.raises(ValueError):
+            with tracing.span("enqueue"):
+                raise ValueError("Queue is full")
+        trace.record("command", trace.started_at)
+        return trace
+
+    trace = await asyncio.create_task(command())
+    tracer.close()
+
+    spans = {span["name"]: span for span in read_spans(path)}
+    assert set(spans) == {"extract_info", "resolve", "enqueue", "command"}
+    assert {span["request_id"] for span in spans.values()} == {trace.request_id}
+    assert {span["guild_id"] for span in spans.values()} == {42}
+
+    assert spans["extract_info"]["parent_id"] == spans["resolve"]["span_id"]
+    assert spans["extract_info"]["attributes"] == {"search": True}
+    assert spans["extract_info"]["duration"] >= 0.01
+    assert spans["enqueue"]["error"] == "ValueError"
+    assert spans["command"]["duration"] >= spans["resolve"]["duration"]
+
+    # Nothing leaks into code outside the traced task.
+    assert tracing.current_trace() is None
+
+
+async def test_untraced_code_records_nothing():
+    tracer = Tracer()
+    with tracing.span("resolve"):
+        pass
+
+    trace = tracer.start_trace(guild_id=1)
+    with tracing.use(None):
+        with tracing.span("resolve"):
+            pass
+    with tracing.use(trace):
+        with tracing.span("ffmpeg_spawn"):
+            pass
+    tracing.detach()
+    with tracing.span("resolve"):
+        pass
+
+    assert set(tracer.summary()) == {"ffmpeg_spawn"}
+
+
+async def test_extraction_engine_records_queue_wait_and_run_time():
+    tracer = Tracer()
+    engine = ExtractionEngine(max_workers=1)
+
+    async def extract(url: str):
+        tracer.start_trace(guild_id=1)
+        with tracing.span("extract_info"):
+            return await engine.extract_info(FakeYoutubeDL(), url, guild_id=1)
+
+    try:
+        await asyncio.gather(extract("a"), extract("b"))
+    finally:
+        engine.shutdown()
+
+    summary = tracer.summary()
+    assert summary["ytdlp_run"].count == 2
+    # The second extraction waited for the only worker.
+    assert summary["extraction_queue_wait"].max >= 0.005
+
+
+def test_summarize_percentiles():
+    summary = summarize({"parse": [i / 100 for i in range(1, 101)], "empty": []})
+
+    assert set(summary) == {"parse"}
+    parse = summary["parse"]
+    assert parse.count == 100
+    assert parse.p50 == pytest.approx(0.50)
+    assert parse.p90 == pytest.approx(0.90)
+    assert parse.p99 == pytest.approx(0.99)
+    assert parse.max == pytest.approx(1.00)
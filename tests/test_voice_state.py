@@ -1,10 +1,12 @@
 from __future__ import annotations
 
 import asyncio
+import time
 from unittest.mock import AsyncMock, Mock, patch
 
 import pytest
 
+from src.cogs.music_bot.parse_youtube_input.extract_from_youtube import YtdlSource
 from src.cogs.music_cog import VoiceState
 
 
@@ -99,3 +101,183 @@ async def test_volume_setter(voice_state: VoiceState):
 
     with pytest.raises(ValueError):
         voice_state.volume = 1.5
+
+
+@pytest.mark.parametrize(
+    "config, expected",
+    [
+        ({"mode": "opus"}, 1.0),
+        ({"mode": "pcm"}, 0.5),
+        ({"mode": "opus", "default_volume": 0.4}, 0.4),
+    ],
+)
+def test_players_start_at_passthrough_volume_in_opus_mode(
+    mock_bot, mock_ctx, config, expected
+):
+    with (
+        patch.dict(YtdlSource.PLAYBACK_CONFIG, config, clear=True),
+        patch("asyncio.create_task", return_value=AsyncMock()),
+    ):
+        assert VoiceState(mock_bot, mock_ctx).volume == expected
+
+
+def make_track(duration: int = 200) -> Mock:
+    track = Mock(duration=duration)
+    track.video_info.duration = duration
+    track.create_source = AsyncMock(side_effect=lambda volume: Mock(name="source"))
+    return track
+
+
+async def start_prefetch(voice_state: VoiceState, *queued: Mock):
+    """Pretend the current track is about to end, with `queued` songs waiting."""
+    voice_state.current_track = make_track(duration=1)
+    voice_state._track_started_at = time.monotonic() - 1
+    for track in queued:
+        await voice_state.songs.put(track)
+
+    voice_state._schedule_prefetch()
+    await voice_state._prefetch_task
+
+
+@pytest.mark.asyncio
+async def test_prefetched_source_is_used_for_next_song(voice_state: VoiceState):
+    next_track = make_track()
+    await start_prefetch(voice_state, next_track)
+
+    source = await voice_state._take_prefetched_source(await voice_state.songs.get())
+
+    next_track.create_source.assert_awaited_once()
+    source.prime.assert_called_once_with(VoiceState.PREFETCH_FRAMES)
+    source.cleanup.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_prefetch_is_redirected_when_queue_head_changes(voice_state: VoiceState):
+    removed_track, next_track = make_track(), make_track()
+    await start_prefetch(voice_state, removed_track, next_track)
+    removed_source = voice_state._prefetched_source
+
+    voice_state.songs.remove(0)
+    voice_state.refresh_prefetch()
+    await voice_state._prefetch_task
+
+    removed_source.cleanup.assert_called_once()
+    source = await voice_state._take_prefetched_source(await voice_state.songs.get())
+    assert source is not removed_source
+    next_track.create_source.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_failed_prefetch_cleans_up_its_source(voice_state: VoiceState):
+    next_track = make_track()
+    source = Mock(name="source")
+    source.prime.side_effect = OSError("ffmpeg exited")
+    next_track.create_source = AsyncMock(return_value=source)
+
+    await start_prefetch(voice_state, next_track)
+
+    source.cleanup.assert_called_once()
+    assert voice_state._prefetched_source is None
+
+
+@pytest.mark.asyncio
+async def test_prefetch_waits_for_a_song_and_skips_livestreams(voice_state: VoiceState):
+    voice_state.current_track = make_track(duration=1)
+    voice_state._track_started_at = time.monotonic() - 1
+    voice_state._schedule_prefetch()
+    await asyncio.sleep(0)
+    assert not voice_state._prefetch_task.done()
+
+    next_track = make_track()
+    await voice_state.songs.put(next_track)
+    await voice_state._prefetch_task
+    next_track.create_source.assert_awaited_once()
+
+    voice_state.current_track = make_track(duration=None)
+    voice_state._cancel_prefetch()
+    voice_state._schedule_prefetch()
+    assert voice_state._prefetch_task is None
+
+
+@pytest.mark.asyncio
+async def test_prefetch_is_discarded_for_a_different_song(voice_state: VoiceState):
+    await start_prefetch(voice_state, make_track())
+    prefetched = voice_state._prefetched_source
+
+    assert await voice_state._take_prefetched_source(make_track()) is None
+    prefetched.cleanup.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_resolve_ahead_only_resolves_the_window(voice_state: VoiceState):
+    tracks = [Mock(resolved=False, resolve=AsyncMock(), duration=200) for _ in range(8)]
+    for track in tracks:
+        await voice_state.songs.put(track)
+
+    voice_state.schedule_resolve_ahead()
+    await voice_state._resolver
+
+    for track in tracks[: VoiceState.RESOLVE_AHEAD]:
+        track.resolve.assert_awaited_once()
+    for track in tracks[VoiceState.RESOLVE_AHEAD :]:
+        track.resolve.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_time_until_includes_current_song(voice_state: VoiceState):
+    voice_state.current_track = make_track(duration=300)
+    voice_state.current_ytdl_source = Mock(position=100.0)
+    for duration in (200, 400):
+        await voice_state.songs.put(make_track(duration=duration))
+
+    assert voice_state.current_remaining == 200
+    assert voice_state.time_until(0) == 200
+    assert voice_state.time_until(1) == 400
+    assert voice_state.total_remaining == 800
+
+
+@pytest.mark.asyncio
+async def test_volume_change_reopens_opus_source_at_position(voice_state: VoiceState):
+    old_source = Mock(LIVE_VOLUME=False, position=42.0)
+    new_source = Mock(LIVE_VOLUME=False)
+    voice_state.current_track = make_track()
+    voice_state.current_track.create_source = AsyncMock(return_value=new_source)
+    voice_state.current_ytdl_source = old_source
+    voice_state.voice = Mock()
+
+    voice_state.volume = 0.8
+    await voice_state._restart_task
+
+    voice_state.current_track.create_source.assert_awaited_once_with(
+        volume=0.8, start=42.0
+    )
+    new_source.skip_to.assert_called_once_with(42.0)
+    assert voice_state.voice.source is new_source
+    assert voice_state.current_ytdl_source is new_source
+    old_source.cleanup.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_prefetched_opus_source_at_old_volume_is_discarded(
+    voice_state: VoiceState,
+):
+    next_track = make_track()
+    next_track.create_source = AsyncMock(
+        side_effect=lambda volume: Mock(LIVE_VOLUME=False, volume=volume)
+    )
+    await start_prefetch(voice_state, next_track)
+    prefetched = voice_state._prefetched_source
+
+    voice_state._volume = 0.9
+    track = await voice_state.songs.get()
+    assert await voice_state._take_prefetched_source(track) is None
+    prefetched.cleanup.assert_called_once()
+
+
+def test_track_channel_is_the_channel_it_was_queued_from(voice_state, mock_bot):
+    track = Mock(channel_id=5, guild_id=6)
+
+    channel = voice_state.track_channel(track)
+
+    assert channel is mock_bot.get_partial_messageable.return_value
+    mock_bot.get_partial_messageable.assert_called_once_with(5, guild_id=6)
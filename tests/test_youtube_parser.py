@@ -1,10 +1,16 @@
+from unittest.mock import Mock
+
 import pytest
 import yt_dlp
 
 from src.cogs.music_bot.parse_youtube_input.extract_from_youtube import (
     VideoInfo,
     extract_video,
+    extract_video_id,
     is_valid_youtube_watch_url,
+    is_youtube_playlist_url,
+    iter_playlist,
+    normalise_search_query,
 )
 from src.parse_json import parse_json
 
@@ -42,6 +48,67 @@ def test_is_youtube_url(url, expected):
     assert is_valid_youtube_watch_url(url) == expected
 
 
+@pytest.mark.parametrize(
+    ("url", "expected"),
+    [
+        ("https://www.youtube.com/watch?v=dQw4w9WgXcQ", "dQw4w9WgXcQ"),
+        ("https://m.youtube.com/watch?v=dQw4w9WgXcQ&t=42", "dQw4w9WgXcQ"),
+        ("https://youtu.be/dQw4w9WgXcQ", "dQw4w9WgXcQ"),
+        ("never gonna give you up", None),
+    ],
+)
+def test_extract_video_id(url, expected):
+    assert extract_video_id(url) == expected
+
+
+def test_normalise_search_query():
+    assert normalise_search_query("  Never   Gonna\tGIVE you up ") == (
+        "never gonna give you up"
+    )
+
+
+@pytest.mark.parametrize(
+    ("url", "expected"),
+    [
+        ("https://www.youtube.com/playlist?list=PL1234", True),
+        ("https://music.youtube.com/playlist?list=PL1234", True),
+        ("https://www.youtube.com/playlist", False),
+        # A video within a playlist is still played as a single video.
+        ("https://www.youtube.com/watch?v=dQw4w9WgXcQ&list=PL1234", False),
+        ("https://example.com/playlist?list=PL1234", False),
+    ],
+)
+def test_is_youtube_playlist_url(url, expected):
+    assert is_youtube_playlist_url(url) == expected
+
+
+@pytest.mark.asyncio
+async def test_iter_playlist_yields_bounded_batches():
+    pulled = []
+
+    def entries():
+        for n in range(12):
+            pulled.append(n)
+            yield {"id": f"video-{n}", "title": f"Video {n}"} if n != 3 else None
+
+    ytdl = Mock()
+    ytdl.extract_info.return_value = {"_type": "playlist", "entries": entries()}
+
+    batches = []
+    url = "https://www.youtube.com/playlist?list=PL1"
+    async for batch in iter_playlist(ytdl, url, batch_size=4, limit=10):
+        batches.append([entry["id"] for entry in batch])
+        # Entries are only pulled from yt-dlp one batch at a time.
+        assert len(pulled) == min(4 * len(batches), 10)
+
+    assert batches == [
+        ["video-0", "video-1", "video-2"],
+        ["video-4", "video-5", "video-6", "video-7"],
+        ["video-8", "video-9"],
+    ]
+    ytdl.extract_info.assert_called_once_with(url, download=False, process=False)
+
+
 @pytest.mark.slow
 @pytest.mark.asyncio
 @pytest.mark.parametrize(